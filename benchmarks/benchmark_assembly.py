@@ -0,0 +1,63 @@
+"""
+Benchmarks assembling the dataset from per-ticker final data.
+
+Compares appending every ticker to a growing DataFrame, as build_dataset used to,
+against DatasetCollector, for an increasing number of tickers. Run from the
+repository root:
+
+    python benchmarks/benchmark_assembly.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from investment_dataset_builder.dataset_collector import DatasetCollector  # noqa
+
+N_QUARTERS = 40
+N_COLUMNS = 111
+
+
+def make_final_data(ticker: str, rng: np.random.Generator) -> pd.DataFrame:
+    """Returns a frame shaped like the DataParser.final_data of one ticker."""
+    index = [f"{ticker}-Q{q % 4 + 1}-{2022 - q // 4}" for q in range(N_QUARTERS)]
+    values = rng.normal(size=(N_QUARTERS, N_COLUMNS))
+    return pd.DataFrame(
+        values, index=index, columns=[f"f{i}" for i in range(N_COLUMNS)]
+    )
+
+
+def append_to_growing_frame(frames):
+    total_df = None
+    for df in frames:
+        total_df = df if total_df is None else pd.concat([total_df, df], axis=0)
+    return total_df
+
+
+def collect(frames):
+    collector = DatasetCollector()
+    for df in frames:
+        collector.add(df)
+    return collector.result()
+
+
+def main(ticker_counts=(250, 500, 1000, 2000)):
+    rng = np.random.default_rng(0)
+    print(f"{'tickers':>8} {'growing concat (s)':>20} {'DatasetCollector (s)':>22}")
+    for n_tickers in ticker_counts:
+        frames = [make_final_data(f"T{i}", rng) for i in range(n_tickers)]
+        timings = []
+        for assemble in [append_to_growing_frame, collect]:
+            start = time.perf_counter()
+            assemble(frames)
+            timings.append(time.perf_counter() - start)
+        print(f"{n_tickers:>8} {timings[0]:>20.3f} {timings[1]:>22.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmarks the scrape and parse throughput of DatasetBuilder offline.
+
+Synthetic statements and prices are recorded for every ticker, served by a
+StandInServer with a fixed latency per request, and built with an increasing
+number of ticker and request workers. No API key or network access is needed.
+Run from the repository root:
+
+    python benchmarks/benchmark_throughput.py
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from investment_dataset_builder import (  # noqa
+    DatasetBuilder,
+    DataScraper,
+    HttpClient,
+    ReplayStore,
+    StandInServer,
+)
+from investment_dataset_builder.data_parser import features  # noqa
+
+N_TICKERS = 40
+N_QUARTERS = 40
+LATENCY = 0.05
+API_KEY = "benchmark-key"
+
+
+def make_records(key: str, period_ends: pd.DatetimeIndex, rng: np.random.Generator):
+    """Returns statement records shaped like a Financial Modeling Prep response."""
+    records = []
+    for date in period_ends:
+        record = {"date": str(date.date()), "period": f"Q{date.quarter}"}
+        for col in features[key][2:]:
+            record[col] = float(rng.normal()) + 2.0
+        records.append(record)
+    return records
+
+
+def make_prices(period_ends: pd.DatetimeIndex, rng: np.random.Generator):
+    """Returns a random walk of daily prices covering every period."""
+    days = pd.bdate_range(
+        period_ends[-1] - pd.Timedelta(days=200), "2022-12-31", name="Date"
+    )
+    close = 100 + np.cumsum(rng.normal(size=len(days)))
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Adj Close": close,
+            "Volume": 1e6,
+        },
+        index=days,
+    )
+
+
+def record_tickers(store: ReplayStore, tickers, rng: np.random.Generator):
+    """Records the company endpoints and prices of every ticker in the store."""
+    period_ends = pd.date_range(end="2022-12-31", periods=N_QUARTERS, freq="Q")[::-1]
+    prices = {}
+    for ticker in tickers:
+        scraper = DataScraper(ticker, API_KEY, lazy=True)
+        responses = {
+            "info": [
+                {
+                    "symbol": ticker,
+                    "companyName": f"{ticker} Inc.",
+                    "currency": "USD",
+                    "exchange": "NASDAQ",
+                    "industry": "Software",
+                    "sector": "Technology",
+                }
+            ]
+        }
+        for key in ["ratios", "metrics", "is"]:
+            responses[key] = make_records(key, period_ends, rng)
+        for data_type, body in responses.items():
+            url = scraper.get_fmp_api_url(data_type)
+            store.save_response(url, json.dumps(body).encode())
+        prices[ticker] = make_prices(period_ends, rng)
+    store.save_prices(prices)
+
+
+def build(server: StandInServer, tickers, ticker_workers: int, request_workers: int):
+    client = HttpClient(max_retries=0)
+    builder = DatasetBuilder(
+        ticker_workers=ticker_workers,
+        request_workers=request_workers,
+        client=client,
+        profile_batch_size=None,
+        base_url=server.base_url,
+        yahoo_url=server.yahoo_url,
+        api_key=API_KEY,
+    )
+    try:
+        # build_dataset prints its progress for every ticker
+        with contextlib.redirect_stdout(io.StringIO()):
+            builder.build_dataset(tickers=tickers)
+    finally:
+        client.close()
+    return builder
+
+
+def main(workers=((1, 1), (1, 4), (4, 4), (8, 4))):
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i}" for i in range(N_TICKERS)]
+    print(
+        f"{'ticker workers':>15} {'request workers':>16} {'time (s)':>10} "
+        f"{'tickers/s':>10} {'failed':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReplayStore(directory)
+        record_tickers(store, tickers, rng)
+        with StandInServer(store, latency=LATENCY) as server:
+            for ticker_workers, request_workers in workers:
+                start = time.perf_counter()
+                builder = build(server, tickers, ticker_workers, request_workers)
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{ticker_workers:>15} {request_workers:>16} {elapsed:>10.2f} "
+                    f"{N_TICKERS / elapsed:>10.1f} {len(builder._failed_tickers):>7}"
+                )
+
+
+if __name__ == "__main__":
+    main()
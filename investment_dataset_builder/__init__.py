@@ -1,3 +1,16 @@
 from .data_scraper import DataScraper
 from .data_parser import DataParser
+from .batch_data_parser import BatchDataParser
+from .arrow_backend import ArrowBatchParser
 from .dataset_builder import DatasetBuilder
+from .compact_dtypes import DtypeCompactor
+from .dataset_collector import DatasetCollector
+from .parquet_sink import ParquetSink
+from .build_manifest import BuildManifest
+from .http_client import HttpClient
+from .response_cache import ResponseCache
+from .price_store import PriceStore
+from .rate_limiter import RateLimiter
+from .replay import ReplayStore, RecordingClient, ReplayClient, StandInServer
+from .returns_engine import ReturnsEngine
+from .panel_index import AsOfLookup
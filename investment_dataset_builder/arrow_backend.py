@@ -0,0 +1,389 @@
+from collections.abc import Mapping
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .batch_data_parser import BatchDataParser
+from .data_parser import DataParser, features, get_snp_500_aggregates
+from .returns_engine import DEFAULT_HORIZONS
+
+# The column of ArrowBatchParser.final_data holding the DataParser index labels
+INDEX_COLUMN = "index"
+
+
+def table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """
+    Converts a table in the ArrowBatchParser.final_data layout to a DataFrame indexed
+    like BatchDataParser.final_data.
+
+    Args:
+        table (pa.Table): The columns of final_data followed by INDEX_COLUMN.
+
+    Returns:
+        pd.DataFrame: The same data, with duplicate column names kept.
+    """
+    names = table.column_names
+    positional = table.rename_columns([str(i) for i in range(len(names))])
+    df = positional.to_pandas()
+    df.index = pd.Index(df.pop(str(len(names) - 1)).values)
+    df.columns = names[:-1]
+    return df
+
+
+class ArrowBatchParser(BatchDataParser):
+    """
+    A BatchDataParser that runs the parsing stages on Arrow tables instead of pandas.
+
+    Endpoint parsing, date handling, index construction, filtering, joins, PE ratios
+    and returns are all done with Arrow arrays and pyarrow.compute kernels, and the
+    joins are planned with index_in/take rather than pandas index alignment. Daily
+    prices are aggregated into quarters with the same vectorized kernel as DataParser,
+    on zero-copy views of the Arrow data.
+
+    final_data is a pyarrow.Table with the same columns, in the same order and with the
+    same values as BatchDataParser.final_data, plus the index labels in INDEX_COLUMN.
+    It can be added straight to a ParquetSink, which is what DatasetBuilder does when
+    it streams a build with the 'arrow' backend, written to a single Parquet file with
+    write_parquet, or converted with to_pandas.
+
+    Args:
+        data_dictionaries (Dict[str, Dict[str, List]]): The DataScraper.data_dictionary of
+            every company, keyed by ticker.
+        return_horizons (Tuple[int], optional): The horizons, in quarters, that returns
+            are calculated over. Defaults to (1, 2, 3, 4).
+
+    Attributes:
+        final_data (pa.Table): The combined data of every parsed company, or None if no
+            company could be parsed.
+
+    """
+
+    def __init__(
+        self,
+        data_dictionaries: Dict[str, Dict[str, List]],
+        return_horizons: Tuple[int] = DEFAULT_HORIZONS,
+    ):
+        super().__init__(data_dictionaries, return_horizons)
+
+    @staticmethod
+    def stack_payloads(payloads: List, cols: List[str]) -> pa.Table:
+        """
+        Stacks endpoint payloads, JSON records or projected columns, into one table.
+
+        Consecutive payloads of the same kind are converted together, with one Arrow
+        array per column, and columns whose types differ between runs are cast to
+        float64, as pandas would upcast them.
+
+        Args:
+            payloads (List[List[Dict] or Dict[str, np.ndarray]]): The endpoint payloads.
+            cols (List[str]): The columns to keep.
+
+        Returns:
+            pa.Table: The requested columns of every payload.
+        """
+        chunks = []
+        for projected, run in groupby(payloads, key=lambda p: isinstance(p, Mapping)):
+            run = list(run)
+            if projected:
+                chunks.append(
+                    [
+                        pa.array(
+                            np.concatenate([np.asarray(p[col]) for p in run]),
+                            from_pandas=True,
+                        )
+                        for col in cols
+                    ]
+                )
+            else:
+                records = [record for payload in run for record in payload]
+                chunks.append([pa.array([r.get(col) for r in records]) for col in cols])
+        if not chunks:
+            chunks.append([pa.array([]) for col in cols])
+
+        arrays = []
+        for position in range(len(cols)):
+            column = [chunk[position] for chunk in chunks]
+            types = {array.type for array in column if array.type != pa.null()}
+            if len(types) > 1:
+                types = {pa.float64()}
+            if types:
+                column_type = types.pop()
+                column = [
+                    array if array.type == column_type else array.cast(column_type)
+                    for array in column
+                ]
+            arrays.append(pa.concat_arrays(column))
+        return pa.Table.from_arrays(arrays, names=cols)
+
+    def stack_endpoint(
+        self, key: str, tickers: List[str], symbols: List[str]
+    ) -> Tuple[pa.Table, np.ndarray]:
+        """
+        Stacks one statement endpoint of every company into a single table.
+
+        Args:
+            key (str): The endpoint, one of 'ratios', 'metrics' or 'is'.
+            tickers (List[str]): The companies to stack.
+            symbols (List[str]): The symbol of every company.
+
+        Returns:
+            Tuple[pa.Table, np.ndarray]: The relevant columns of every company plus
+                start_date, and the position in tickers of the company of every row.
+        """
+        cols = features[key]
+        payloads = [self.data_dictionaries[ticker][key] for ticker in tickers]
+        table = self.stack_payloads(payloads, cols)
+        lengths = [
+            len(p[cols[0]]) if isinstance(p, Mapping) else len(p) for p in payloads
+        ]
+        codes = np.repeat(np.arange(len(tickers)), lengths)
+
+        date = pc.strptime(table["date"], format="%Y-%m-%d", unit="ns")
+        start_date = pc.subtract(
+            date, pa.scalar(np.timedelta64(91, "D").astype("m8[ns]"))
+        )
+        table = table.set_column(cols.index("date"), "date", date)
+        table = table.append_column("start_date", start_date)
+        return table, codes
+
+    @staticmethod
+    def shift_ratio(
+        values: pa.Array, codes: np.ndarray, horizon: int
+    ) -> pa.ChunkedArray:
+        """
+        Returns the value horizon rows above every row, within the same company,
+        divided by the row's own value, or null where there is no such row.
+        """
+        positions = np.arange(len(codes)) - horizon
+        valid = positions >= 0
+        valid[valid] = codes[positions[valid]] == codes[valid]
+        shifted = pc.take(values, pa.array(np.where(valid, positions, 0), mask=~valid))
+        return pc.divide(shifted, values)
+
+    def parse(self) -> pa.Table:
+        """
+        Parses every company, stacking all companies that can be stacked.
+
+        Returns:
+            pa.Table: The combined data of every parsed company, in the order of
+                data_dictionaries, or None if no company could be parsed.
+        """
+        tickers, symbols = [], []
+        for ticker in self.data_dictionaries.keys():
+            try:
+                symbols.append(self.get_symbol(ticker))
+                tickers.append(ticker)
+            except AssertionError:
+                self.failed_tickers.append(ticker)
+        if not tickers:
+            return None
+
+        batch, codes, separate = self.parse_batch(tickers, symbols)
+        bounds = np.searchsorted(codes, np.arange(len(tickers) + 1))
+        pieces = {}
+        for code, ticker in enumerate(tickers):
+            if separate[code]:
+                try:
+                    df = self.parse_separately(ticker)
+                    pieces[ticker] = self.from_pandas(df)
+                except AssertionError:
+                    self.failed_tickers.append(ticker)
+            elif bounds[code + 1] > bounds[code]:
+                start, stop = bounds[code], bounds[code + 1]
+                pieces[ticker] = batch.slice(start, stop - start)
+            else:
+                self.failed_tickers.append(ticker)
+
+        order = list(self.data_dictionaries.keys())
+        self.tickers = [ticker for ticker in order if ticker in pieces]
+        self.failed_tickers = [t for t in order if t in self.failed_tickers]
+        if not self.tickers:
+            return None
+        if not separate.any():
+            return batch
+        # concat_tables matches columns by name, and start_date is repeated
+        names = batch.column_names
+        positional = [str(position) for position in range(len(names))]
+        tables = [pieces[ticker].rename_columns(positional) for ticker in self.tickers]
+        table = pa.concat_tables(tables, promote=True).combine_chunks()
+        return table.rename_columns(names)
+
+    def parse_batch(
+        self, tickers: List[str], symbols: List[str]
+    ) -> Tuple[pa.Table, np.ndarray, np.ndarray]:
+        """
+        Parses every company whose periods are unique within every endpoint in one
+        pass.
+
+        Args:
+            tickers (List[str]): The companies to parse.
+            symbols (List[str]): The symbol of every company.
+
+        Returns:
+            Tuple[pa.Table, np.ndarray, np.ndarray]: The combined data of every company
+                with at least one common period, the position in tickers of the company
+                of every row, and a boolean mask of the companies that have to be
+                parsed separately.
+        """
+        ratios, codes = self.stack_endpoint("ratios", tickers, symbols)
+        metrics, metrics_codes = self.stack_endpoint("metrics", tickers, symbols)
+        is_, is_codes = self.stack_endpoint("is", tickers, symbols)
+        tables = [ratios, metrics, is_]
+        all_codes = [codes, metrics_codes, is_codes]
+        keys, metrics_keys, is_keys = self.encode_periods(
+            all_codes,
+            [table["period"].to_numpy() for table in tables],
+            [table["date"].to_numpy() for table in tables],
+        )
+        separate = np.zeros(len(tickers), dtype=bool)
+        for table_keys, table_codes in zip([keys, metrics_keys, is_keys], all_codes):
+            counts = pc.value_counts(pa.array(table_keys))
+            duplicated = pc.filter(
+                counts.field("values"), pc.greater(counts.field("counts"), 1)
+            )
+            is_duplicated = pc.is_in(table_keys, value_set=duplicated)
+            separate[table_codes[is_duplicated.to_numpy(zero_copy_only=False)]] = True
+
+        start_dates = ratios["start_date"].to_numpy()
+        end_dates = ratios["date"].to_numpy()
+        average, high, low, has_price = DataParser.aggregate_price_periods(
+            *self.stack_price(tickers),
+            self.encode_dates(codes, start_dates),
+            self.encode_dates(codes, end_dates),
+        )
+        snp_average, snp_high, snp_low, has_snp = get_snp_500_aggregates(
+            start_dates, end_dates
+        )
+
+        # Keep the periods common to every endpoint, in the order of ratios
+        keep = (
+            np.isin(keys, metrics_keys)
+            & np.isin(keys, is_keys)
+            & has_price
+            & ~separate[codes]
+        )
+        # DataParser rejects a company with a period the S&P 500 data does not cover
+        no_snp = np.zeros(len(tickers), dtype=bool)
+        no_snp[codes[keep & ~has_snp]] = True
+        keep &= ~no_snp[codes]
+        ratios = ratios.filter(pa.array(keep))
+        codes = codes[keep]
+        keys = pa.array(keys[keep])
+        metrics = metrics.take(
+            self.index_in(keys, metrics_keys, metrics_codes, separate)
+        )
+        is_ = is_.take(self.index_in(keys, is_keys, is_codes, separate))
+        symbol = pa.array(symbols, type=pa.string()).take(pa.array(codes))
+        year = pc.cast(pc.year(ratios["date"]), pa.string())
+        labels = pc.binary_join_element_wise(symbol, ratios["period"], year, "-")
+
+        price_position = (np.cumsum(has_price) - 1)[keep]
+        snp_position = (np.cumsum(has_snp) - 1)[keep]
+        price = {
+            "stockPriceAverage": pa.array(average[price_position]),
+            "stockPriceHigh": pa.array(high[price_position]),
+            "stockPriceLow": pa.array(low[price_position]),
+        }
+        snp_500 = {
+            column: pa.array(values[snp_position])
+            for column, values in [
+                ("S&P500PriceAverage", snp_average),
+                ("S&P500PriceHigh", snp_high),
+                ("S&P500PriceLow", snp_low),
+            ]
+        }
+
+        eps = pc.multiply(pc.cast(is_["eps"], pa.float64()), 4)
+        pe_ratios = {
+            "PE_avg": pc.divide(price["stockPriceAverage"], eps),
+            "PE_low": pc.divide(price["stockPriceLow"], eps),
+            "PE_high": pc.divide(price["stockPriceHigh"], eps),
+        }
+
+        stock_values = pc.cast(price["stockPriceAverage"], pa.float64())
+        snp_values = snp_500["S&P500PriceAverage"]
+        returns = {}
+        for i in self.returns_engine.horizons:
+            stock_ratio = self.shift_ratio(stock_values, codes, i)
+            snp_ratio = self.shift_ratio(snp_values, codes, i)
+            price[f"stockPriceRatio_{i}Q"] = stock_ratio
+            snp_500[f"snpPriceRatio_{i}Q"] = snp_ratio
+            returns[f"priceRatioRelativeToS&P_{i}Q"] = pc.divide(stock_ratio, snp_ratio)
+
+        names, arrays = [], []
+        to_drop = ["date", "period"]
+        for table, excluded in [
+            (ratios, []),
+            (pe_ratios, []),
+            (metrics, to_drop),
+            (is_, to_drop),
+            (price, []),
+            (snp_500, []),
+            (returns, []),
+        ]:
+            columns = table.column_names if isinstance(table, pa.Table) else table
+            for name in columns:
+                if name not in excluded:
+                    names.append(name)
+                    arrays.append(table[name])
+        names.append(INDEX_COLUMN)
+        arrays.append(labels)
+        final_data = pa.Table.from_arrays(arrays, names=names)
+        return final_data, codes, separate
+
+    @staticmethod
+    def index_in(
+        keys: pa.Array, table_keys: np.ndarray, codes: np.ndarray, separate: np.ndarray
+    ) -> pa.Array:
+        """
+        Returns the position in a stacked endpoint of every key, ignoring the rows of
+        the companies that are parsed separately, whose keys need not be unique.
+        """
+        candidates = np.flatnonzero(~separate[codes])
+        positions = pc.index_in(keys, value_set=pa.array(table_keys[candidates]))
+        return pa.array(candidates).take(positions)
+
+    @staticmethod
+    def from_pandas(df: pd.DataFrame) -> pa.Table:
+        """Converts a DataParser.final_data DataFrame to the final_data table layout."""
+        arrays = [
+            pa.array(df.iloc[:, position], from_pandas=True)
+            for position in range(df.shape[1])
+        ]
+        arrays.append(pa.array(df.index.astype(str)))
+        return pa.Table.from_arrays(arrays, names=list(df.columns) + [INDEX_COLUMN])
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Converts final_data to a DataFrame indexed like BatchDataParser.final_data.
+
+        Returns:
+            pd.DataFrame: The combined data of every parsed company, or None.
+        """
+        if self.final_data is None:
+            return None
+        return table_to_pandas(self.final_data)
+
+    def write_parquet(self, path: Union[str, Path]) -> None:
+        """
+        Writes final_data to a Parquet file without converting it through pandas.
+
+        As in DatasetBuilder.clean_up_dataframe, the start_date columns are left out,
+        so that every column name is unique.
+
+        Args:
+            path (str or Path): The file to write.
+        """
+        assert self.final_data is not None, "No data to write"
+        keep = [
+            position
+            for position, name in enumerate(self.final_data.column_names)
+            if name != "start_date"
+        ]
+        pq.write_table(self.final_data.select(keep), path)
@@ -0,0 +1,409 @@
+from collections.abc import Mapping
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .data_parser import DataParser, features, get_snp_500_aggregates
+from .json_decoder import project_records
+from .returns_engine import ReturnsEngine, DEFAULT_HORIZONS
+
+# Daily and period dates of all tickers are searched together, keyed by
+# ticker * _DAY_SPAN + day, so that every ticker occupies its own range of keys.
+_DAY_OFFSET = 2**20
+_DAY_SPAN = 2**21
+
+
+class BatchDataParser:
+    """
+    A class used to parse the data of many companies in one vectorized pass.
+
+    The result is the same as running a DataParser for every company and concatenating
+    their final_data, but every endpoint is stacked into one long frame with a ticker
+    key first, so the date parsing, index construction, period aggregation, filtering,
+    PE calculation, returns and the final join are each run once for the whole batch
+    instead of once per company.
+
+    Rows are matched across endpoints by an int64 key per (company, period, year)
+    rather than by 'TICKER-PERIOD-YEAR' strings, which are only built for the rows
+    that are kept.
+
+    Companies that DataParser would reject (no periods common to every endpoint, or a
+    period that the S&P 500 data does not cover) are skipped and listed in
+    failed_tickers. A company whose periods are not unique within
+    an endpoint cannot be stacked, and is parsed separately with DataParser instead.
+
+    Args:
+        data_dictionaries (Dict[str, Dict[str, List]]): The DataScraper.data_dictionary of
+            every company, keyed by ticker.
+        return_horizons (Tuple[int], optional): The horizons, in quarters, that returns
+            are calculated over. Defaults to (1, 2, 3, 4).
+
+    Attributes:
+        data_dictionaries (Dict[str, Dict[str, List]]): The parsed data dictionaries.
+        tickers (List[str]): The tickers that were parsed successfully, in order.
+        failed_tickers (List[str]): The tickers that could not be parsed.
+        returns_engine (ReturnsEngine): The engine used to calculate returns.
+        final_data (pd.DataFrame): The combined data of every parsed company, or None if
+            no company could be parsed.
+
+    Methods:
+        stack_endpoint(key: str, tickers: List[str], symbols: List[str]):
+            Stacks one endpoint of every company into a single frame.
+        encode_periods(codes: List[np.ndarray], periods: List, dates: List):
+            Returns an integer key of every (company, period, year) of endpoints.
+        stack_price(tickers: List[str]):
+            Stacks the daily prices of every company into sorted arrays.
+        parse():
+            Parses every company and returns the combined data.
+        parse_batch(tickers: List[str], symbols: List[str]):
+            Parses the stackable companies in one pass.
+        parse_separately(ticker: str) -> pd.DataFrame:
+            Parses a single company with DataParser.
+        to_pandas() -> pd.DataFrame:
+            Returns the combined data as a DataFrame.
+
+    """
+
+    def __init__(
+        self,
+        data_dictionaries: Dict[str, Dict[str, List]],
+        return_horizons: Tuple[int] = DEFAULT_HORIZONS,
+    ):
+        self.data_dictionaries = data_dictionaries
+        self.returns_engine = ReturnsEngine(return_horizons)
+        self.failed_tickers = []
+        self.tickers = []
+        self.final_data = self.parse()
+
+    def get_symbol(self, ticker: str) -> str:
+        """
+        Returns the symbol the company's rows are indexed by, as DataParser does.
+
+        Raises:
+            AssertionError: If the company has no info or a required endpoint.
+        """
+        data_dictionary = self.data_dictionaries[ticker]
+        for key in ["info", "ratios", "metrics", "is", "price"]:
+            assert key in data_dictionary.keys(), "invalid key"
+        info = data_dictionary["info"]
+        assert len(info) >= 1, "No company info"
+        return info[0]["symbol"]
+
+    def stack_endpoint(
+        self, key: str, tickers: List[str], symbols: List[str]
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Stacks one statement endpoint of every company into a single frame.
+
+        Args:
+            key (str): The endpoint, one of 'ratios', 'metrics' or 'is'.
+            tickers (List[str]): The companies to stack.
+            symbols (List[str]): The symbol of every company.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray]: The relevant columns of every company plus
+                start_date, and the position in tickers of the company of every row.
+        """
+        cols = features[key]
+        payloads = [self.data_dictionaries[ticker][key] for ticker in tickers]
+        if not any(isinstance(payload, Mapping) for payload in payloads):
+            records = [record for payload in payloads for record in payload]
+            lengths = [len(payload) for payload in payloads]
+            df = pd.DataFrame(records, columns=cols)
+        else:
+            columns = [
+                (
+                    payload
+                    if isinstance(payload, Mapping)
+                    else project_records(payload, cols)
+                )
+                for payload in payloads
+            ]
+            lengths = [len(column[cols[0]]) for column in columns]
+            df = pd.DataFrame(
+                {
+                    col: np.concatenate([np.asarray(column[col]) for column in columns])
+                    for col in cols
+                }
+            ).infer_objects()
+
+        codes = np.repeat(np.arange(len(tickers)), lengths)
+        df["date"] = DataParser.create_date_objects_from_strings(df["date"])
+        df["start_date"] = DataParser.create_period_start_date_feature(df["date"])
+        return df, codes
+
+    def stack_price(
+        self, tickers: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stacks the daily prices of every company into arrays sorted by ticker and date.
+
+        Args:
+            tickers (List[str]): The companies to stack.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The ticker and day
+                keys, highs, lows and closes of every daily bar.
+        """
+        keys, highs, lows, closes = [], [], [], []
+        for code, ticker in enumerate(tickers):
+            price = self.data_dictionaries[ticker]["price"]
+            dates = DataParser.create_date_objects_from_pd_timestamps(price.index)
+            keys.append(self.encode_dates(np.full(len(price), code), dates))
+            highs.append(np.asarray(price["High"]))
+            lows.append(np.asarray(price["Low"]))
+            closes.append(np.asarray(price["Close"]))
+        keys = np.concatenate(keys)
+        order = np.argsort(keys, kind="stable")
+        return (
+            keys[order],
+            np.concatenate(highs)[order],
+            np.concatenate(lows)[order],
+            np.concatenate(closes)[order],
+        )
+
+    @staticmethod
+    def encode_dates(codes: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """Returns a sortable int64 key of every (ticker code, datetime64 date) pair."""
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        return codes.astype(np.int64) * _DAY_SPAN + (days + _DAY_OFFSET)
+
+    @staticmethod
+    def encode_periods(
+        codes: List[np.ndarray], periods: List[np.ndarray], dates: List[np.ndarray]
+    ) -> List[np.ndarray]:
+        """
+        Returns an int64 key of every (ticker code, period, year) of several endpoints,
+        equal between rows that DataParser.create_df_index gives the same label.
+
+        Args:
+            codes (List[np.ndarray]): The ticker code of every row of every endpoint.
+            periods (List[np.ndarray]): The period of every row of every endpoint.
+            dates (List[np.ndarray]): The datetime64 date of every row of every
+                endpoint.
+
+        Returns:
+            List[np.ndarray]: The key of every row of every endpoint.
+        """
+        period_codes, uniques = pd.factorize(np.concatenate(periods))
+        years = np.concatenate(dates).astype("datetime64[Y]").astype(np.int64)
+        keys = (
+            np.concatenate(codes).astype(np.int64) * 2**16 + years + 2**15
+        ) * max(len(uniques), 1) + period_codes
+        return np.split(keys, np.cumsum([len(c) for c in codes])[:-1])
+
+    def parse(self) -> pd.DataFrame:
+        """
+        Parses every company, stacking all companies that can be stacked.
+
+        Returns:
+            pd.DataFrame: The combined data of every parsed company, in the order of
+                data_dictionaries, or None if no company could be parsed.
+        """
+        tickers, symbols = [], []
+        for ticker in self.data_dictionaries.keys():
+            try:
+                symbols.append(self.get_symbol(ticker))
+                tickers.append(ticker)
+            except AssertionError:
+                self.failed_tickers.append(ticker)
+        if not tickers:
+            return None
+
+        batch, codes, separate = self.parse_batch(tickers, symbols)
+        bounds = np.searchsorted(codes, np.arange(len(tickers) + 1))
+        pieces = {}
+        for code, ticker in enumerate(tickers):
+            if separate[code]:
+                try:
+                    df = self.parse_separately(ticker)
+                    pieces[ticker] = (df, 0, len(df))
+                except AssertionError:
+                    self.failed_tickers.append(ticker)
+            elif bounds[code + 1] > bounds[code]:
+                pieces[ticker] = (batch, bounds[code], bounds[code + 1])
+            else:
+                self.failed_tickers.append(ticker)
+
+        order = list(self.data_dictionaries.keys())
+        self.tickers = [ticker for ticker in order if ticker in pieces]
+        self.failed_tickers = [t for t in order if t in self.failed_tickers]
+        if not self.tickers:
+            return None
+        if not separate.any():
+            return batch
+        return pd.concat(
+            [df.iloc[start:stop] for df, start, stop in map(pieces.get, self.tickers)],
+            axis=0,
+        )
+
+    def parse_batch(
+        self, tickers: List[str], symbols: List[str]
+    ) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """
+        Parses every company whose periods are unique within every endpoint in one
+        pass.
+
+        Args:
+            tickers (List[str]): The companies to parse.
+            symbols (List[str]): The symbol of every company.
+
+        Returns:
+            Tuple[pd.DataFrame, np.ndarray, np.ndarray]: The combined data of every
+                company with at least one common period, the position in tickers of the
+                company of every row, and a boolean mask of the companies that have to
+                be parsed separately.
+        """
+        ratios, codes = self.stack_endpoint("ratios", tickers, symbols)
+        metrics, metrics_codes = self.stack_endpoint("metrics", tickers, symbols)
+        is_, is_codes = self.stack_endpoint("is", tickers, symbols)
+        frames = [ratios, metrics, is_]
+        all_codes = [codes, metrics_codes, is_codes]
+        keys, metrics_keys, is_keys = self.encode_periods(
+            all_codes,
+            [df["period"].values for df in frames],
+            [df["date"].values for df in frames],
+        )
+        separate = np.zeros(len(tickers), dtype=bool)
+        for df_keys, df_codes in zip([keys, metrics_keys, is_keys], all_codes):
+            separate[df_codes[pd.Series(df_keys).duplicated(keep=False).values]] = True
+
+        start_dates = ratios["start_date"].values
+        end_dates = ratios["date"].values
+        average, high, low, has_price = DataParser.aggregate_price_periods(
+            *self.stack_price(tickers),
+            self.encode_dates(codes, start_dates),
+            self.encode_dates(codes, end_dates),
+        )
+        snp_average, snp_high, snp_low, has_snp = get_snp_500_aggregates(
+            start_dates, end_dates
+        )
+
+        # Keep the periods common to every endpoint, in the order of ratios
+        keep = (
+            np.isin(keys, metrics_keys)
+            & np.isin(keys, is_keys)
+            & has_price
+            & ~separate[codes]
+        )
+        # DataParser rejects a company with a period the S&P 500 data does not cover
+        no_snp = np.zeros(len(tickers), dtype=bool)
+        no_snp[codes[keep & ~has_snp]] = True
+        keep &= ~no_snp[codes]
+        codes = codes[keep]
+        ratios = ratios.loc[keep]
+        years = pd.DatetimeIndex(ratios["date"]).year.astype(str).values
+        labels = (
+            np.asarray(symbols, dtype=object)[codes] + "-" + ratios["period"].values
+        )
+        labels = pd.Index(labels + "-" + years)
+        ratios.index = labels
+        metrics = self.take_keys(metrics, metrics_keys, keys[keep], labels)
+        is_ = self.take_keys(is_, is_keys, keys[keep], labels)
+
+        price_position = (np.cumsum(has_price) - 1)[keep]
+        price = pd.DataFrame(
+            {
+                "stockPriceAverage": average[price_position],
+                "stockPriceHigh": high[price_position],
+                "stockPriceLow": low[price_position],
+            },
+            index=labels,
+        )
+        snp_position = (np.cumsum(has_snp) - 1)[keep]
+        snp_500 = pd.DataFrame(
+            {
+                "S&P500PriceAverage": snp_average[snp_position],
+                "S&P500PriceHigh": snp_high[snp_position],
+                "S&P500PriceLow": snp_low[snp_position],
+            },
+            index=labels,
+        )
+
+        eps = is_["eps"]
+        # ratios is a selection of the parsed ratios, so the columns are assigned
+        # to a new frame rather than set on it
+        ratios = ratios.assign(
+            PE_avg=price["stockPriceAverage"] / (4 * eps),
+            PE_low=price["stockPriceLow"] / (4 * eps),
+            PE_high=price["stockPriceHigh"] / (4 * eps),
+        )
+
+        prices = pd.DataFrame(
+            {
+                "stock": price["stockPriceAverage"].values,
+                "snp": snp_500["S&P500PriceAverage"].values,
+            },
+            index=labels,
+        )
+        ratios_by_horizon = self.returns_engine.calculate_price_ratios(prices, codes)
+        returns = pd.DataFrame(index=labels)
+        for i, ratio in ratios_by_horizon.items():
+            price[f"stockPriceRatio_{i}Q"] = ratio["stock"].values
+        for i, ratio in ratios_by_horizon.items():
+            snp_500[f"snpPriceRatio_{i}Q"] = ratio["snp"].values
+        for i in self.returns_engine.horizons:
+            returns[f"priceRatioRelativeToS&P_{i}Q"] = (
+                price[f"stockPriceRatio_{i}Q"] / snp_500[f"snpPriceRatio_{i}Q"]
+            )
+
+        to_drop = ["date", "period"]
+        to_join = [
+            (ratios, []),
+            (metrics, to_drop),
+            (is_, to_drop),
+            (price, []),
+            (snp_500, []),
+            (returns, []),
+        ]
+        final_data = DataParser.join_aligned_dataframes(to_join, labels)
+        return final_data, codes, separate
+
+    @staticmethod
+    def take_keys(
+        df: pd.DataFrame, df_keys: np.ndarray, keys: np.ndarray, labels: pd.Index
+    ) -> pd.DataFrame:
+        """
+        Returns the rows of df whose key is in keys, in the order of keys.
+
+        Args:
+            df (pd.DataFrame): The stacked endpoint.
+            df_keys (np.ndarray): The key of every row of df.
+            keys (np.ndarray): The keys to select. Every key must be in df_keys, and
+                be unique within it.
+            labels (pd.Index): The index of the result.
+
+        Returns:
+            pd.DataFrame: The selected rows, indexed by labels.
+        """
+        candidates = np.flatnonzero(np.isin(df_keys, keys))
+        positions = pd.Index(df_keys[candidates]).get_indexer(keys)
+        df = df.take(candidates[positions])
+        df.index = labels
+        return df
+
+    def parse_separately(self, ticker: str) -> pd.DataFrame:
+        """
+        Parses a single company with DataParser.
+
+        Args:
+            ticker (str): The company to parse.
+
+        Returns:
+            pd.DataFrame: The company's DataParser.final_data.
+
+        Raises:
+            AssertionError: If DataParser rejects the company.
+        """
+        data_dictionary = self.data_dictionaries[ticker]
+        return DataParser(data_dictionary, self.returns_engine.horizons).final_data
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Returns final_data as a DataFrame, as every parsing backend does.
+
+        Returns:
+            pd.DataFrame: The combined data of every parsed company, or None.
+        """
+        return self.final_data
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+# The manifest file of a streamed build, which pyarrow skips when reading the dataset
+MANIFEST_NAME = "_manifest.jsonl"
+
+# The states of a ticker in the manifest
+WRITTEN = "written"
+DONE = "done"
+FAILED = "failed"
+RETRY = "retry"
+
+
+class BuildManifest:
+    """
+    A persistent record of the progress of a streamed DatasetBuilder build.
+
+    Every event is appended as one JSON line and flushed to disk straight away, so the
+    manifest survives a crash or a kernel restart at any point. A ticker is recorded as
+    written, with the ParquetSink part its rows were written to, once it is parsed; as
+    done once that part has been committed, i.e. its files are complete on disk; as
+    failed, with the reason; or as retry, with the reason, if it failed for a transient
+    reason such as throttling or a dropped connection. A resumed build skips every done
+    or failed ticker, and redoes the tickers to retry and those whose part was never
+    committed.
+
+    Args:
+        path (str or Path): The manifest file. It is created if it does not exist, and
+            read back if it does.
+
+    Attributes:
+        path (Path): The manifest file.
+        tickers (Dict[str, Dict]): The latest entry of every ticker, holding its state,
+            part and failure reason.
+        committed_parts (set): The parts that have been committed.
+
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tickers = {}
+        self.committed_parts = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.load()
+
+    def load(self) -> None:
+        """Replays every event in the manifest file."""
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # a line cut short by a crash while it was being written
+                    continue
+                self.apply(event)
+
+    def apply(self, event: Dict) -> None:
+        """Applies one event to the in-memory state."""
+        if event["event"] == "commit":
+            self.committed_parts.add(event["part"])
+        else:
+            self.tickers[event["ticker"]] = {
+                "state": event["event"],
+                "part": event.get("part"),
+                "reason": event.get("reason"),
+            }
+
+    def append(self, events: List[Dict]) -> None:
+        """Applies events and appends them to the manifest file."""
+        if not events:
+            return
+        with self._lock:
+            with open(self.path, "a") as f:
+                for event in events:
+                    event["time"] = time.time()
+                    f.write(json.dumps(event) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for event in events:
+                self.apply(event)
+
+    def record_written(self, tickers: Iterable[str], part: int) -> None:
+        """Records that the rows of tickers were written to a part."""
+        self.append(
+            [{"event": WRITTEN, "ticker": ticker, "part": part} for ticker in tickers]
+        )
+
+    def record_failed(self, failures: Dict[str, str], retryable: bool = False) -> None:
+        """
+        Records tickers that could not be scraped or parsed, with the reason.
+
+        Args:
+            failures (Dict[str, str]): The reason every ticker failed, keyed by ticker.
+            retryable (bool, optional): Whether the tickers failed for a transient
+                reason and should be tried again by a resumed build. Defaults to False.
+        """
+        event = RETRY if retryable else FAILED
+        self.append(
+            [
+                {"event": event, "ticker": ticker, "reason": reason}
+                for ticker, reason in failures.items()
+            ]
+        )
+
+    def record_committed(self, part: int) -> None:
+        """Records that every file of a part is complete."""
+        self.append([{"event": "commit", "part": part}])
+
+    def get_state(self, ticker: str) -> str:
+        """
+        Returns the state of a ticker.
+
+        Args:
+            ticker (str): The ticker.
+
+        Returns:
+            str: 'done', 'failed', 'retry' or 'written', or None if the ticker has not
+                been recorded.
+        """
+        entry = self.tickers.get(ticker)
+        if entry is None:
+            return None
+        if entry["state"] == WRITTEN and entry["part"] in self.committed_parts:
+            return DONE
+        return entry["state"]
+
+    def get_tickers(self, state: str) -> List[str]:
+        """Returns the tickers in a state, in the order they were first recorded."""
+        return [ticker for ticker in self.tickers if self.get_state(ticker) == state]
+
+    def get_next_part(self) -> int:
+        """
+        Returns a part number that no event in the manifest refers to, so that rows of
+        a resumed build are never attributed to a part of the interrupted one.
+        """
+        parts = [entry["part"] for entry in self.tickers.values()]
+        parts = [part for part in parts if part is not None]
+        return max(parts + list(self.committed_parts), default=-1) + 1
+
+    def get_failure_reasons(self) -> Dict[str, str]:
+        """Returns the failure reason of every failed ticker, including those to retry."""
+        return {
+            ticker: entry["reason"]
+            for ticker, entry in self.tickers.items()
+            if entry["state"] in (FAILED, RETRY)
+        }
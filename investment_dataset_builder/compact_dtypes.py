@@ -0,0 +1,113 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .data_parser import features
+
+# Descriptive columns that repeat one of a few values on every row of a company
+CATEGORICAL_COLUMNS = tuple(features["info"]) + ("period",)
+
+# Ratio features, whose values are far within float32 range and whose precision is
+# limited by the reported statements rather than by float64
+FLOAT32_COLUMNS = tuple(features["ratios"][2:]) + ("PE_avg", "PE_low", "PE_high")
+
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+class DtypeCompactor:
+    """
+    Converts a dataset to compact dtypes and reports the memory saved.
+
+    Descriptive string columns are stored as categoricals, which keep one copy of every
+    distinct value plus small integer codes per row, and are written to Parquet as
+    dictionary-encoded columns. Optionally, the ratio features are downcast to float32.
+    Prices, returns and every other float column are left as float64, and a column is
+    only downcast if all of its finite values fit in float32.
+
+    Args:
+        categorical_columns (Iterable[str], optional): The columns to store as
+            categoricals, if present. Defaults to CATEGORICAL_COLUMNS.
+        float32 (bool, optional): Whether to downcast float32_columns to float32.
+            Defaults to False.
+        float32_columns (Iterable[str], optional): The float columns that may be
+            downcast. Defaults to FLOAT32_COLUMNS.
+
+    Attributes:
+        memory_before (int): The deep memory usage, in bytes, of the last dataset
+            before it was compacted.
+        memory_after (int): The deep memory usage, in bytes, of the compacted dataset.
+
+    """
+
+    def __init__(
+        self,
+        categorical_columns: Iterable[str] = CATEGORICAL_COLUMNS,
+        float32: bool = False,
+        float32_columns: Iterable[str] = FLOAT32_COLUMNS,
+    ):
+        self.categorical_columns = set(categorical_columns)
+        self.float32 = float32
+        self.float32_columns = set(float32_columns)
+        self.memory_before = None
+        self.memory_after = None
+
+    @property
+    def memory_saved(self) -> int:
+        """The number of bytes saved by the last call to compact."""
+        assert self.memory_before is not None, "No dataset has been compacted"
+        return self.memory_before - self.memory_after
+
+    def get_dtypes(self, df: pd.DataFrame) -> dict:
+        """
+        Returns the compact dtype of every column that should be converted.
+
+        Args:
+            df (pd.DataFrame): The dataset.
+
+        Returns:
+            dict: The new dtype, keyed by column name.
+        """
+        dtypes = {}
+        for position, name in enumerate(df.columns):
+            dtype = df.dtypes.iloc[position]
+            if name in self.categorical_columns and dtype == object:
+                dtypes[name] = "category"
+            elif self.float32 and name in self.float32_columns and dtype == np.float64:
+                values = df.iloc[:, position].values
+                finite = values[np.isfinite(values)]
+                if len(finite) == 0 or np.abs(finite).max() <= _FLOAT32_MAX:
+                    dtypes[name] = np.float32
+        return dtypes
+
+    def compact(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the dataset with compact dtypes, recording its memory usage before and
+        after.
+
+        Args:
+            df (pd.DataFrame): The dataset.
+
+        Returns:
+            pd.DataFrame: The dataset with the same columns, index and values, with
+                categorical and downcast columns.
+        """
+        self.memory_before = int(df.memory_usage(deep=True).sum())
+        dtypes = self.get_dtypes(df)
+        compacted = df.astype(dtypes) if dtypes else df.copy()
+        self.memory_after = int(compacted.memory_usage(deep=True).sum())
+        return compacted
+
+    def report(self) -> str:
+        """
+        Returns a one-line summary of the memory saved by the last call to compact.
+
+        Returns:
+            str: e.g. 'Compacted dataset from 512.0 MB to 301.2 MB (saved 41.2%)'
+        """
+        saved = self.memory_saved
+        percentage = 100 * saved / self.memory_before if self.memory_before else 0.0
+        return (
+            f"Compacted dataset from {self.memory_before / 2**20:.1f} MB to "
+            f"{self.memory_after / 2**20:.1f} MB (saved {percentage:.1f}%)"
+        )
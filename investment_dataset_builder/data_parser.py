@@ -2,13 +2,137 @@ import pandas as pd
 from typing import Dict, List, Tuple
 import json
 from pathlib import Path
-import datetime as dt
 import numpy as np
+import threading
+from .returns_engine import ReturnsEngine, DEFAULT_HORIZONS
 
 feature_path = Path.cwd() / "investment_dataset_builder" / "features.json"
 with open(feature_path, "r") as f:
     features = json.load(f)
 
+snp_500_path = (
+    Path.cwd()
+    / "investment_dataset_builder"
+    / "config_data"
+    / "snp500_trading_data_1970_to_2023.parquet"
+)
+
+# The S&P 500 series is the same for every company, so it is read once per process
+# and the aggregate of every (start, end) period is only ever computed once.
+_snp_500_lock = threading.Lock()
+_snp_500_data = None
+_snp_500_aggregates = {}
+
+
+def load_snp_500_data() -> pd.DataFrame:
+    """
+    Returns the S&P 500 daily trading data, reading the parquet file on first use only.
+
+    The file is memory-mapped rather than read into a buffer first, and the returned
+    DataFrame is shared by every DataParser in the process, so it must not be modified.
+
+    Returns:
+        pd.DataFrame: The S&P 500 daily trading data, sorted by date.
+    """
+    global _snp_500_data
+    with _snp_500_lock:
+        if _snp_500_data is None:
+            df = pd.read_parquet(snp_500_path, memory_map=True)
+            _snp_500_data = df.sort_index()
+        return _snp_500_data
+
+
+def get_snp_500_aggregates(
+    start_dates: np.ndarray, end_dates: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the S&P 500 average, high and low over the periods [start_dates, end_dates).
+
+    Aggregates are memoized per (start, end) pair for the lifetime of the process; only
+    the periods not seen before are aggregated, in a single vectorized pass.
+
+    Args:
+        start_dates (np.ndarray): The datetime64 start date of every period.
+        end_dates (np.ndarray): The datetime64 end date of every period.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The average, high and
+            low of the periods that have data, and a boolean mask of those periods.
+    """
+    keys = list(
+        zip(
+            start_dates.astype("datetime64[D]").astype(np.int64),
+            end_dates.astype("datetime64[D]").astype(np.int64),
+        )
+    )
+    df = load_snp_500_data()
+    with _snp_500_lock:
+        missing = sorted({key for key in keys if key not in _snp_500_aggregates})
+    if missing:
+        missing_starts = np.array([key[0] for key in missing], dtype="datetime64[D]")
+        missing_ends = np.array([key[1] for key in missing], dtype="datetime64[D]")
+        average, high, low, has_data = DataParser.aggregate_price_periods(
+            df.index.values.astype("datetime64[D]"),
+            df["High"].values,
+            df["Low"].values,
+            df["Close"].values,
+            missing_starts,
+            missing_ends,
+        )
+        values = iter(zip(average, high, low))
+        with _snp_500_lock:
+            for key, key_has_data in zip(missing, has_data):
+                _snp_500_aggregates[key] = next(values) if key_has_data else None
+
+    with _snp_500_lock:
+        aggregates = [_snp_500_aggregates[key] for key in keys]
+    has_data = np.array([aggregate is not None for aggregate in aggregates], dtype=bool)
+    found = [aggregate for aggregate in aggregates if aggregate is not None]
+    columns = np.array(found, dtype=np.float64).reshape(len(found), 3)
+    return columns[:, 0], columns[:, 1], columns[:, 2], has_data
+
+
+# The stages of DataParser and the stages each of them depends on. The stages of the
+# final_data stage are those of the requested outputs.
+STAGE_DEPENDENCIES = {
+    "info": [],
+    "statements": ["info"],
+    "price": ["statements"],
+    "filter": ["price"],
+    "snp_500": ["filter"],
+    "pe_ratios": ["filter"],
+    "internal_returns": ["snp_500"],
+    "returns": ["internal_returns"],
+    "final_data": [],
+}
+
+# The last stage that modifies each DataParser attribute
+ATTRIBUTE_STAGES = {
+    "info": "info",
+    "ratios": "pe_ratios",
+    "metrics": "filter",
+    "is_": "filter",
+    "price": "internal_returns",
+    "snp_500": "internal_returns",
+    "returns": "returns",
+    "final_data": "final_data",
+}
+
+# The feature groups that final_data can be combined from, in order, with the
+# attribute holding each group
+OUTPUT_ATTRIBUTES = {
+    "ratios": "ratios",
+    "metrics": "metrics",
+    "is": "is_",
+    "price": "price",
+    "snp_500": "snp_500",
+    "returns": "returns",
+}
+OUTPUT_STAGES = {
+    output: ATTRIBUTE_STAGES[attribute]
+    for output, attribute in OUTPUT_ATTRIBUTES.items()
+}
+
 
 class DataParser:
     """
@@ -29,6 +153,19 @@ class DataParser:
     Args:
         data_dictionary (Dict[str, List]): A dictionary containing data relevant to a 
             single company.
+        return_horizons (Tuple[int], optional): The horizons, in quarters, that
+            returns are calculated over. Defaults to (1, 2, 3, 4).
+        outputs (List[str], optional): The feature groups that final_data is combined
+            from, any of 'ratios', 'metrics', 'is', 'price', 'snp_500' and 'returns'.
+            Defaults to None, i.e. every group.
+        lazy (bool, optional): If True, no stage is evaluated until one of its outputs
+            is accessed. Defaults to False.
+
+    The parsing is a small graph of named stages (see STAGE_DEPENDENCIES) that are
+    evaluated on demand and only once: accessing an attribute that has not been set
+    yet evaluates the stage that produces it and the stages it depends on. Stages that
+    are not needed for the requested outputs, e.g. the S&P 500 aggregation and the
+    returns when only 'ratios' is requested, are never run.
 
     Attributes:
         data_dictionary (Dict[str, List]): A dictionary containing data relevant 
@@ -48,16 +185,24 @@ class DataParser:
         final_data (pd.DataFrame): A DataFrame containing all the relevant data 
             from info, ratios, metrics, is_, price, and snp_500 DataFrames combined.
         returns (pd.DataFrame): A DataFrame containing calculated relative returns.
+        returns_engine (ReturnsEngine): The engine used to calculate returns.
+        outputs (Tuple[str]): The feature groups that final_data is combined from.
 
     Methods:
+        evaluate(stage: str) -> None:
+            Evaluates a stage and the stages it depends on, unless already evaluated.
+
+        run_stage(stage: str) -> None:
+            Runs a single stage.
+
         json_to_dataframe(json_data: Dict[str, List]) -> pd.DataFrame:
             Converts JSON data to a pandas DataFrame.
         
         create_df_index(df: pd.DataFrame) -> pd.Index:
             Creates a pandas Index for the given DataFrame.
         
-        create_period_start_date_feature(date_string_array: np.array) -> List[str]:
-            Creates a start_date feature for the given date string array.
+        create_period_start_date_feature(date_array: np.array) -> np.ndarray:
+            Creates a datetime64 start_date feature for the given date array.
         
         parse_data_dictionary():
             Parses the data dictionary.
@@ -87,6 +232,10 @@ class DataParser:
         
         load_snp_500() -> pd.DataFrame:
             Loads and returns daily price data for the S&P500 index.
+
+        aggregate_snp_500() -> pd.DataFrame:
+            Returns the memoized S&P500 price averages, highs, and lows for the
+            company's periods.
         
         filter_daily_into_quarters(df: pd.DataFrame, tag: str='stock') -> pd.DataFrame:
         Filters the given DataFrame containing daily price data into quarters 
@@ -94,55 +243,157 @@ class DataParser:
         for each quarter.
     
         create_date_objects_from_strings(date_string_array: np.array) -> np.array:
-            Converts the given date string array to an array of date objects.
+            Converts the given date string array to a datetime64 array.
         
         create_date_objects_from_pd_timestamps(timestamp_array) -> np.array:
-            Converts the given pandas timestamp array to an array of date objects.
+            Converts the given pandas timestamp array to a datetime64 array of dates.
         
         calculate_PE_ratios() -> None:
             Calculates PE ratios for the company and updates the ratios DataFrame.
         
+        align_to_index(df: pd.DataFrame, index: pd.Index) -> pd.DataFrame:
+            Returns the rows of a DataFrame in the order of the given index.
+
         combine_dataframes() -> pd.DataFrame:
             Combines info, ratios, metrics, is, price, and snp_500 DataFrames into a 
             single DataFrame.
+
+        join_aligned_dataframes(to_join: List, index: pd.Index) -> pd.DataFrame:
+            Joins DataFrames that share the same index into preallocated blocks.
         
         calculate_internal_returns() -> List:
             Calculates returns for the company's stock price and the S&P 500 index,
-            with a lag of 1, 2, 3, or 4 quarters, and stores them in the respective
-            DataFrames.
+            over each return horizon (by default 1, 2, 3, and 4 quarters), and stores
+            them in the respective DataFrames.
         
         calculate_relative_returns() -> pd.DataFrame:
             Calculates the returns of the company's stock price relative to the 
-            S&P 500 index returns, with a lag of 1, 2, 3, or 4 quarters, and 
-            returns a DataFrame containing these values.
+            S&P 500 index returns over each return horizon, and returns a
+            DataFrame containing these values.
 
     """
 
-    def __init__(self, data_dictionary: Dict[str, List]):
+    def __init__(
+        self,
+        data_dictionary: Dict[str, List],
+        return_horizons: Tuple[int] = DEFAULT_HORIZONS,
+        outputs: List[str] = None,
+        lazy: bool = False,
+    ):
         """
         Initializes a new instance of the DataParser class.
 
         Args:
             data_dictionary (Dict[str, List]): A dictionary containing data 
             relevant to a single company.
+            return_horizons (Tuple[int], optional): The horizons, in quarters, that
+            returns are calculated over. Defaults to (1, 2, 3, 4).
+            outputs (List[str], optional): The feature groups, keys of
+            OUTPUT_STAGES, that final_data is combined from. Defaults to None,
+            i.e. every group.
+            lazy (bool, optional): If True, no stage is evaluated until one of
+            its outputs is accessed. Defaults to False, i.e. final_data is
+            evaluated immediately.
 
         Returns:
             None
         """
+        self._evaluated_stages = set()
+        self._stage_outputs = {}
+        self._running_stage = None
         self.data_dictionary = data_dictionary
-        self.info = self.pasrse_data_dictionary("info")
-        self.ratios = self.pasrse_data_dictionary("ratios")
-        self.metrics = self.pasrse_data_dictionary("metrics")
-        self.is_ = self.pasrse_data_dictionary("is")
-        self.price = self.filter_daily_into_quarters(
-            self.pasrse_data_dictionary("price")
-        )
-        self.snp_500 = self.filter_daily_into_quarters(self.load_snp_500(), "S&P500")
-        self.filter_dataframes()
-        self.calculate_PE_ratios()
-        self.calculate_internal_returns()
-        self.returns = self.calculate_relative_returns()
-        self.final_data = self.combine_dataframes()
+        self.returns_engine = ReturnsEngine(return_horizons)
+        self.outputs = tuple(OUTPUT_STAGES) if outputs is None else tuple(outputs)
+        for output in self.outputs:
+            assert output in OUTPUT_STAGES, f"invalid output {output}"
+        if not lazy:
+            self.evaluate("final_data")
+
+    def __getattr__(self, name: str):
+        # Stage outputs are kept in _stage_outputs rather than set as attributes, so
+        # every read of one ends up here. Outside of a stage, the last stage that
+        # modifies the attribute is evaluated first, so the value never depends on the
+        # order in which attributes are read; inside a stage, the current value is
+        # returned as it is.
+        if name.startswith("_") or name not in ATTRIBUTE_STAGES:
+            raise AttributeError(name)
+        if self._running_stage is None:
+            self.evaluate(ATTRIBUTE_STAGES[name])
+        try:
+            return self._stage_outputs[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value) -> None:
+        if name in ATTRIBUTE_STAGES:
+            self._stage_outputs[name] = value
+        else:
+            super().__setattr__(name, value)
+
+    def get_stage_dependencies(self, stage: str) -> List[str]:
+        """
+        Returns the stages that must be evaluated before the given stage.
+
+        Args:
+            stage (str): The name of the stage, a key of STAGE_DEPENDENCIES.
+
+        Returns:
+            List[str]: The names of the stages the stage depends on.
+        """
+        if stage == "final_data":
+            return [OUTPUT_STAGES[output] for output in self.outputs]
+        return STAGE_DEPENDENCIES[stage]
+
+    def evaluate(self, stage: str) -> None:
+        """
+        Evaluates a stage, after the stages it depends on, unless already evaluated.
+
+        Args:
+            stage (str): The name of the stage, a key of STAGE_DEPENDENCIES.
+        """
+        if stage in self._evaluated_stages:
+            return
+        for dependency in self.get_stage_dependencies(stage):
+            self.evaluate(dependency)
+        self._running_stage = stage
+        try:
+            self.run_stage(stage)
+        finally:
+            self._running_stage = None
+        self._evaluated_stages.add(stage)
+
+    def run_stage(self, stage: str) -> None:
+        """
+        Runs a single stage, assuming the stages it depends on have been evaluated.
+
+        Args:
+            stage (str): The name of the stage, a key of STAGE_DEPENDENCIES.
+        """
+        if stage == "info":
+            self.info = self.pasrse_data_dictionary("info")
+        elif stage == "statements":
+            self.ratios = self.pasrse_data_dictionary("ratios")
+            self.metrics = self.pasrse_data_dictionary("metrics")
+            self.is_ = self.pasrse_data_dictionary("is")
+        elif stage == "price":
+            self.price = self.filter_daily_into_quarters(
+                self.pasrse_data_dictionary("price")
+            )
+        elif stage == "filter":
+            self.filter_dataframes()
+        elif stage == "snp_500":
+            snp_500 = self.aggregate_snp_500()
+            self.snp_500 = self.align_to_index(snp_500, self.ratios.index)
+        elif stage == "pe_ratios":
+            self.calculate_PE_ratios()
+        elif stage == "internal_returns":
+            self.calculate_internal_returns()
+        elif stage == "returns":
+            self.returns = self.calculate_relative_returns()
+        elif stage == "final_data":
+            self.final_data = self.combine_dataframes()
+        else:
+            raise AssertionError(f"invalid stage {stage}")
 
     @staticmethod
     def json_to_dataframe(json_data: Dict[str, List]) -> pd.DataFrame:
@@ -170,28 +421,24 @@ class DataParser:
         """
         ticker = self.info["symbol"][0]
         periods = df.period
-        years = df.date.apply(lambda x: x.split("-")[0])
+        years = pd.to_datetime(df.date).dt.year.astype(str)
         index = ticker + "-" + periods + "-" + years
         return pd.Index(index)
 
     @staticmethod
-    def create_period_start_date_feature(date_string_array) -> List[str]:
+    def create_period_start_date_feature(date_array) -> np.ndarray:
         """
-        Creates a list of start dates for a given array of date strings.
+        Creates an array of start dates, 91 days before each of the given dates.
 
         Args:
-            date_string_array (Iterable[str]): An iterable of date strings in 
-            'YYYY-MM-DD' format.
+            date_array (Iterable): An iterable of dates, either as datetime64 values
+            or as strings in 'YYYY-MM-DD' format.
 
         Returns:
-            List[str]: A list of start dates, represented as strings in 
-            'YYYY-MM-DD' format.
+            np.ndarray: A datetime64[ns] array of start dates.
         """
-        dates = np.array(
-            [dt.date(*[int(i) for i in date.split("-")]) for date in date_string_array]
-        )
-        start_dates = dates - dt.timedelta(91)
-        return [str(date) for date in start_dates]
+        dates = DataParser.create_date_objects_from_strings(date_array)
+        return dates - np.timedelta64(91, "D")
 
     def pasrse_data_dictionary(self, key: str):
         """
@@ -213,6 +460,7 @@ class DataParser:
         cols = features[key]
 
         if key in ["ratios", "metrics", "is"]:
+            df_data["date"] = self.create_date_objects_from_strings(df_data.date)
             df_data["start_date"] = self.create_period_start_date_feature(df_data.date)
             df_data.index = self.create_df_index(df_data)
             extra_cols = ["start_date"]
@@ -228,46 +476,116 @@ class DataParser:
         """
         Filters the instance's DataFrames to only include common indices.
 
+        The S&P 500 DataFrame does not take part in the intersection; it is only
+        aligned if it has already been set.
+
+        The common index is computed once, in the order of the ratios index, and every
+        DataFrame is then aligned to it with at most one copy; DataFrames that are
+        already aligned, as the price DataFrames usually are, are not copied at all.
+
         Returns:
             None
         """
         common_idx = self.ratios.index
-        common_idx = common_idx.intersection(self.metrics.index)
-        common_idx = common_idx.intersection(self.is_.index)
-        common_idx = common_idx.intersection(self.price.index)
+        others = [self.metrics.index, self.is_.index, self.price.index]
+        if common_idx.is_unique and all(index.is_unique for index in others):
+            is_common = np.ones(len(common_idx), dtype=bool)
+            for index in others:
+                if not index.equals(common_idx):
+                    is_common &= common_idx.isin(index)
+            if not is_common.all():
+                common_idx = common_idx[is_common]
+        else:
+            for index in others:
+                common_idx = common_idx.intersection(index)
         assert len(common_idx) >= 1, "No common indecies"
-        self.ratios = self.ratios.loc[common_idx]
-        self.metrics = self.metrics.loc[common_idx]
-        self.is_ = self.is_.loc[common_idx]
-        self.price = self.price.loc[common_idx]
-        self.snp_500 = self.snp_500.loc[common_idx]
+        self.ratios = self.align_to_index(self.ratios, common_idx)
+        self.metrics = self.align_to_index(self.metrics, common_idx)
+        self.is_ = self.align_to_index(self.is_, common_idx)
+        self.price = self.align_to_index(self.price, common_idx)
         failed_msg = "Dataframe filtering failed"
         assert self.ratios.index.equals(self.metrics.index), failed_msg
         assert self.ratios.index.equals(self.is_.index), failed_msg
         assert self.ratios.index.equals(self.price.index), failed_msg
-        assert self.ratios.index.equals(self.snp_500.index), failed_msg
+        if "snp_500" in self._stage_outputs:
+            self.snp_500 = self.align_to_index(self.snp_500, common_idx)
+            assert self.ratios.index.equals(self.snp_500.index), failed_msg
+
+    @staticmethod
+    def align_to_index(df: pd.DataFrame, index: pd.Index) -> pd.DataFrame:
+        """
+        Returns the rows of a DataFrame in the order of the given index.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to align.
+            index (pd.Index): The index to align to. Every label must be in df.
+
+        Returns:
+            pd.DataFrame: df itself if it is already aligned, otherwise a copy of
+            the selected rows.
+        """
+        if df.index.equals(index):
+            return df
+        if df.index.is_unique:
+            positions = df.index.get_indexer(index)
+            if (positions >= 0).all():
+                return df.take(positions)
+        return df.loc[index]
 
     def load_snp_500(self):
         """
         Loads the S&P 500 trading data from a parquet file.
 
+        The file is only read once per process; see load_snp_500_data.
+
         Returns:
             pd.DataFrame: A pandas DataFrame containing the S&P 500 trading data.
         """
-        path = (
-            Path.cwd()
-            / "investment_dataset_builder"
-            / "config_data"
-            / "snp500_trading_data_1970_to_2023.parquet"
-        )
-        df = pd.read_parquet(path)
+        df = load_snp_500_data().copy(deep=False)
         df["date"] = self.create_date_objects_from_pd_timestamps(df.index)
         return df
 
+    def aggregate_snp_500(self) -> pd.DataFrame:
+        """
+        Aggregates the S&P 500 daily trading data into the company's periods.
+
+        This gives the same result as filter_daily_into_quarters(load_snp_500(),
+        "S&P500"), but each period is looked up in the process-wide memo of S&P 500
+        aggregates instead of being computed again for every company.
+
+        Returns:
+            pd.DataFrame: A pandas DataFrame containing quarterly S&P 500 data.
+
+        Raises:
+            AssertionError: If the S&P 500 data does not cover one of the periods.
+        """
+        average, high, low, has_data = get_snp_500_aggregates(
+            self.create_date_objects_from_strings(self.ratios.start_date),
+            self.create_date_objects_from_strings(self.ratios.date),
+        )
+        assert has_data.all(), (
+            "No S&P 500 data for periods "
+            f"{', '.join(self.ratios.index[~has_data].astype(str))}"
+        )
+        return pd.DataFrame(
+            {
+                "S&P500PriceAverage": average,
+                "S&P500PriceHigh": high,
+                "S&P500PriceLow": low,
+            },
+            index=self.ratios.index[has_data],
+        )
+
     def filter_daily_into_quarters(self, df: pd.DataFrame, tag: str = "stock") -> None:
         """
         Filters daily stock data into quarterly data.
 
+        Every period runs from its start_date (inclusive) to its date (exclusive). The
+        period boundaries are located in the sorted daily dates with a binary search, and
+        the average, high and low of all periods are then computed in one pass, so the
+        cost is linear in the number of days rather than periods x days. Periods without
+        any daily data are dropped.
+
         Args:
             df (pd.DataFrame): A pandas DataFrame containing daily stock data.
             tag (str): A string representing the type of stock data being filtered 
@@ -276,65 +594,113 @@ class DataParser:
         Returns:
             pd.DataFrame: A pandas DataFrame containing quarterly stock data.
         """
-        start_date_objects = self.create_date_objects_from_strings(
-            self.ratios.start_date
+        start_dates = self.create_date_objects_from_strings(self.ratios.start_date)
+        end_dates = self.create_date_objects_from_strings(self.ratios.date)
+        daily_dates = self.create_date_objects_from_strings(df.date)
+        order = np.argsort(daily_dates, kind="stable")
+
+        average, high, low, has_data = self.aggregate_price_periods(
+            daily_dates[order],
+            df["High"].values[order],
+            df["Low"].values[order],
+            df["Close"].values[order],
+            start_dates,
+            end_dates,
         )
-        end_date_objects = self.create_date_objects_from_strings(self.ratios.date)
-        working_index = self.ratios.index
-
-        filtered_data = []
-        filtered_index = []
-        for start, end, idx in zip(start_date_objects, end_date_objects, working_index):
-            try:
-                period_price = df[(df.date >= start) & (df.date < end)]
-                max_ = max(period_price["High"])
-                min_ = min(period_price["Low"])
-                close = period_price["Close"].mean()
-                filtered_data.append([close, max_, min_])
-                filtered_index.append(idx)
-            except ValueError:
-                continue
-
         new_df = pd.DataFrame(
-            filtered_data,
-            columns=[f"{tag}PriceAverage", f"{tag}PriceHigh", f"{tag}PriceLow"],
-            index=filtered_index,
+            {
+                f"{tag}PriceAverage": average,
+                f"{tag}PriceHigh": high,
+                f"{tag}PriceLow": low,
+            },
+            index=self.ratios.index[has_data],
         )
         return new_df
 
+    @staticmethod
+    def aggregate_price_periods(
+        dates: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        start_dates: np.ndarray,
+        end_dates: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Aggregates daily prices into the periods [start_dates, end_dates).
+
+        Args:
+            dates (np.ndarray): The sorted datetime64 dates of the daily prices.
+            high (np.ndarray): The daily highs, in the order of dates.
+            low (np.ndarray): The daily lows, in the order of dates.
+            close (np.ndarray): The daily closes, in the order of dates.
+            start_dates (np.ndarray): The datetime64 start date of every period.
+            end_dates (np.ndarray): The datetime64 end date of every period.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The average close,
+                high and low of the periods that have data, and a boolean mask of the
+                periods that have data.
+        """
+        first = np.searchsorted(dates, start_dates, side="left")
+        last = np.searchsorted(dates, end_dates, side="left")
+        has_data = last > first
+        if not has_data.any():
+            empty = np.empty(0, dtype=np.float64)
+            return empty, high[:0], low[:0], has_data
+
+        # reduceat reduces over [bounds[i], bounds[i + 1]), so the even slots hold the
+        # periods and the odd slots (the gaps between periods) are discarded. A padding
+        # element keeps every index valid when a period ends on the last day.
+        bounds = np.empty(2 * has_data.sum(), dtype=np.intp)
+        bounds[0::2] = first[has_data]
+        bounds[1::2] = last[has_data]
+
+        close = np.append(np.asarray(close, dtype=np.float64), np.nan)
+        is_valid = ~np.isnan(close)
+        close_sums = np.add.reduceat(np.where(is_valid, close, 0.0), bounds)[0::2]
+        close_counts = np.add.reduceat(is_valid, bounds)[0::2]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = close_sums / close_counts
+        high = np.fmax.reduceat(np.append(high, high[-1:]), bounds)[0::2]
+        low = np.fmin.reduceat(np.append(low, low[-1:]), bounds)[0::2]
+        return average, high, low, has_data
+
     @staticmethod
     def create_date_objects_from_strings(date_string_array: np.array) -> np.array:
         """
-        Creates an array of date objects from an array of date strings.
+        Creates a datetime64[ns] array from an array of date strings.
+
+        The strings are parsed in a single vectorized call. Values that are already
+        datetime64 are passed through without being parsed again.
 
         Args:
             date_string_array (np.array): A NumPy array of date strings in the format 
-            'YYYY-MM-DD'.
+            'YYYY-MM-DD', or of datetime64 values.
 
         Returns:
-            np.array: A NumPy array of date objects.
+            np.array: A NumPy datetime64[ns] array.
         """
-        return np.array(
-            [dt.date(*[int(i) for i in date.split("-")]) for date in date_string_array]
-        )
+        values = np.asarray(date_string_array)
+        if values.dtype.kind == "M":
+            return values.astype("datetime64[ns]")
+        return pd.to_datetime(values, format="%Y-%m-%d").values
 
     @staticmethod
     def create_date_objects_from_pd_timestamps(timestamp_array) -> np.array:
         """
-        Creates an array of date objects from an array of pandas Timestamps.
+        Creates a datetime64[ns] array of dates from an array of pandas Timestamps.
+
+        The time of day, if any, is dropped so that only the date remains.
 
         Args:
-            timestamp_array (np.array): A NumPy array of pandas Timestamps.
+            timestamp_array (np.array): A NumPy array of pandas Timestamps, or a
+            DatetimeIndex.
 
         Returns:
-            np.array: A NumPy array of date objects.
+            np.array: A NumPy datetime64[ns] array.
         """
-        return np.array(
-            [
-                dt.date(*[int(i) for i in str(stamp).split()[0].split("-")])
-                for stamp in timestamp_array
-            ]
-        )
+        return pd.DatetimeIndex(timestamp_array).normalize().values
 
     def calculate_PE_ratios(self) -> None:
         """
@@ -357,27 +723,83 @@ class DataParser:
         Combines the parsed and filtered DataFrames for the company into a single 
         DataFrame.
 
-        The method drops the 'date' and 'period' columns from the metrics and income 
+        The method leaves out the 'date' and 'period' columns of the metrics and income
         statement DataFrames, joins all DataFrames on their common index, and returns 
-        the resulting DataFrame.
+        the resulting DataFrame. When every DataFrame is aligned, as it is after
+        filter_dataframes, each column is copied exactly once into the result; see
+        join_aligned_dataframes.
+
+        Only the feature groups in the instance's outputs are combined.
 
         Returns:
             pd.DataFrame: A pandas DataFrame containing the combined data for the 
             company.
         """
         to_drop = ["date", "period"]
-        self.metrics = self.metrics.drop(to_drop, axis=1)
-        self.is_ = self.is_.drop(to_drop, axis=1)
         to_join = [
-            self.ratios,
-            self.metrics,
-            self.is_,
-            self.price,
-            self.snp_500,
-            self.returns,
+            (getattr(self, attribute), to_drop if output in ["metrics", "is"] else [])
+            for output, attribute in OUTPUT_ATTRIBUTES.items()
+            if output in self.outputs
         ]
+        index = self.ratios.index
+        if all(df.index.equals(index) for df, _ in to_join):
+            return self.join_aligned_dataframes(to_join, index)
+        to_join = [df.drop(excluded, axis=1) for df, excluded in to_join]
         return pd.concat(to_join, axis=1)
 
+    @staticmethod
+    def join_aligned_dataframes(
+        to_join: List[Tuple[pd.DataFrame, List[str]]], index: pd.Index
+    ) -> pd.DataFrame:
+        """
+        Joins DataFrames that share the same index side by side.
+
+        The columns of the most common dtype are written once into a single
+        preallocated array, which is wrapped in the result DataFrame without a copy.
+        The remaining columns, such as dates, periods and extension dtypes, are
+        inserted at their positions, which copies each of them once and leaves the
+        preallocated block untouched. No intermediate DataFrames are created.
+
+        Args:
+            to_join (List[Tuple[pd.DataFrame, List[str]]]): The DataFrames to join,
+                each paired with the names of the columns to leave out.
+            index (pd.Index): The index shared by all DataFrames.
+
+        Returns:
+            pd.DataFrame: The joined DataFrame.
+        """
+        columns, by_dtype = [], {}
+        for df, excluded in to_join:
+            for position, column in enumerate(df.columns):
+                if column in excluded:
+                    continue
+                series = df.iloc[:, position]
+                by_dtype.setdefault(series.dtype, []).append(
+                    (len(columns), series.array)
+                )
+                columns.append(column)
+
+        dtype = max(
+            (dtype for dtype in by_dtype if isinstance(dtype, np.dtype)),
+            key=lambda dtype: len(by_dtype[dtype]),
+            default=None,
+        )
+        arrays = by_dtype.pop(dtype, [])
+        if dtype is None:
+            dtype = np.float64
+        values = np.empty((len(arrays), len(index)), dtype=dtype)
+        for row, (_, array) in enumerate(arrays):
+            values[row] = array
+        placement = [position for position, _ in arrays]
+        joined = pd.DataFrame(values.T, index, placement, copy=False)
+        for position, array in sorted(
+            (item for arrays in by_dtype.values() for item in arrays),
+            key=lambda item: item[0],
+        ):
+            joined.insert(position, position, array)
+        joined.columns = pd.Index(columns)
+        return joined
+
     def calculate_returns_from_series(
         self, price: pd.DataFrame, interval: int = 1
     ) -> List:
@@ -390,6 +812,9 @@ class DataParser:
             interval (int, optional): The number of time intervals to calculate returns over.
                 Defaults to 1.
 
+        Note that DataParser itself calculates returns with the vectorized
+        ReturnsEngine; this method is kept for calculating a single series.
+
         Returns:
             List: A list of returns calculated for the given interval, with NaN 
                     values at the end.
@@ -409,42 +834,40 @@ class DataParser:
 
     def calculate_internal_returns(self) -> List:
         """
-        Calculates internal returns over 1, 2, 3, and 4 quarters by calculating 
-        the ratio of the average stock prices for those quarters. 
-        
+        Calculates internal returns over each of the parser's horizons (by default 1,
+        2, 3, and 4 quarters) by calculating the ratio of the average stock prices
+        for those quarters.
+
+        The stock and S&P 500 ratios are calculated together in one vectorized pass
+        of the ReturnsEngine.
+
         Returns:
             None
         """
-        for i in [1, 2, 3, 4]:
-            try:
-                self.price[
-                    f"stockPriceRatio_{i}Q"
-                ] = self.calculate_returns_from_series(
-                    self.price["stockPriceAverage"], i
-                )
-                self.snp_500[
-                    f"snpPriceRatio_{i}Q"
-                ] = self.calculate_returns_from_series(
-                    self.snp_500["S&P500PriceAverage"], i
-                )
-            except ValueError:
-                len_df = len(self.ratios)
-                nan_array = len_df * [np.nan]
-                self.price[f"stockPriceRatio_{i}Q"] = nan_array
-                self.snp_500[f"snpPriceRatio_{i}Q"] = nan_array
-                continue
+        prices = pd.DataFrame(
+            {
+                "stock": self.price["stockPriceAverage"].values,
+                "snp": self.snp_500["S&P500PriceAverage"].values,
+            },
+            index=self.price.index,
+        )
+        ratios = self.returns_engine.calculate_price_ratios(prices)
+        for i, ratio in ratios.items():
+            self.price[f"stockPriceRatio_{i}Q"] = ratio["stock"].values
+        for i, ratio in ratios.items():
+            self.snp_500[f"snpPriceRatio_{i}Q"] = ratio["snp"].values
 
     def calculate_relative_returns(self):
         """Calculates the relative returns of the stock compared to the S&P500 
-            over 1Q, 2Q, 3Q, and 4Q periods.
+            over each of the parser's horizons (by default 1Q, 2Q, 3Q, and 4Q).
     
         Returns:
             relative_returns_df: pd.DataFrame
                 A DataFrame containing the relative returns of the stock compared 
-                to the S&P 500 over 1Q, 2Q, 3Q, and 4Q periods.
+                to the S&P 500 over each horizon.
         """
         relative_returns_df = pd.DataFrame(index=self.ratios.index)
-        for i in [1, 2, 3, 4]:
+        for i in self.returns_engine.horizons:
             header = f"priceRatioRelativeToS&P_{i}Q"
             stock_return = self.price[f"stockPriceRatio_{i}Q"]
             snp_return = self.snp_500[f"snpPriceRatio_{i}Q"]
@@ -2,15 +2,80 @@ import yfinance as yf
 from pandas_datareader import data as pdr
 import pandas as pd
 import numpy as np
-from typing import List, Tuple, Dict, Union
+from typing import List, Tuple, Dict, Union, Iterator, Mapping
 import requests
 from requests import Response, Request
 import json
 from pathlib import Path
 import datetime as dt
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .http_client import HttpClient, UnsuccessfulRequestError, get_default_client
+from .response_cache import ResponseCache
+from .price_store import PriceStore
+from .json_decoder import decode_json, project_records
+from .replay import fetch_stand_in_price_data
 
 yf.pdr_override()
 
+FMP_BASE_URL = "https://financialmodelingprep.com/api/"
+
+
+class LazyDataDictionary(Mapping):
+    """
+    A read-only data_dictionary whose entries are fetched the first time they are
+    accessed.
+
+    The keys are known up front from DataScraper.get_data_keys, so membership tests and
+    iteration over the keys never trigger a request. Every entry is fetched at most
+    once, even when it is accessed from several threads at the same time.
+
+    Args:
+        scraper (DataScraper): The scraper used to fetch each entry.
+
+    """
+
+    def __init__(self, scraper: "DataScraper"):
+        self._scraper = scraper
+        self._keys = scraper.get_data_keys()
+        self._data = {}
+        self._locks = {key: threading.Lock() for key in self._keys}
+
+    def __getitem__(self, key: str):
+        if key not in self._locks:
+            raise KeyError(key)
+        with self._locks[key]:
+            if key not in self._data:
+                self._data[key] = self._scraper.fetch_item(key)
+        return self._data[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._locks
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def is_loaded(self, key: str) -> bool:
+        """Returns True if the entry has already been fetched."""
+        return key in self._data
+
+    def pending_keys(self) -> List[str]:
+        """Returns the keys whose entries have not been fetched yet."""
+        return [key for key in self._keys if key not in self._data]
+
+    def load(self, entries: Dict) -> None:
+        """Stores entries that were fetched outside of the dictionary."""
+        for key, data in entries.items():
+            with self._locks[key]:
+                self._data.setdefault(key, data)
+
+    def to_dict(self) -> Dict:
+        """Fetches any missing entries and returns a plain dictionary."""
+        return {key: self[key] for key in self._keys}
+
 
 class DataScraper:
     """
@@ -21,13 +86,42 @@ class DataScraper:
         api_key (str, optional): The API key to access Financial Modeling Prep API. Defaults to "".
         period (str, optional): The period to retrieve data for. Can be 'annual' or 'quarter'. Defaults to 'quarter'.
         data_type (str, optional): The type of data to retrieve. Can be 'company' or 'economic'. Defaults to 'company'.
+        max_workers (int, optional): The number of requests for this ticker that may be in flight at once. A value
+            of 1 fetches each endpoint sequentially. Defaults to 1.
+        client (HttpClient, optional): The HTTP client used for Financial Modeling Prep API requests. Defaults to the
+            process-wide client shared by every DataScraper.
+        cache (ResponseCache, optional): An on-disk cache consulted before any Financial Modeling Prep API request is
+            made. Defaults to None, i.e. no caching.
+        price_store (PriceStore, optional): A local price history store. When set, only bars after the last stored
+            date are downloaded from Yahoo Finance. Defaults to None.
+        prefetched_data (Dict, optional): Entries of the data_dictionary that have already been fetched elsewhere,
+            e.g. a 'price' DataFrame from a batched download. These are used as-is instead of being requested.
+            Defaults to None.
+        projection (Dict[str, List[str]], optional): The columns to keep for each Financial Modeling Prep API data
+            type, e.g. the contents of features.json. Data types listed here are returned as a dictionary of typed
+            column arrays instead of a list of records. Defaults to None, i.e. records are returned unchanged.
+        base_url (str, optional): The root of the Financial Modeling Prep API. Point this at a StandInServer to run
+            offline. Defaults to FMP_BASE_URL.
+        yahoo_url (str, optional): The price endpoint of a StandInServer to download stock price data from instead
+            of Yahoo Finance. Defaults to None, i.e. Yahoo Finance is used.
+        lazy (bool, optional): If True, nothing is fetched on construction; data_dictionary entries are fetched the
+            first time they are accessed, or all at once by prefetch(). Defaults to False.
+        limit (int, optional): The number of most recent periods requested from each Financial Modeling Prep API
+            statement endpoint. A small limit keeps the requests of an incremental refresh cheap. Defaults to 400.
 
     Attributes:
         ticker (str): The ticker symbol for the stock being scraped.
         period (str): The period to retrieve data for.
+        limit (int): The number of most recent periods requested from each statement endpoint.
         api_key (str): The API key used to access Financial Modeling Prep API.
+        client (HttpClient): The pooled HTTP client used for Financial Modeling Prep API requests.
+        cache (ResponseCache): The response cache, or None if caching is disabled.
+        price_store (PriceStore): The local price history store, or None.
+        prefetched_data (dict): The entries of the data_dictionary that were supplied by the caller.
+        projection (dict): The columns kept for each projected data type.
         fmp_api_requests (list): The list of available data types to retrieve from Financial Modeling Prep API.
         data_dictionary (dict): The dictionary of all data retrieved from Financial Modeling Prep API and Yahoo Finance.
+            A LazyDataDictionary when lazy is True.
 
     Raises:
         AssertionError: Raised if ticker, period, or api_key are not valid.
@@ -40,15 +134,38 @@ class DataScraper:
         api_key: str = "",
         period: str = "quarter",
         data_type: str = "company",
+        max_workers: int = 1,
+        client: HttpClient = None,
+        cache: ResponseCache = None,
+        price_store: PriceStore = None,
+        prefetched_data: Dict = None,
+        projection: Dict[str, List[str]] = None,
+        base_url: str = FMP_BASE_URL,
+        yahoo_url: str = None,
+        lazy: bool = False,
+        limit: int = 400,
     ):
         self.ticker = ticker.upper()
         self.period = period.lower().strip()
         self.api_key = str(api_key)
         self.data_type = data_type
+        self.max_workers = int(max_workers)
+        self.client = client if client is not None else get_default_client()
+        self.cache = cache
+        self.price_store = price_store
+        self.prefetched_data = dict(prefetched_data or {})
+        self.projection = dict(projection or {})
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.yahoo_url = yahoo_url
+        self.lazy = lazy
+        self.limit = int(limit)
         self.assert_valid_user_inputs()
         self.fmp_company_requests = ["info", "ratios", "metrics", "is"]
         self.fmp_economic_requests = ["realGDPPerCapita", "CPI", "consumerSentiment"]
-        self.data_dictionary = self.fetch_data()
+        if self.lazy:
+            self.data_dictionary = LazyDataDictionary(self)
+        else:
+            self.data_dictionary = self.fetch_data()
 
     def assert_valid_user_inputs(self):
         """
@@ -70,6 +187,8 @@ class DataScraper:
             "economic",
         ], "data_type must be 'company' or 'economic'"
         assert self.api_key
+        assert self.max_workers >= 1, "max_workers must be at least 1"
+        assert self.limit >= 1, "limit must be at least 1"
 
     def get_fmp_api_url(self, data_type: str = "") -> str:
         """
@@ -87,46 +206,35 @@ class DataScraper:
         """
         end_date = str(dt.date.today())
         if data_type == "ratios":
-            template = (
-                "https://financialmodelingprep.com/api/"
-                "v3/ratios/{}?period={}&limit=400&apikey={}"
-            )
-            return template.format(self.ticker, self.period, self.api_key)
+            template = self.base_url + "v3/ratios/{}?period={}&limit={}&apikey={}"
+            return template.format(self.ticker, self.period, self.limit, self.api_key)
         if data_type == "metrics":
-            template = (
-                "https://financialmodelingprep.com/api/v3/"
-                "key-metrics/{}?period={}&limit=400&apikey={}"
-            )
-            return template.format(self.ticker, self.period, self.api_key)
+            template = self.base_url + "v3/key-metrics/{}?period={}&limit={}&apikey={}"
+            return template.format(self.ticker, self.period, self.limit, self.api_key)
         if data_type == "info":
-            template = (
-                "https://financialmodelingprep.com/api/v3/" "profile/{}?apikey={}"
-            )
+            template = self.base_url + "v3/profile/{}?apikey={}"
             return template.format(self.ticker, self.api_key)
         if data_type == "is":
             template = (
-                "https://financialmodelingprep.com/api/v3/"
-                "income-statement/{}?period={}&limit=400&apikey={}"
+                self.base_url + "v3/income-statement/{}?period={}&limit={}&apikey={}"
             )
-            return template.format(self.ticker, self.period, self.api_key)
+            return template.format(self.ticker, self.period, self.limit, self.api_key)
         if data_type == "TYield":
-            template = (
-                "https://financialmodelingprep.com/api/v4/"
-                "treasury?from=2010-06-30&to={}&apikey={}"
-            )
+            template = self.base_url + "v4/treasury?from=2010-06-30&to={}&apikey={}"
             return template.format(end_date, self.api_key)
         if data_type in ["CPI", "realGDPPerCapita", "consumerSentiment"]:
             template = (
-                "https://financialmodelingprep.com/api/v4/"
-                "economic?name={}&from=1970-06-30&to={}&apikey={}"
+                self.base_url + "v4/economic?name={}&from=1970-06-30&to={}&apikey={}"
             )
             return template.format(data_type, end_date, self.api_key)
 
-    @staticmethod
-    def make_fmp_api_requests(url: str) -> Response:
+    def make_fmp_api_requests(self, url: str) -> Response:
         """
         Makes an HTTP request to Financial Modeling Prep API and returns the response.
 
+        The request goes through the shared HttpClient, so connections are reused and
+        rate-limited or failed requests are retried before giving up.
+
         Args:
             url (str): The URL to send the request to.
 
@@ -134,11 +242,13 @@ class DataScraper:
             Response: The response from the API request.
 
         Raises:
-            AssertionError: Raised if the API request was unsuccessful.
+            UnsuccessfulRequestError: Raised if the API request was unsuccessful after all retries. It is an
+                AssertionError.
 
         """
-        fmp_response = requests.get(url)
-        assert fmp_response.status_code == 200, "Request unsuccessful"
+        fmp_response = self.client.get(url)
+        if fmp_response.status_code != 200:
+            raise UnsuccessfulRequestError(fmp_response.status_code)
         return fmp_response
 
     @staticmethod
@@ -146,6 +256,9 @@ class DataScraper:
         """
         Converts the response from an API request to a JSON object.
 
+        The raw response body is decoded with orjson when it is installed, which is
+        considerably faster than the standard library for large statement responses.
+
         Args:
             response (Response): The response object from the API request.
 
@@ -156,7 +269,7 @@ class DataScraper:
             AssertionError: Raised if the API request was successful but the response was empty.
 
         """
-        json_data = response.json()
+        json_data = decode_json(response.content)
         assert len(json_data) > 0, "API request successful but empty"
         return json_data
 
@@ -164,6 +277,10 @@ class DataScraper:
         """
         Fetches stock price data from Yahoo Finance.
 
+        If a price store is set, only the bars from the last stored date onwards are
+        downloaded and appended to the store, and the full history is read back from it.
+        The last stored bar is downloaded again in case it was a partial trading day.
+
         Returns:
             pandas.DataFrame: A DataFrame containing the stock price data.
 
@@ -172,33 +289,225 @@ class DataScraper:
 
         """
         start = dt.date(1970, 1, 1)
-        stock_data = pdr.get_data_yahoo(self.ticker, start=start, interval="1d")
+        if self.price_store is None:
+            stock_data = self.download_stock_price_data(start)
+            return self.validate_stock_price_data(stock_data)
+
+        last_date = self.price_store.last_date(self.ticker)
+        if last_date is not None:
+            start = last_date
+        new_data = self.download_stock_price_data(start)
+        self.price_store.append(self.ticker, new_data)
+        return self.validate_stock_price_data(self.price_store.load(self.ticker))
+
+    def download_stock_price_data(self, start: dt.date) -> pd.DataFrame:
+        """
+        Downloads daily stock price data from Yahoo Finance, or from the stand-in
+        server if yahoo_url is set.
+
+        Args:
+            start (datetime.date): The first date to download.
+
+        Returns:
+            pandas.DataFrame: A DataFrame containing the stock price data.
+
+        """
+        if self.yahoo_url is not None:
+            return fetch_stand_in_price_data(
+                self.client, self.yahoo_url, [self.ticker], start
+            )[self.ticker]
+        return pdr.get_data_yahoo(self.ticker, start=start, interval="1d")
+
+    @staticmethod
+    def validate_stock_price_data(stock_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Asserts that there is enough stock price data to be useful.
+
+        Args:
+            stock_data (pandas.DataFrame): The daily stock price data.
+
+        Returns:
+            pandas.DataFrame: The unchanged stock price data.
+
+        Raises:
+            AssertionError: Raised if there is insufficient stock price data.
+
+        """
+        assert stock_data is not None, "Insufficient stock price data"
         assert len(stock_data) > 85, "Insufficient stock price data"
         return stock_data
 
-    def fetch_data(self) -> Dict[str, Dict]:
+    @staticmethod
+    def fetch_batch_stock_price_data(
+        tickers: List[str], start: dt.date = dt.date(1970, 1, 1)
+    ) -> Dict[str, pd.DataFrame]:
         """
-        Fetches all financial data from Financial Modeling Prep API and Yahoo Finance.
+        Fetches stock price data for many tickers from Yahoo Finance in one download.
+
+        Args:
+            tickers (List[str]): The ticker symbols to download.
+            start (datetime.date, optional): The first date to download. Defaults to
+                1970-01-01.
 
         Returns:
-            dict: A dictionary containing all the financial data retrieved.
+            dict: A DataFrame of daily bars for every requested ticker. Tickers that
+                Yahoo Finance has no data for map to an empty DataFrame.
+
+        """
+        tickers = [ticker.upper() for ticker in tickers]
+        if not tickers:
+            return {}
+        stock_data = yf.download(
+            tickers,
+            start=start,
+            interval="1d",
+            group_by="ticker",
+            threads=True,
+            progress=False,
+        )
+        if not isinstance(stock_data.columns, pd.MultiIndex):
+            return {tickers[0]: stock_data.dropna(how="all")}
+        available = set(stock_data.columns.get_level_values(0))
+        return {
+            ticker: (
+                stock_data[ticker].dropna(how="all")
+                if ticker in available
+                else pd.DataFrame()
+            )
+            for ticker in tickers
+        }
+
+    def fetch_fmp_data(self, data_type: str) -> Dict:
+        """
+        Fetches a single data type from Financial Modeling Prep API.
+
+        If a cache is set, a fresh cached copy of the data is returned without making a
+        request, and successfully fetched data is added to the cache. Only lists of
+        records are accepted; an error object, such as {"Error Message": ...}, is
+        neither cached nor projected. If the data type is in projection, only the
+        projected columns are returned, as typed arrays.
+
+        Args:
+            data_type (str): The type of data to retrieve from Financial Modeling Prep API.
+
+        Returns:
+            dict: A dictionary representing the JSON object returned by the API request.
+
+        Raises:
+            AssertionError: Raised if the API request is unsuccessful, empty or not a
+                list of records.
+
+        """
+        url = self.get_fmp_api_url(data_type)
+        data = self.cache.get(url) if self.cache is not None else None
+        if not isinstance(data, list):
+            response = self.make_fmp_api_requests(url)
+            data = self.convert_raw_data_to_json(response)
+            # FMP reports errors such as an exhausted quota as an object with status 200
+            assert isinstance(data, list), f"API request returned {str(data)[:200]}"
+            if self.cache is not None:
+                self.cache.set(url, data)
+        if data_type in self.projection:
+            return project_records(data, self.projection[data_type])
+        return data
+
+    def fetch_item(self, key: str):
+        """
+        Fetches a single entry of the data_dictionary.
+
+        Entries supplied in prefetched_data are returned without making a request.
+
+        Args:
+            key (str): 'price' or one of the Financial Modeling Prep API data types.
+
+        Returns:
+            The JSON data for an API data type, or a DataFrame for 'price'.
 
         Raises:
             AssertionError: Raised if there is insufficient stock price data or if the API request is unsuccessful.
 
         """
-        data_dictionary = {}
+        if key in self.prefetched_data:
+            data = self.prefetched_data[key]
+            if key == "price":
+                return self.validate_stock_price_data(data)
+            return data
+        if key == "price":
+            return self.fetch_stock_price_data()
+        return self.fetch_fmp_data(key)
+
+    def get_data_keys(self) -> List[str]:
+        """
+        Returns the keys of the data_dictionary, in the order they are fetched.
+
+        Returns:
+            list: The Financial Modeling Prep API data types followed by 'price'.
+
+        """
         request_list = (
             self.fmp_company_requests
             if self.data_type == "company"
             else self.fmp_economic_requests
         )
-        if not self.ticker == "^GSPC":
-            for string in request_list:
-                url = self.get_fmp_api_url(string)
-                response = self.make_fmp_api_requests(url)
-                data = self.convert_raw_data_to_json(response)
-                data_dictionary[string] = data
-        stock_price_data = self.fetch_stock_price_data()
-        data_dictionary["price"] = stock_price_data
-        return data_dictionary
+        if self.ticker == "^GSPC":
+            request_list = []
+        return list(request_list) + ["price"]
+
+    def fetch_items(self, keys: List[str]) -> Dict:
+        """
+        Fetches several entries of the data_dictionary, concurrently if max_workers is
+        greater than 1.
+
+        Args:
+            keys (List[str]): The entries to fetch.
+
+        Returns:
+            dict: The fetched entries, in the order of keys.
+
+        Raises:
+            AssertionError: Raised if there is insufficient stock price data or if the API request is unsuccessful.
+
+        """
+        if self.max_workers == 1 or len(keys) <= 1:
+            return {key: self.fetch_item(key) for key in keys}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {key: executor.submit(self.fetch_item, key) for key in keys}
+            return {key: future.result() for key, future in futures.items()}
+
+    def fetch_data(self) -> Dict[str, Dict]:
+        """
+        Fetches all financial data from Financial Modeling Prep API and Yahoo Finance.
+
+        When max_workers is greater than 1 all of the requests for the ticker are sent at
+        once, so the time taken is that of the slowest single request rather than the
+        sum of all of them.
+
+        Returns:
+            dict: A dictionary containing all the financial data retrieved.
+
+        Raises:
+            AssertionError: Raised if there is insufficient stock price data or if the API request is unsuccessful.
+
+        """
+        return self.fetch_items(self.get_data_keys())
+
+    def prefetch(self) -> Mapping:
+        """
+        Fetches every data_dictionary entry that has not been fetched yet.
+
+        This lets a scheduler construct lazy scrapers cheaply and drive their I/O
+        separately, e.g. by submitting prefetch calls to its own executor. It does
+        nothing for a scraper that was not constructed lazily.
+
+        Returns:
+            Mapping: The data_dictionary, with every entry loaded.
+
+        Raises:
+            AssertionError: Raised if there is insufficient stock price data or if the API request is unsuccessful.
+
+        """
+        if isinstance(self.data_dictionary, LazyDataDictionary):
+            pending = self.data_dictionary.pending_keys()
+            self.data_dictionary.load(self.fetch_items(pending))
+        return self.data_dictionary
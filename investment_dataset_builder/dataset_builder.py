@@ -1,18 +1,113 @@
 import pandas as pd
-from .data_parser import DataParser
-from .data_scraper import DataScraper
-from typing import Dict, List, Tuple
+from .data_parser import DataParser, features
+from .batch_data_parser import BatchDataParser
+from .arrow_backend import ArrowBatchParser
+from .compact_dtypes import DtypeCompactor
+from .dataset_collector import DatasetCollector
+from .parquet_sink import ParquetSink, DEFAULT_PARTITIONS
+from .build_manifest import BuildManifest, MANIFEST_NAME, DONE, FAILED
+from .returns_engine import ReturnsEngine
+from .panel_index import structure_index
+from .data_scraper import DataScraper, FMP_BASE_URL
+from .replay import fetch_stand_in_price_data
+from .returns_engine import DEFAULT_HORIZONS
+from .http_client import HttpClient, get_default_client, is_transient_error
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+from .price_store import PriceStore
+from typing import Dict, List, Tuple, Union
 import json
+import multiprocessing
+import os
 from pathlib import Path
 import datetime as dt
 import numpy as np
 import requests
 from IPython.display import clear_output
 import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 
+# The environment variable that holds the Financial Modeling Prep API key, and the
+# file the key is read from when the variable is not set
+API_KEY_VARIABLE = "FMP_API_KEY"
 key_path = Path().home() / "desktop" / "FinancialModellingPrep_API.txt"
-with open(key_path) as file:
-    api_key = file.read()
+
+# The batch parsers that DatasetBuilder.parse_backend selects between
+PARSE_BACKENDS = {"pandas": BatchDataParser, "arrow": ArrowBatchParser}
+
+# Parse workers are started while the scraping threads hold HTTP sessions and
+# locks, which a forked worker could inherit in a locked state, so they are
+# never forked from the builder's process
+PARSE_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def load_api_key() -> str:
+    """Returns the Financial Modeling Prep API key.
+
+    The key is taken from the FMP_API_KEY environment variable, or else read
+    from key_path.
+
+    Returns:
+        str
+            the API key
+
+    Raises:
+        AssertionError
+            if the variable is not set and there is no key file
+    """
+    key = os.environ.get(API_KEY_VARIABLE)
+    if key:
+        return key
+    assert key_path.exists(), f"Set {API_KEY_VARIABLE} or pass api_key"
+    with open(key_path) as file:
+        return file.read().strip()
+
+
+def parse_data_dictionaries(
+    data_dictionaries: Dict[str, Dict],
+    return_horizons: Tuple[int] = DEFAULT_HORIZONS,
+    parse_backend: str = None,
+    to_arrow: bool = False,
+) -> Tuple[pd.DataFrame, List[str], Dict[str, str]]:
+    """Parses the data of one or more tickers.
+
+    This is the unit of work of DatasetBuilder's parse stage. It is a module
+    level function so that it can be run in a worker process.
+
+    Args:
+        data_dictionaries : Dict[str, Dict]
+            the data_dictionary of every ticker, keyed by ticker
+        return_horizons : Tuple[int], optional
+            the horizons, in quarters, that returns are calculated over
+        parse_backend : str, optional
+            the key of the batch parser in PARSE_BACKENDS, by default None,
+            i.e. the single ticker is parsed by a DataParser
+        to_arrow : bool, optional
+            whether the final data of an ArrowBatchParser is returned as its
+            pyarrow.Table, for a ParquetSink, rather than converted to pandas,
+            by default False
+
+    Returns:
+        Tuple[pd.DataFrame, List[str], Dict[str, str]]
+            the combined final data, or None, the tickers that were parsed
+            and the reason each other ticker could not be parsed
+    """
+    if parse_backend is None:
+        ((ticker, data_dictionary),) = data_dictionaries.items()
+        try:
+            parser = DataParser(data_dictionary, return_horizons)
+        except AssertionError as error:
+            return None, [], {ticker: f"parse failed: {error}"}
+        return parser.final_data, [ticker], {}
+    parser = PARSE_BACKENDS[parse_backend](data_dictionaries, return_horizons)
+    failed = {ticker: "parse failed" for ticker in parser.failed_tickers}
+    if to_arrow and isinstance(parser, ArrowBatchParser):
+        return parser.final_data, parser.tickers, failed
+    return parser.to_pandas(), parser.tickers, failed
+
 
 exchange_name_path = Path.cwd() / "investment_dataset_builder" / "exchange_names.json"
 with open(exchange_name_path, "r") as f:
@@ -31,6 +126,57 @@ class DatasetBuilder:
             a list of stock ticker data in dictionary format
         dataset : pd.DataFrame
             a pandas dataframe containing the built financial dataset
+        ticker_workers : int
+            the number of tickers that are scraped concurrently
+        request_workers : int
+            the number of requests per ticker that are sent concurrently
+        client : HttpClient
+            the pooled HTTP client shared with every DataScraper
+        cache : ResponseCache
+            the on-disk response cache shared with every DataScraper, or None
+        price_store : PriceStore
+            the local price history store shared with every DataScraper, or None
+        price_batch_size : int
+            the number of tickers per batched Yahoo Finance price download, or
+            None to download prices one ticker at a time
+        profile_batch_size : int
+            the number of tickers per batched company profile request, or None
+            to request each ticker's profile separately
+        base_url : str
+            the root of the Financial Modeling Prep API
+        yahoo_url : str
+            the price endpoint of a StandInServer used instead of Yahoo
+            Finance, or None
+        return_horizons : Tuple[int]
+            the horizons, in quarters, that returns are calculated over
+        api_key : str
+            the Financial Modeling Prep API key, loaded by load_api_key the
+            first time it is needed unless passed to the constructor
+        parse_batch_size : int
+            the number of scraped tickers that are parsed together, or None to
+            parse each ticker separately
+        parse_backend : str
+            the backend that batches of tickers are parsed with, 'pandas' or
+            'arrow'
+        compactor : DtypeCompactor
+            the compactor that build() converts the dataset to compact dtypes
+            with, or None to keep the parsed dtypes
+        parse_workers : int
+            the number of worker processes that parse scraped tickers while
+            more are being scraped, or None to parse in this process
+        max_pending_parses : int
+            the number of parse jobs that may be queued or running at once
+        output_directory : Path
+            the directory that build() streams a partitioned Parquet dataset
+            to, or None to build the dataset in memory
+        partition_by : Tuple[str]
+            the partition columns of the streamed dataset
+        resume : bool
+            whether build() continues the interrupted build in
+            output_directory
+        structured_index : bool
+            whether build() indexes the dataset by symbol, period, year and
+            period end instead of 'TICKER-PERIOD-YEAR' strings
         _failed_tickers : List[str]
             a list of ticker symbols that could not be scraped
         _successful_tickers : List[str]
@@ -51,30 +197,237 @@ class DatasetBuilder:
             Sets the exchanges attribute to a new list of stock exchanges
         check_valid_security(dct: Dict) -> bool
             Checks if the security is valid for the given exchanges
-        build_dataset() -> pd.DataFrame
+        make_scraper(ticker: str, prefetched_data: Dict=None, limit: int=400)
+            Constructs a DataScraper, fetching all of the data for the ticker
+        prefetch_price_data(tickers: List[str]) -> Dict[str, pd.DataFrame]
+            Downloads the price data of many tickers in one batched request
+        get_fmp_profile_url(tickers: List[str]) -> str
+            Returns the API url for fetching the profiles of many tickers
+        prefetch_profile_data(tickers: List[str]) -> Dict[str, List[Dict]]
+            Fetches the company profiles of many tickers in chunked requests
+        prefetch_batch(tickers: List[str]) -> Dict[str, Dict]
+            Fetches the data that is requested for a whole batch of tickers at once
+        scrape_tickers(tickers: List[str], limit: int=400)
+            Scrapes tickers concurrently and yields the results in order
+        parse_batch(data_dictionaries: Dict[str, Dict]) -> pd.DataFrame
+            Parses the data of many tickers together
+        parse_scrapes(scrapes) -> Iterator[pd.DataFrame]
+            Parses scraped tickers, overlapping parsing with scraping
+        build_dataset(collector=None, manifest=None, tickers=None, limit=400)
             Builds the financial dataset from the raw stock ticker data
+        make_sink(directory, manifest=None) -> ParquetSink
+            Returns a ParquetSink partitioned by the exchange of every ticker
+        refresh(path)
+            Brings a stored dataset up to date with the latest filings
+        get_latest_period_dates(path) -> pd.Series
+            Returns the latest period end of every ticker in a stored dataset
+        fetch_latest_period_date(ticker) -> pd.Timestamp
+            Returns the period end of the most recent income statement of a ticker
+        upsert_dataset_file(path, df) -> pd.DataFrame
+            Upserts the rows of df into a dataset file
+        upsert_dataset_directory(directory, df)
+            Upserts the rows of df into a dataset directory
         validate_data_is_float64(df) -> pd.DataFrame
             Validates that the data in the dataframe is of type float64
 
     """
 
-    def __init__(self, exchanges: List = ["New York Stock Exchange"]):
+    def __init__(
+        self,
+        exchanges: List = ["New York Stock Exchange"],
+        ticker_workers: int = 1,
+        request_workers: int = 1,
+        client: HttpClient = None,
+        rate_limiter: RateLimiter = None,
+        cache: ResponseCache = None,
+        price_store: PriceStore = None,
+        price_batch_size: int = 100,
+        profile_batch_size: int = 50,
+        base_url: str = FMP_BASE_URL,
+        yahoo_url: str = None,
+        return_horizons: Tuple[int] = DEFAULT_HORIZONS,
+        parse_batch_size: int = None,
+        parse_backend: str = "pandas",
+        compact_dtypes: bool = False,
+        float32_features: bool = False,
+        structured_index: bool = False,
+        parse_workers: int = None,
+        max_pending_parses: int = None,
+        output_directory: Union[str, Path] = None,
+        partition_by: Tuple[str] = DEFAULT_PARTITIONS,
+        resume: bool = False,
+        checkpoint_tickers: int = 250,
+        api_key: str = None,
+    ):
         """Constructs all the necessary attributes for the DatasetBuilder object.
 
         Args:
             exchanges : List, optional
                 a list of stock exchanges, by default None
+            ticker_workers : int, optional
+                the number of tickers that are scraped concurrently, by default 1
+            request_workers : int, optional
+                the number of requests per ticker that are sent concurrently,
+                by default 1
+            client : HttpClient, optional
+                the HTTP client used for all API requests, by default the
+                process-wide client
+            rate_limiter : RateLimiter, optional
+                the limiter that every API request of the client waits on, by
+                default None, i.e. requests are not throttled. Without a client,
+                a new HttpClient is created for the limiter instead of changing
+                the process-wide client. The limiter's state is shared with the
+                threads of this process and with child processes forked from
+                it, not with processes started in any other way
+            cache : ResponseCache, optional
+                an on-disk cache of API responses, by default None
+            price_store : PriceStore, optional
+                a local price history store so that only new bars are
+                downloaded, by default None
+            price_batch_size : int, optional
+                the number of tickers whose prices are downloaded together, by
+                default 100. None downloads each ticker's prices separately
+            profile_batch_size : int, optional
+                the number of tickers whose company profiles are requested
+                together, by default 50. None requests each profile separately
+            base_url : str, optional
+                the root of the Financial Modeling Prep API, by default the
+                real API. Point this at a StandInServer to build offline
+            yahoo_url : str, optional
+                the price endpoint of a StandInServer to download prices from
+                instead of Yahoo Finance, by default None
+            return_horizons : Tuple[int], optional
+                the horizons, in quarters, that returns are calculated over, by
+                default (1, 2, 3, 4)
+            parse_batch_size : int, optional
+                the number of scraped tickers that are parsed together by a
+                BatchDataParser, by default None, i.e. each ticker is parsed
+                separately by a DataParser
+            parse_backend : str, optional
+                the backend that batches of tickers are parsed with, by default
+                'pandas'. 'arrow' runs the parsing stages on Arrow tables with
+                an ArrowBatchParser, whose tables are streamed to Parquet without
+                converting them to pandas when output_directory is set. Only used
+                when parse_batch_size is set
+            compact_dtypes : bool, optional
+                whether build() stores descriptive columns as categoricals and
+                prints the memory saved, by default False
+            float32_features : bool, optional
+                whether build() also downcasts the ratio features to float32, by
+                default False. Implies compact_dtypes
+            structured_index : bool, optional
+                whether build() replaces the 'TICKER-PERIOD-YEAR' index with the
+                structured index of panel_index.make_panel_index, by default False
+            parse_workers : int, optional
+                the number of worker processes that parse scraped tickers, by
+                default None, i.e. tickers are parsed in this process. Scraping
+                keeps running on ticker_workers threads while the workers parse
+            max_pending_parses : int, optional
+                the number of parse jobs that may be queued or running at once,
+                by default twice parse_workers. Bounds the scraped data held in
+                memory while waiting for a worker
+            output_directory : str or Path, optional
+                the directory that build() streams the dataset to as a
+                partitioned Parquet dataset, by default None, i.e. the dataset
+                is built in memory. structured_index and compact_dtypes only
+                apply to datasets built in memory
+            partition_by : Tuple[str], optional
+                the partition columns of the streamed dataset, by default
+                ('exchange', 'year')
+            resume : bool, optional
+                whether build() continues the build in output_directory from
+                its manifest, by default False. Tickers that were written or
+                failed are skipped, and rows that were not committed are
+                rewritten. Requires output_directory
+            checkpoint_tickers : int, optional
+                the number of parsed tickers after which a streamed build
+                commits its open part files, by default 250. A resumed build
+                redoes at most this many tickers; smaller values lose less work
+                on a crash but write more, smaller files
+            api_key : str, optional
+                the Financial Modeling Prep API key, by default None, i.e. the
+                key is loaded by load_api_key when it is first needed
         """
         self.exchanges = exchanges
         self.possible_exchange_names = exchange_names_json["exchange_names"]
         self.raw_data = None
         self.dataset = None
+        self.ticker_workers = int(ticker_workers)
+        self.request_workers = int(request_workers)
+        if client is None:
+            client = get_default_client() if rate_limiter is None else HttpClient()
+        if rate_limiter is not None:
+            client.rate_limiter = rate_limiter
+        self.client = client
+        self.cache = cache
+        self.price_store = price_store
+        self.price_batch_size = price_batch_size
+        self.profile_batch_size = profile_batch_size
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.yahoo_url = yahoo_url
+        self.return_horizons = tuple(return_horizons)
+        self.parse_batch_size = parse_batch_size
+        self.parse_backend = parse_backend
+        self.compactor = (
+            DtypeCompactor(float32=float32_features)
+            if compact_dtypes or float32_features
+            else None
+        )
+        self.structured_index = structured_index
+        self.parse_workers = parse_workers
+        if max_pending_parses is None and parse_workers is not None:
+            max_pending_parses = 2 * parse_workers
+        self.max_pending_parses = max_pending_parses
+        self.output_directory = output_directory
+        self.partition_by = tuple(partition_by)
+        self.resume = resume
+        self.checkpoint_tickers = int(checkpoint_tickers)
+        self._api_key = api_key
+        self._parse_to_arrow = False
+        assert self.ticker_workers >= 1, "ticker_workers must be at least 1"
+        assert self.request_workers >= 1, "request_workers must be at least 1"
+        if self.price_batch_size is not None:
+            assert self.price_batch_size >= 1, "price_batch_size must be at least 1"
+        if self.profile_batch_size is not None:
+            assert self.profile_batch_size >= 1, "profile_batch_size must be at least 1"
+        if self.parse_batch_size is not None:
+            assert self.parse_batch_size >= 1, "parse_batch_size must be at least 1"
+        assert self.parse_backend in PARSE_BACKENDS, "Unknown parse_backend"
+        assert self.checkpoint_tickers >= 1, "checkpoint_tickers must be at least 1"
+        if self.resume:
+            assert self.output_directory is not None, "resume requires output_directory"
+        if self.parse_workers is not None:
+            assert self.parse_workers >= 1, "parse_workers must be at least 1"
+            assert self.max_pending_parses >= 1, "max_pending_parses must be at least 1"
+
+    @property
+    def api_key(self) -> str:
+        """The Financial Modeling Prep API key, loaded when first needed."""
+        if self._api_key is None:
+            self._api_key = load_api_key()
+        return self._api_key
 
     def build(self):
         """Fetches raw data from API and builds the financial dataset."""
+        if self.output_directory is not None:
+            manifest_path = Path(self.output_directory) / MANIFEST_NAME
+            assert (
+                self.resume or not manifest_path.exists()
+            ), "output_directory holds a build, pass resume=True to continue it"
         self.raw_data = self.fetch_raw_stock_ticker_data()
 
+        if self.output_directory is not None:
+            self.dataset = None
+            manifest = BuildManifest(manifest_path)
+            sink = self.make_sink(self.output_directory, manifest)
+            self.build_dataset(sink, manifest)
+            return
         self.dataset = self.clean_up_dataframe(self.build_dataset())
+        if self.structured_index:
+            self.dataset = structure_index(self.dataset)
+        if self.compactor is not None:
+            self.dataset = self.compactor.compact(self.dataset)
+            print(self.compactor.report())
 
     def get_fmp_api_url(self) -> str:
         """Returns the API url for fetching stock ticker data.
@@ -83,13 +436,15 @@ class DatasetBuilder:
             url: str
                 the API url for fetching stock ticker data
         """
-        url = f"https://financialmodelingprep.com/api/v3/stock/list?apikey={api_key}"
+        url = f"{self.base_url}v3/stock/list?apikey={self.api_key}"
         return url
 
-    @staticmethod
-    def make_stock_ticker_api_request(url: str) -> requests.Response:
+    def make_stock_ticker_api_request(self, url: str) -> requests.Response:
         """Makes an API request for stock ticker data.
 
+        The request goes through the shared HttpClient, so 429 and 5xx responses
+        are retried with backoff before the request is considered failed.
+
         Parameters:
             url : str
                 the API url for fetching stock ticker data
@@ -98,7 +453,7 @@ class DatasetBuilder:
             requests.Response
                 an API response object
         """
-        response = requests.get(url)
+        response = self.client.get(url)
         assert (
             response.status_code == 200
         ), f"API request failed: <{response.status_code}>"
@@ -126,8 +481,14 @@ class DatasetBuilder:
                 a list of dictionaries containing the raw stock ticker data
         """
         url = self.get_fmp_api_url()
+        if self.cache is not None:
+            data = self.cache.get(url)
+            if data is not None:
+                return data
         response = self.make_stock_ticker_api_request(url)
         data = self.response_to_json(response)
+        if self.cache is not None:
+            self.cache.set(url, data)
         return data
 
     def set_exchanges(self, new_exchanges: List[str] = ["New York Stock Exchange"]):
@@ -157,47 +518,587 @@ class DatasetBuilder:
                 return True
         return False
 
-    def build_dataset(self) -> pd.DataFrame:
+    def make_scraper(
+        self, ticker: str, prefetched_data: Dict = None, limit: int = 400
+    ) -> DataScraper:
+        """Constructs a DataScraper, fetching all of the data for the ticker.
+
+        Statement responses are projected onto the columns in features.json as
+        soon as they are decoded, so unused fields are never turned into
+        DataFrame columns.
+
+        Parameters:
+            ticker : str
+                the ticker symbol to scrape
+            prefetched_data : Dict, optional
+                entries of the data_dictionary that were already fetched for
+                the ticker, by default None
+            limit : int, optional
+                the number of most recent periods requested from each
+                statement endpoint, by default 400
+
+        Returns:
+            DataScraper
+                a scraper holding the data_dictionary for the ticker
+        """
+        return DataScraper(
+            ticker,
+            self.api_key,
+            max_workers=self.request_workers,
+            client=self.client,
+            cache=self.cache,
+            price_store=self.price_store,
+            prefetched_data=prefetched_data,
+            projection={key: features[key] for key in ["ratios", "metrics", "is"]},
+            base_url=self.base_url,
+            yahoo_url=self.yahoo_url,
+            limit=limit,
+        )
+
+    def fetch_batch_price_data(
+        self, tickers: List[str], start: dt.date = dt.date(1970, 1, 1)
+    ) -> Dict[str, pd.DataFrame]:
+        """Downloads the price data of many tickers from Yahoo Finance, or from
+        the stand-in server if yahoo_url is set.
+
+        Parameters:
+            tickers : List[str]
+                the ticker symbols to download
+            start : dt.date, optional
+                the first date to download, by default 1970-01-01
+
+        Returns:
+            Dict[str, pd.DataFrame]
+                the daily price data of each ticker
+        """
+        if self.yahoo_url is not None:
+            return fetch_stand_in_price_data(
+                self.client, self.yahoo_url, tickers, start
+            )
+        return DataScraper.fetch_batch_stock_price_data(tickers, start)
+
+    def prefetch_price_data(self, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+        """Downloads the price data of many tickers in one batched request.
+
+        If a price store is set, tickers are grouped by their last stored date
+        so that each group is downloaded from that date onwards only.
+
+        Parameters:
+            tickers : List[str]
+                the ticker symbols to download
+
+        Returns:
+            Dict[str, pd.DataFrame]
+                the daily price data of each ticker
+        """
+        if self.price_store is None:
+            return self.fetch_batch_price_data(tickers)
+
+        start_dates = {}
+        for ticker in tickers:
+            last_date = self.price_store.last_date(ticker)
+            start = last_date if last_date is not None else dt.date(1970, 1, 1)
+            start_dates.setdefault(start, []).append(ticker)
+
+        price_data = {}
+        for start, group in start_dates.items():
+            new_data = self.fetch_batch_price_data(group, start)
+            for ticker, df in new_data.items():
+                self.price_store.append(ticker, df)
+                stored = self.price_store.load(ticker)
+                price_data[ticker] = stored if stored is not None else pd.DataFrame()
+        return price_data
+
+    def get_fmp_profile_url(self, tickers: List[str]) -> str:
+        """Returns the API url for fetching the profiles of many tickers.
+
+        Parameters:
+            tickers : List[str]
+                the ticker symbols whose profiles are requested
+
+        Returns
+            url: str
+                the API url for fetching the company profiles
+        """
+        symbols = ",".join(tickers)
+        url = f"{self.base_url}v3/profile/{symbols}?apikey={self.api_key}"
+        return url
+
+    def prefetch_profile_data(self, tickers: List[str]) -> Dict[str, List[Dict]]:
+        """Fetches the company profiles of many tickers in chunked requests.
+
+        The profile endpoint accepts a comma-separated list of symbols, so one
+        request is made per profile_batch_size tickers. Tickers missing from a
+        response, or in a chunk whose request failed or was not answered with a
+        list of profiles, such as an {"Error Message": ...} object, are left out
+        so that their DataScraper requests the profile on its own.
+
+        Parameters:
+            tickers : List[str]
+                the ticker symbols whose profiles are requested
+
+        Returns:
+            Dict[str, List[Dict]]
+                the profile of each ticker in the same form as DataScraper's
+                'info' entry
+        """
+        profiles = {}
+        for i in range(0, len(tickers), self.profile_batch_size):
+            chunk = tickers[i : i + self.profile_batch_size]
+            url = self.get_fmp_profile_url(chunk)
+            data = self.cache.get(url) if self.cache is not None else None
+            if data is None:
+                try:
+                    response = self.make_stock_ticker_api_request(url)
+                except (AssertionError, requests.ConnectionError, requests.Timeout):
+                    continue
+                data = self.response_to_json(response)
+                if self.cache is not None and isinstance(data, list) and data:
+                    self.cache.set(url, data)
+            if not isinstance(data, list):
+                continue
+            for profile in data:
+                if profile.get("symbol") in chunk:
+                    profiles[profile["symbol"]] = [profile]
+        return profiles
+
+    def prefetch_batch(self, tickers: List[str]) -> Dict[str, Dict]:
+        """Fetches the data that is requested for a whole batch of tickers at once.
+
+        Parameters:
+            tickers : List[str]
+                the ticker symbols in the batch
+
+        Returns:
+            Dict[str, Dict]
+                the prefetched_data to hand to each ticker's DataScraper
+        """
+        prefetched = {ticker: {} for ticker in tickers}
+        if self.price_batch_size is not None:
+            for ticker, df in self.prefetch_price_data(tickers).items():
+                prefetched.setdefault(ticker, {})["price"] = df
+        if self.profile_batch_size is not None:
+            for ticker, profile in self.prefetch_profile_data(tickers).items():
+                prefetched.setdefault(ticker, {})["info"] = profile
+        return prefetched
+
+    def scrape_tickers(self, tickers: List[str], limit: int = 400):
+        """Scrapes tickers concurrently and yields the results in order.
+
+        Tickers are handled in batches of price_batch_size, whose prices and
+        profiles are prefetched before the batch is scraped. At most
+        ticker_workers tickers are in flight at any one time, so memory stays
+        bounded no matter how long the ticker list is. A ticker whose scrape
+        fails, including when a request could not connect or timed out after
+        every retry, is yielded with its error rather than stopping the build.
+
+        Parameters:
+            tickers : List[str]
+                the ticker symbols to scrape
+            limit : int, optional
+                the number of most recent periods requested from each
+                statement endpoint, by default 400
+
+        Yields:
+            Tuple[str, DataScraper]
+                the ticker and its scraper, or the AssertionError,
+                requests.ConnectionError or requests.Timeout that the scrape
+                failed with
+        """
+        batch_size = (
+            self.price_batch_size or self.profile_batch_size or max(len(tickers), 1)
+        )
+        with ThreadPoolExecutor(max_workers=self.ticker_workers) as executor:
+            pending = deque()
+            for i in range(0, len(tickers), batch_size):
+                batch = tickers[i : i + batch_size]
+                prefetched = self.prefetch_batch(batch)
+                for ticker in batch:
+                    future = executor.submit(
+                        self.make_scraper, ticker, prefetched.get(ticker), limit
+                    )
+                    pending.append((ticker, future))
+                    if len(pending) >= self.ticker_workers:
+                        yield self._resolve_scrape(*pending.popleft())
+            while pending:
+                yield self._resolve_scrape(*pending.popleft())
+
+    @staticmethod
+    def _resolve_scrape(ticker, future) -> Tuple[str, DataScraper]:
+        try:
+            return ticker, future.result()
+        except (AssertionError, requests.ConnectionError, requests.Timeout) as error:
+            return ticker, error
+
+    def parse_batch(self, data_dictionaries: Dict[str, Dict]) -> pd.DataFrame:
+        """Parses the data of many tickers together with the parse backend.
+
+        Args:
+            data_dictionaries : Dict[str, Dict]
+                the DataScraper.data_dictionary of every ticker, keyed by ticker
+
+        Returns:
+            pd.DataFrame
+                the combined final data of every ticker that could be parsed, or
+                None if none could be parsed
+        """
+        df, successful, failed = parse_data_dictionaries(
+            data_dictionaries, self.return_horizons, self.parse_backend
+        )
+        self._failed_tickers.extend(failed.keys())
+        self._successful_tickers.extend(successful)
+        return df
+
+    def make_sink(
+        self, directory: Union[str, Path], manifest: BuildManifest = None
+    ) -> ParquetSink:
+        """Returns a ParquetSink partitioned by partition_by, that looks up the
+        exchange of every ticker in raw_data.
+
+        Parameters:
+            directory : str or Path
+                the root directory of the dataset
+            manifest : BuildManifest, optional
+                the manifest of an interrupted build to continue, by default
+                None. Parts that the manifest does not list as committed are
+                deleted
+
+        Returns:
+            ParquetSink
+                the sink to pass to build_dataset
+        """
+        exchanges = {
+            dct["symbol"]: dct.get("exchange", "unknown") for dct in self.raw_data
+        }
+        if manifest is None or not manifest.path.exists():
+            return ParquetSink(directory, self.partition_by, exchanges)
+        sink = ParquetSink(
+            directory,
+            self.partition_by,
+            exchanges,
+            committed_parts=manifest.committed_parts,
+        )
+        sink.part = max(sink.part, manifest.get_next_part())
+        return sink
+
+    def build_dataset(
+        self,
+        collector=None,
+        manifest: BuildManifest = None,
+        tickers: List[str] = None,
+        limit: int = 400,
+    ) -> pd.DataFrame:
         """Builds the financial dataset from the raw stock ticker data.
 
+        Parameters:
+            collector : DatasetCollector or ParquetSink, optional
+                where the final data of every ticker is added as soon as it is
+                parsed, by default a new DatasetCollector
+            manifest : BuildManifest, optional
+                the manifest that the state of every ticker is recorded in, by
+                default None. Tickers that it lists as done or failed are
+                skipped, and the collector is committed every
+                checkpoint_tickers parsed tickers. Requires a ParquetSink
+                collector
+            tickers : List[str], optional
+                the tickers to build, by default every valid security in
+                raw_data
+            limit : int, optional
+                the number of most recent periods requested from each
+                statement endpoint, by default 400
+
         Returns:
             pd.DataFrame
-                a pandas dataframe containing the built financial dataset
+                a pandas dataframe containing the built financial dataset, or
+                the result of the collector
         """
         # setup
-        total_length = len(self.raw_data)
+        if tickers is None:
+            tickers = [
+                dct["symbol"] for dct in self.raw_data if self.check_valid_security(dct)
+            ]
         self._failed_tickers = list()
         self._successful_tickers = list()
-        total_df = None
+        self._retryable_tickers = set()
+        if collector is None:
+            collector = DatasetCollector()
+        # the arrow backend hands its tables to a ParquetSink without pandas
+        self._parse_to_arrow = isinstance(collector, ParquetSink)
+        if manifest is not None:
+            self._successful_tickers.extend(manifest.get_tickers(DONE))
+            self._failed_tickers.extend(manifest.get_tickers(FAILED))
+            finished = set(self._successful_tickers) | set(self._failed_tickers)
+            tickers = [ticker for ticker in tickers if ticker not in finished]
 
-        # main loop
-        for idx, dct in enumerate(self.raw_data):
-            # We only want to consider stocks
-            is_valid = self.check_valid_security(dct)
-            if not is_valid:
-                continue
+        scrapes = self.scrape_tickers(tickers, limit)
+        uncommitted = 0
+        for df, successful, failed in self.parse_scrapes(scrapes, len(tickers)):
+            part = collector.add(df)
+            self._successful_tickers.extend(successful)
+            self._failed_tickers.extend(failed.keys())
+            if manifest is not None:
+                manifest.record_written(successful, part)
+                retryable = set(failed) & self._retryable_tickers
+                for is_retryable in [False, True]:
+                    manifest.record_failed(
+                        {
+                            ticker: reason
+                            for ticker, reason in failed.items()
+                            if (ticker in retryable) == is_retryable
+                        },
+                        retryable=is_retryable,
+                    )
+                uncommitted += len(successful)
+                if uncommitted >= self.checkpoint_tickers:
+                    collector.commit()
+                    uncommitted = 0
+                self._record_commits(collector, manifest)
 
-            ticker = dct["symbol"]
-            print(ticker)
-            print(f"item: {idx}/{total_length}")
+        result = collector.result()
+        if manifest is not None:
+            self._record_commits(collector, manifest)
+        return result
 
-            try:
-                scraper = DataScraper(ticker, api_key)
-                parser = DataParser(scraper.data_dictionary)
-            except AssertionError:
-                self._failed_tickers.append(ticker)
-                continue
+    def refresh(self, path: Union[str, Path]):
+        """Brings a stored dataset up to date with the latest filings.
+
+        The latest period end of every ticker in the dataset is compared with
+        that of its most recent income statement, and only the tickers with a
+        newer period are scraped. Their statements are requested with a small
+        limit, covering the new periods and the stored periods whose forward
+        returns the new periods complete. The new rows then replace the stored
+        rows with the same index, or are added to the dataset. Tickers that are
+        not in the dataset are not scraped; run build() to add them.
+
+        Parameters:
+            path : str or Path
+                a dataset file written by save_dataset, or a dataset directory
+                written by build() with output_directory
+        """
+        path = Path(path)
+        latest_dates = self.get_latest_period_dates(path)
+        with ThreadPoolExecutor(max_workers=self.ticker_workers) as executor:
+            filing_dates = executor.map(
+                self.fetch_latest_period_date, latest_dates.index
+            )
+            gaps = {
+                ticker: (filing_date - latest_date).days
+                for ticker, latest_date, filing_date in zip(
+                    latest_dates.index, latest_dates, filing_dates
+                )
+                if filing_date is not None and filing_date > latest_date
+            }
+        # a quarter is at least 80 days long, even in a 52-53 week fiscal year
+        new_periods = int(np.ceil(max(gaps.values(), default=0) / 80))
+        limit = new_periods + max(self.return_horizons)
+        df = self.build_dataset(tickers=list(gaps), limit=limit)
+        if df is None:
+            self.dataset = None
+        elif path.is_dir():
+            self.dataset = None
+            self.upsert_dataset_directory(path, df)
+        else:
+            self.dataset = self.upsert_dataset_file(path, df)
+
+    @staticmethod
+    def get_latest_period_dates(path: Union[str, Path]) -> pd.Series:
+        """Returns the latest period end of every ticker in a stored dataset.
+
+        Parameters:
+            path : str or Path
+                a dataset file or directory
+
+        Returns:
+            pd.Series
+                the latest period end, indexed by ticker
+        """
+        stored = pd.read_parquet(path, columns=["date"])
+        tickers = ReturnsEngine.get_tickers_from_index(stored.index)
+        return pd.to_datetime(stored["date"]).groupby(tickers).max()
+
+    def fetch_latest_period_date(self, ticker: str) -> pd.Timestamp:
+        """Returns the period end of the most recent income statement of a
+        ticker, requested with a limit of 1.
+
+        The request bypasses the response cache so that new filings are seen as
+        soon as they are published.
 
-            df = parser.final_data
-            if total_df is None:
-                total_df = df
-            else:
-                total_df = pd.concat([total_df, df], axis=0)
+        Parameters:
+            ticker : str
+                the ticker symbol to check
 
-            self._successful_tickers.append(ticker)
-            clear_output()
-        
-        return total_df
+        Returns:
+            pd.Timestamp
+                the latest period end, or None if the request failed, could
+                not connect or was not answered with a list of statements
+        """
+        try:
+            scraper = DataScraper(
+                ticker,
+                self.api_key,
+                client=self.client,
+                base_url=self.base_url,
+                yahoo_url=self.yahoo_url,
+                lazy=True,
+                limit=1,
+            )
+            records = scraper.fetch_fmp_data("is")
+        except Exception as error:
+            if isinstance(error, AssertionError) or is_transient_error(error):
+                return None
+            raise
+        if not isinstance(records, list) or not records:
+            return None
+        return max(pd.Timestamp(record["date"]) for record in records)
+
+    def upsert_dataset_file(self, path: Path, df: pd.DataFrame) -> pd.DataFrame:
+        """Replaces the rows of a dataset file that have the same index as the
+        rows of df, adds the other rows of df, and writes the file back.
+
+        Parameters:
+            path : Path
+                a dataset file written by save_dataset
+            df : pd.DataFrame
+                the final data of the refreshed tickers
+
+        Returns:
+            pd.DataFrame
+                the updated dataset
+        """
+        stored = pd.read_parquet(path)
+        df = self.clean_up_dataframe(df)
+        if isinstance(stored.index, pd.MultiIndex):
+            df = structure_index(df)
+        dataset = pd.concat([stored[~stored.index.isin(df.index)], df], axis=0)
+        if self.compactor is not None:
+            dataset = self.compactor.compact(dataset)
+        # write next to the file and swap it in, so a crash never truncates it
+        temporary_path = path.with_name(f".{path.name}.tmp")
+        dataset.to_parquet(temporary_path, index=True)
+        temporary_path.replace(path)
+        return dataset
+
+    def upsert_dataset_directory(self, directory: Path, df: pd.DataFrame):
+        """Upserts the rows of df into a dataset directory, rewriting only the
+        partitions that they fall in.
+
+        Every ticker keeps the exchange partition it is stored in.
+
+        Parameters:
+            directory : Path
+                a dataset directory written by build() with output_directory
+            df : pd.DataFrame
+                the final data of the refreshed tickers
+        """
+        exchanges = {}
+        if "exchange" in self.partition_by:
+            stored = pd.read_parquet(directory, columns=["exchange"])
+            tickers = ReturnsEngine.get_tickers_from_index(stored.index)
+            exchanges = dict(zip(tickers, stored["exchange"].astype(str)))
+        sink = ParquetSink(directory, self.partition_by, exchanges)
+        sink.upsert(df)
+        manifest_path = directory / MANIFEST_NAME
+        if manifest_path.exists():
+            # so that resuming the build never deletes the refreshed part
+            self._record_commits(sink, BuildManifest(manifest_path))
+
+    @staticmethod
+    def _record_commits(sink: ParquetSink, manifest: BuildManifest):
+        for part in sink.committed_parts:
+            if part not in manifest.committed_parts:
+                manifest.record_committed(part)
+
+    def parse_scrapes(self, scrapes, total_length: int = None):
+        """Parses scraped tickers and yields the result of every job in order.
+
+        Tickers are parsed one at a time by a DataParser, or parse_batch_size at
+        a time by the parse backend. With parse_workers set, every parse job is
+        submitted to a pool of worker processes, and up to max_pending_parses
+        jobs are queued or running while the next tickers are scraped, so that
+        network waits and parsing overlap and parsing uses several cores. The
+        workers are started with PARSE_START_METHOD rather than forked, since
+        the scraping threads are running at that point.
+
+        Parameters:
+            scrapes : Iterator[Tuple[str, DataScraper]]
+                the scraped tickers, as yielded by scrape_tickers
+            total_length : int, optional
+                the number of tickers, for progress output
+
+        Yields:
+            Tuple[pd.DataFrame, List[str], Dict[str, str]]
+                the final data of each parse job, or None, the tickers that
+                were parsed and the reason each other ticker failed
+        """
+        executor = None
+        if self.parse_workers is not None:
+            executor = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context(PARSE_START_METHOD),
+            )
+        max_pending = self.max_pending_parses or 1
+        pending = deque()
+        batch = dict()
+        try:
+            for idx, (ticker, scraper) in enumerate(scrapes):
+                print(ticker)
+                print(f"item: {idx}/{total_length}")
+                clear_output()
+
+                if scraper is None or isinstance(scraper, Exception):
+                    jobs = [(None, [], {ticker: self.get_scrape_failure(scraper)})]
+                    if is_transient_error(scraper):
+                        self._retryable_tickers.add(ticker)
+                elif self.parse_batch_size is None:
+                    jobs = [{ticker: scraper.data_dictionary}]
+                else:
+                    batch[ticker] = scraper.data_dictionary
+                    jobs = []
+                    if len(batch) >= self.parse_batch_size:
+                        jobs, batch = [batch], dict()
+                for job in jobs:
+                    pending.append(self._submit_parse(executor, job))
+                # collect finished jobs in order, waiting only when the queue is full
+                while pending and (
+                    len(pending) > max_pending or self._is_parsed(pending[0])
+                ):
+                    yield self._collect_parse(pending.popleft())
+
+            if batch:
+                pending.append(self._submit_parse(executor, batch))
+            while pending:
+                yield self._collect_parse(pending.popleft())
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def get_scrape_failure(error: Exception) -> str:
+        """Returns the reason recorded for a ticker whose scrape failed with
+        error, or failed without one."""
+        if error is None or not str(error):
+            return "scrape failed"
+        return f"scrape failed: {error}"
+
+    def _submit_parse(self, executor, job):
+        """Starts a parse job, returning a Future or, without workers, its result."""
+        if isinstance(job, tuple):
+            return job
+        backend = self.parse_backend if self.parse_batch_size is not None else None
+        args = (self.return_horizons, backend, self._parse_to_arrow)
+        if executor is None:
+            return parse_data_dictionaries(job, *args)
+        job = {ticker: dict(data_dictionary) for ticker, data_dictionary in job.items()}
+        return executor.submit(parse_data_dictionaries, job, *args)
+
+    @staticmethod
+    def _is_parsed(job) -> bool:
+        return not isinstance(job, Future) or job.done()
+
+    @staticmethod
+    def _collect_parse(job) -> Tuple[pd.DataFrame, List[str], Dict[str, str]]:
+        """Waits for a parse job and returns its result."""
+        return job.result() if isinstance(job, Future) else job
 
     @staticmethod
     def clean_up_dataframe(df):
@@ -210,7 +1111,7 @@ class DatasetBuilder:
             pd.DataFrame: Cleaned DataFrame without the "start_date" column.
         """
         return df.drop(["start_date"], axis=1)
-    
+
     def save_dataset(self, path):
         """Saves the dataset as a Parquet file at the specified path with the index set to True.
 
@@ -218,4 +1119,3 @@ class DatasetBuilder:
             path (str): The file path where the dataset will be saved.
         """
         self.dataset.to_parquet(path, index=True)
-    
@@ -0,0 +1,65 @@
+from typing import List
+
+import pandas as pd
+
+
+class DatasetCollector:
+    """
+    Collects the final data of many tickers and concatenates it in linear time.
+
+    Appending every ticker to a growing DataFrame copies the whole dataset each time,
+    so the total cost is quadratic in the number of tickers. The collector instead
+    keeps the frames in a list and concatenates them once per chunk_size frames, then
+    once more over the chunks when the dataset is requested, so every row is copied at
+    most twice.
+
+    Args:
+        chunk_size (int, optional): The number of frames concatenated into one chunk.
+            Defaults to 256.
+
+    Attributes:
+        n_rows (int): The number of rows collected so far.
+
+    """
+
+    def __init__(self, chunk_size: int = 256):
+        self.chunk_size = int(chunk_size)
+        assert self.chunk_size >= 1, "chunk_size must be at least 1"
+        self.n_rows = 0
+        self._frames = []
+        self._chunks = []
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Adds the final data of one or more tickers.
+
+        Args:
+            df (pd.DataFrame): The frame to add. None is ignored.
+        """
+        if df is None:
+            return
+        self._frames.append(df)
+        self.n_rows += len(df)
+        if len(self._frames) >= self.chunk_size:
+            self._chunks.append(self.concat(self._frames))
+            self._frames = []
+
+    @staticmethod
+    def concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """Concatenates frames row-wise, without copying a single frame."""
+        return frames[0] if len(frames) == 1 else pd.concat(frames, axis=0)
+
+    def result(self) -> pd.DataFrame:
+        """
+        Returns the collected dataset.
+
+        Returns:
+            pd.DataFrame: Every collected row, in the order it was added, or None if
+                nothing was collected.
+        """
+        frames = self._chunks + self._frames
+        if not frames:
+            return None
+        dataset = self.concat(frames)
+        self._chunks, self._frames = [dataset], []
+        return dataset
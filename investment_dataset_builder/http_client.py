@@ -0,0 +1,232 @@
+import random
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import requests
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .rate_limiter import RateLimiter
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class UnsuccessfulRequestError(AssertionError):
+    """
+    Raised when a request is still answered with a status code other than 200 after
+    every retry. It is an AssertionError, as an unsuccessful request has always been,
+    so that existing handling of failed requests is unchanged.
+
+    Args:
+        status_code (int): The status code of the last response.
+
+    Attributes:
+        status_code (int): The status code of the last response.
+
+    """
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Request unsuccessful with status {status_code}")
+        self.status_code = status_code
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Returns True if a request failed for a reason that may go away by itself: a
+    throttled request, a server error, a timeout or a dropped connection.
+
+    Args:
+        error (BaseException): The exception the request failed with.
+
+    Returns:
+        bool: Whether trying the request again later may succeed.
+
+    """
+    if isinstance(error, UnsuccessfulRequestError):
+        return error.status_code in RETRY_STATUS_CODES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def is_unreachable_host_error(error: BaseException) -> bool:
+    """
+    Returns True if a request could not open a connection at all, because the host
+    name could not be resolved or the host refused the connection. Unlike a reset
+    connection or a timeout, retrying such a request straight away does not help.
+
+    Args:
+        error (BaseException): The exception the request failed with.
+
+    Returns:
+        bool: Whether the connection could not be set up.
+
+    """
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, NewConnectionError)
+
+
+class HttpClient:
+    """
+    A pooled, keep-alive HTTP client shared by every request made to Financial Modeling
+    Prep API.
+
+    A single requests.Session is used so that TCP connections and TLS sessions are
+    reused between requests instead of being set up for every call. Responses with a
+    retryable status code (429 and 5xx), reset connections and timeouts are retried
+    with a jittered exponential backoff. Requests whose host cannot be resolved or
+    refuses the connection fail straight away. A Retry-After header sent by the server takes
+    precedence over the computed backoff. If a rate limiter is set, every attempt
+    (including retries) waits for a token first, and 429 responses are reported to it.
+
+    Args:
+        timeout (float or tuple, optional): The (connect, read) timeout in seconds
+            passed to every request. Defaults to (5, 30).
+        max_retries (int, optional): The number of times a request is retried before
+            giving up. Defaults to 5.
+        backoff_factor (float, optional): The base delay in seconds of the exponential
+            backoff. Defaults to 0.5.
+        max_backoff (float, optional): The upper bound in seconds of a single backoff.
+            Defaults to 30.
+        pool_maxsize (int, optional): The number of connections kept alive per host.
+            Should be at least the number of threads sharing the client. Defaults to 32.
+        rate_limiter (RateLimiter, optional): The limiter shared by every request made
+            through the client. Defaults to None, i.e. no throttling.
+
+    Attributes:
+        session (requests.Session): The underlying pooled session.
+
+    """
+
+    def __init__(
+        self,
+        timeout: Union[float, Tuple[float, float]] = (5, 30),
+        max_retries: int = 5,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        pool_maxsize: int = 32,
+        rate_limiter: RateLimiter = None,
+    ):
+        assert max_retries >= 0, "max_retries must be non-negative"
+        assert backoff_factor >= 0, "backoff_factor must be non-negative"
+        self.timeout = timeout
+        self.max_retries = int(max_retries)
+        self.backoff_factor = float(backoff_factor)
+        self.max_backoff = float(max_backoff)
+        self.pool_maxsize = int(pool_maxsize)
+        self.rate_limiter = rate_limiter
+        self.session = self.create_session()
+
+    def create_session(self) -> requests.Session:
+        """
+        Creates a requests.Session with a connection pool sized for pool_maxsize.
+
+        Returns:
+            requests.Session: The pooled session.
+
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_maxsize,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def backoff_delay(self, attempt: int, response: Optional[Response] = None) -> float:
+        """
+        Returns the number of seconds to wait before retrying a request.
+
+        Args:
+            attempt (int): The zero-based number of the attempt that just failed.
+            response (Response, optional): The failed response, if one was received.
+
+        Returns:
+            float: The delay in seconds.
+
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(float(retry_after), self.max_backoff)
+                except ValueError:
+                    pass
+        ceiling = min(self.max_backoff, self.backoff_factor * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    def get(self, url: str) -> Response:
+        """
+        Sends a GET request, retrying on 429/5xx responses, reset connections and
+        timeouts.
+
+        Args:
+            url (str): The URL to send the request to.
+
+        Returns:
+            Response: The last response received. Its status code may still be a
+                retryable one if all retries were used up.
+
+        Raises:
+            requests.ConnectionError, requests.Timeout: Raised if the final attempt
+                could not connect or timed out, or at once if the host could not be
+                resolved or refused the connection.
+            QuotaExhaustedError: Raised if the rate limiter's daily quota is used up.
+
+        """
+        for attempt in range(self.max_retries + 1):
+            final_attempt = attempt == self.max_retries
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if final_attempt or is_unreachable_host_error(error):
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+                continue
+            if response.status_code == 429 and self.rate_limiter is not None:
+                self.rate_limiter.report_throttled()
+            if response.status_code not in RETRY_STATUS_CODES or final_attempt:
+                return response
+            time.sleep(self.backoff_delay(attempt, response))
+
+    def close(self) -> None:
+        """Closes every pooled connection held by the session."""
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> HttpClient:
+    """
+    Returns the process-wide HttpClient, creating it on first use.
+
+    Returns:
+        HttpClient: The shared client.
+
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def set_default_client(client: HttpClient) -> None:
+    """
+    Replaces the process-wide HttpClient, e.g. to change timeouts or retry settings.
+
+    Args:
+        client (HttpClient): The client to share between DataScraper and
+            DatasetBuilder instances.
+
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
@@ -0,0 +1,60 @@
+import json
+from typing import Dict, List, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is in requirements.txt; the standard library is a fallback
+    orjson = None
+
+
+def decode_json(raw: Union[bytes, str]) -> Union[Dict, List]:
+    """
+    Decodes a JSON document, using orjson when it is installed.
+
+    Args:
+        raw (bytes or str): The raw JSON document, e.g. Response.content.
+
+    Returns:
+        dict or list: The decoded JSON data.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def project_records(records: List[Dict], columns: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Projects a list of JSON records onto the given columns as typed arrays.
+
+    Only the requested columns are materialised, so the many unused fields of a
+    statement response are dropped straight after decoding instead of being carried
+    through a full DataFrame. Columns whose values are all numbers (or missing) become
+    float64 arrays with missing values as NaN; any other column is an object array.
+
+    Args:
+        records (List[Dict]): The decoded records of a Financial Modeling Prep API
+            response.
+        columns (List[str]): The columns to keep, e.g. an entry of features.json.
+
+    Returns:
+        Dict[str, np.ndarray]: One array per column, in the order of columns. This can
+            be passed straight to pd.DataFrame.
+    """
+    projected = {}
+    for column in columns:
+        values = [record.get(column) for record in records]
+        if all(_is_number(value) for value in values):
+            projected[column] = np.array(values, dtype=np.float64)
+        else:
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            projected[column] = array
+    return projected
+
+
+def _is_number(value) -> bool:
+    return value is None or (
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+    )
@@ -0,0 +1,162 @@
+from typing import Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+from .batch_data_parser import BatchDataParser
+
+# The small-int code of every fiscal period reported by Financial Modeling Prep
+PERIOD_CODES = {"FY": 0, "Q1": 1, "Q2": 2, "Q3": 3, "Q4": 4}
+
+INDEX_NAMES = ["symbol", "period", "year", "period_end"]
+
+
+def make_panel_index(
+    symbols: Iterable[str], periods: Iterable[str], dates: Iterable
+) -> pd.MultiIndex:
+    """
+    Creates the structured index of a panel from the symbol, period and period end of
+    every row.
+
+    The levels are the symbol, the fiscal period as its code in PERIOD_CODES, the
+    fiscal year and the period end as a datetime64. Every distinct level value is
+    stored once and every row holds a small integer code per level, so that joins and
+    lookups on the index compare integers rather than 'TICKER-PERIOD-YEAR' strings.
+
+    Args:
+        symbols (Iterable[str]): The symbol of every row.
+        periods (Iterable[str]): The fiscal period of every row, e.g. 'Q1' or 'FY'.
+        dates (Iterable): The period end of every row.
+
+    Returns:
+        pd.MultiIndex: The index, with the levels named as INDEX_NAMES.
+
+    Raises:
+        AssertionError: If a period is not in PERIOD_CODES.
+    """
+    period_values, period_uniques = pd.factorize(np.asarray(periods, dtype=object))
+    assert all(
+        period in PERIOD_CODES for period in period_uniques
+    ), "Unknown fiscal period"
+    period_table = np.array([PERIOD_CODES[p] for p in period_uniques], dtype=np.int8)
+    period_ends = pd.DatetimeIndex(dates)
+    return pd.MultiIndex.from_arrays(
+        [
+            pd.Categorical(np.asarray(symbols, dtype=object)),
+            period_table[period_values],
+            period_ends.year.values.astype(np.int16),
+            period_ends,
+        ],
+        names=INDEX_NAMES,
+    )
+
+
+def structure_index(df: pd.DataFrame, date_column: str = "date") -> pd.DataFrame:
+    """
+    Replaces the 'TICKER-PERIOD-YEAR' index of a DataParser or DatasetBuilder dataset
+    with the structured index of make_panel_index.
+
+    Args:
+        df (pd.DataFrame): The dataset, indexed by DataParser.create_df_index.
+        date_column (str, optional): The column holding the period end. Defaults to
+            'date'.
+
+    Returns:
+        pd.DataFrame: The dataset with the same columns and values and a structured
+            index, or df itself if it already has one.
+    """
+    if isinstance(df.index, pd.MultiIndex):
+        return df
+    parts = pd.Index(df.index).astype(str).str.rsplit("-", n=2)
+    return df.set_axis(
+        make_panel_index(parts.str[0], parts.str[1], df[date_column].values), axis=0
+    )
+
+
+class AsOfLookup:
+    """
+    A point-in-time lookup of the rows of a panel by symbol and date.
+
+    The row of a symbol as of a date is its row with the latest period end on or before
+    that date. Rows are sorted once by symbol code and period end and keyed by a single
+    int64 per row, so every lookup, for one symbol or many, is a binary search over
+    integer keys.
+
+    Note that a period's statements are filed some time after the period end, so the
+    row as of a date may not have been public on that date.
+
+    Args:
+        df (pd.DataFrame): The panel, with a structured index or one created by
+            DataParser.create_df_index.
+
+    Attributes:
+        df (pd.DataFrame): The panel, with a structured index.
+
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = structure_index(df)
+        index = self.df.index
+        self._symbols = index.levels[0]
+        codes = index.codes[0]
+        period_ends = index.levels[3].values[index.codes[3]]
+        keys = BatchDataParser.encode_dates(codes, period_ends)
+        self._order = np.argsort(keys, kind="stable")
+        self._keys = keys[self._order]
+        self._codes = codes[self._order]
+
+    def get_positions(
+        self, symbols: Iterable[str], dates: Union[str, Iterable]
+    ) -> np.ndarray:
+        """
+        Returns the position in df of the row of every symbol as of its date.
+
+        Args:
+            symbols (Iterable[str]): The symbols to look up.
+            dates (str or Iterable): One date for every symbol, or a single date for
+                all of them.
+
+        Returns:
+            np.ndarray: The position of every row, or -1 where the symbol is unknown or
+                has no period ending on or before the date.
+        """
+        codes = self._symbols.get_indexer(pd.Index(list(symbols), dtype=object))
+        if isinstance(dates, str) or np.ndim(dates) == 0:
+            dates = np.repeat(pd.Timestamp(dates).to_datetime64(), len(codes))
+        dates = pd.DatetimeIndex(dates).values
+        positions = np.searchsorted(
+            self._keys, BatchDataParser.encode_dates(codes, dates), side="right"
+        )
+        positions -= 1
+        found = (codes >= 0) & (positions >= 0)
+        found[found] = self._codes[positions[found]] == codes[found]
+        return np.where(found, self._order[np.maximum(positions, 0)], -1)
+
+    def get(self, symbol: str, date: str) -> pd.Series:
+        """
+        Returns the row of a symbol as of a date, e.g. get('AAPL', '2021-06-30').
+
+        Args:
+            symbol (str): The symbol to look up.
+            date (str): The date to look up.
+
+        Returns:
+            pd.Series: The row, or None if there is no row as of the date.
+        """
+        position = self.get_positions([symbol], date)[0]
+        return self.df.iloc[position] if position >= 0 else None
+
+    def get_many(self, symbols: List[str], dates: Union[str, Iterable]) -> pd.DataFrame:
+        """
+        Returns the row of every symbol as of its date.
+
+        Args:
+            symbols (List[str]): The symbols to look up.
+            dates (str or Iterable): One date for every symbol, or a single date for
+                all of them.
+
+        Returns:
+            pd.DataFrame: The rows that were found, in the order of symbols.
+        """
+        positions = self.get_positions(symbols, dates)
+        return self.df.take(positions[positions >= 0])
@@ -0,0 +1,361 @@
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .arrow_backend import INDEX_COLUMN, table_to_pandas
+from .returns_engine import ReturnsEngine
+
+DEFAULT_PARTITIONS = ("exchange", "year")
+
+
+class ParquetSink:
+    """
+    Streams the final data of many tickers to a partitioned Parquet dataset.
+
+    Frames can be added as DataFrames, or as pyarrow Tables in the
+    ArrowBatchParser.final_data layout, which are written without converting them
+    through pandas. Every added frame is split by its partition values and buffered
+    per partition.
+    Once rows_per_group rows of a partition are buffered, they are written as row
+    groups to the open part file of the partition, e.g.
+    directory/exchange=NASDAQ/year=2021/part-00000.parquet, and every buffer is written
+    out on commit, so memory stays bounded regardless of the number of tickers while
+    the row groups stay large enough to read efficiently. The dataset can be read back
+    with pd.read_parquet(directory).
+
+    Part files are numbered. Once rows_per_part rows have been written, every open part
+    file is closed and the next rows go to the next part; a part is only readable once
+    it is closed, and committed_parts lists the parts that have been closed.
+
+    The schema is fixed by the first frame, and every later frame is converted to it,
+    so that every part file has the same columns and types. Integer columns, and
+    columns that are missing throughout the first frame, are stored as float64, so
+    that later frames can have missing values in them.
+
+    A sink can continue a dataset whose writing was interrupted: given the parts that
+    were committed, it deletes the files of every other part, which may be incomplete,
+    and takes the schema from the committed files.
+
+    A sink can also update a complete dataset in place with upsert, which only rewrites
+    the partitions that the new rows fall in.
+
+    Args:
+        directory (str or Path): The root directory of the dataset.
+        partition_by (Tuple[str], optional): The partition columns. 'year' is the year
+            of the 'date' column and 'exchange' is looked up in exchanges by symbol,
+            unless the frames have columns of those names. Defaults to
+            ('exchange', 'year').
+        exchanges (Mapping[str, str], optional): The exchange of every symbol. Symbols
+            that are missing are written to the 'unknown' exchange. Defaults to None.
+        rows_per_part (int, optional): The number of rows after which the open part
+            files are closed. Defaults to 1,000,000.
+        rows_per_group (int, optional): The number of rows of a partition that are
+            buffered before they are written as a row group. Defaults to 50,000.
+        drop_columns (Tuple[str], optional): The columns that are not written, as in
+            DatasetBuilder.clean_up_dataframe. Defaults to ('start_date',).
+        committed_parts (Iterable[int], optional): The parts of an interrupted
+            dataset in directory that are complete. Defaults to None, i.e. every file
+            in directory is kept.
+
+    Attributes:
+        part (int): The number of the part that is being written.
+        committed_parts (List[int]): The parts whose files have all been closed.
+        n_rows (int): The number of rows written.
+
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        partition_by: Tuple[str] = DEFAULT_PARTITIONS,
+        exchanges: Mapping[str, str] = None,
+        rows_per_part: int = 1_000_000,
+        rows_per_group: int = 50_000,
+        drop_columns: Tuple[str] = ("start_date",),
+        committed_parts: Iterable[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.partition_by = tuple(partition_by)
+        self.exchanges = dict(exchanges or {})
+        self.rows_per_part = int(rows_per_part)
+        self.drop_columns = tuple(drop_columns)
+        self.rows_per_group = int(rows_per_group)
+        assert self.rows_per_part >= 1, "rows_per_part must be at least 1"
+        assert self.rows_per_group >= 1, "rows_per_group must be at least 1"
+        self.committed_parts = []
+        self.n_rows = 0
+        self.schema = None
+        self._columns = None
+        self._writers: Dict[Path, pq.ParquetWriter] = {}
+        self._buffers: Dict[Path, List[pa.Table]] = {}
+        self._buffered_rows: Dict[Path, int] = {}
+        self._part_rows = 0
+        if committed_parts is not None:
+            self.committed_parts = sorted(committed_parts)
+            for part in set(self.get_parts()) - set(self.committed_parts):
+                for path in self.get_part_files(part):
+                    path.unlink()
+            self.load_schema()
+        self.part = max(self.get_parts(), default=-1) + 1
+
+    def get_parts(self) -> List[int]:
+        """Returns the number of every part that has a file in directory."""
+        return sorted(
+            {
+                int(match.group(1))
+                for path in self.directory.rglob("part-*.parquet")
+                if (match := re.fullmatch(r"part-(\d+)\.parquet", path.name))
+            }
+        )
+
+    def load_schema(self) -> None:
+        """Takes the schema from the files of the latest committed part, if any."""
+        for part in reversed(self.committed_parts):
+            for path in self.get_part_files(part):
+                self.schema = pq.read_schema(path)
+                index_columns = self.schema.pandas_metadata["index_columns"]
+                self._columns = [
+                    name for name in self.schema.names if name not in index_columns
+                ]
+                return
+
+    def get_partition_values(self, df: Union[pd.DataFrame, pa.Table]) -> pd.DataFrame:
+        """
+        Returns the partition values of every row.
+
+        Args:
+            df (pd.DataFrame or pa.Table): The final data of one or more tickers.
+
+        Returns:
+            pd.DataFrame: One string column per partition column.
+        """
+        is_table = isinstance(df, pa.Table)
+        names = df.column_names if is_table else df.columns
+
+        def get_column(name):
+            if is_table:
+                return df.column(name).to_numpy()
+            return df[name].values
+
+        values = {}
+        for name in self.partition_by:
+            if name in names:
+                column = get_column(name)
+            elif name == "year":
+                column = pd.DatetimeIndex(get_column("date")).year.values
+            elif name == "exchange":
+                index = pd.Index(get_column(INDEX_COLUMN)) if is_table else df.index
+                symbols = ReturnsEngine.get_tickers_from_index(index)
+                column = [self.exchanges.get(s, "unknown") for s in symbols]
+            else:
+                raise AssertionError(f"Unknown partition column {name}")
+            values[name] = pd.Series(column, dtype=object).astype(str).values
+        return pd.DataFrame(values)
+
+    def get_partition_path(self, values: Tuple[str]) -> Path:
+        """Returns the part file of the partition with the given values."""
+        directory = self.directory
+        for name, value in zip(self.partition_by, values):
+            safe_value = re.sub(r"[^A-Za-z0-9._ -]", "_", value)
+            directory = directory / f"{name}={safe_value}"
+        return directory / f"part-{self.part:05d}.parquet"
+
+    def to_table(self, df: Union[pd.DataFrame, pa.Table]) -> pa.Table:
+        """Converts a frame to the schema of the dataset, fixing it on first use."""
+        if isinstance(df, pa.Table):
+            if self.schema is None:
+                # The schema, with the pandas metadata that pd.read_parquet restores
+                # the index from, is fixed from the first table as from a DataFrame
+                return self.to_table(table_to_pandas(df))
+            return self.cast_table(df)
+        keep = [
+            position
+            for position, name in enumerate(df.columns)
+            if name not in self.drop_columns and name not in self.partition_by
+        ]
+        df = df.iloc[:, keep]
+        if self.schema is None:
+            assert df.columns.is_unique, "Column names must be unique"
+            df = self.widen_dtypes(df)
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            self.schema = table.schema
+            self._columns = list(df.columns)
+            return table
+        assert set(df.columns) <= set(self._columns), "New columns in the dataset"
+        df = df.reindex(columns=self._columns)
+        return pa.Table.from_pandas(df, schema=self.schema, preserve_index=True)
+
+    def cast_table(self, table: pa.Table) -> pa.Table:
+        """
+        Converts a table in the ArrowBatchParser.final_data layout to the schema of the
+        dataset without converting it through pandas.
+
+        Args:
+            table (pa.Table): The columns of the final data followed by INDEX_COLUMN.
+
+        Returns:
+            pa.Table: The table, with the columns and types of the schema.
+        """
+        positions = {}
+        for position, name in enumerate(table.column_names):
+            if name not in self.drop_columns and name not in self.partition_by:
+                positions.setdefault(name, position)
+        positions.pop(INDEX_COLUMN, None)
+        assert set(positions) <= set(self._columns), "New columns in the dataset"
+        index_columns = self.schema.pandas_metadata["index_columns"]
+        arrays = []
+        for field in self.schema:
+            if field.name in index_columns:
+                array = table.column(INDEX_COLUMN)
+            elif field.name in positions:
+                array = table.column(positions[field.name])
+            else:
+                array = pa.nulls(table.num_rows)
+            arrays.append(array.cast(field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    @staticmethod
+    def widen_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts the integer columns, and the columns without any values, to float64.
+
+        Args:
+            df (pd.DataFrame): The first frame added to the dataset.
+
+        Returns:
+            pd.DataFrame: The frame with the widened columns.
+        """
+        widened = {
+            name: np.float64
+            for name, dtype in df.dtypes.items()
+            if pd.api.types.is_integer_dtype(dtype)
+            or (dtype == object and df[name].isna().all())
+        }
+        return df.astype(widened) if widened else df
+
+    def add(self, df: Union[pd.DataFrame, pa.Table]) -> int:
+        """
+        Appends the final data of one or more tickers to the dataset.
+
+        Args:
+            df (pd.DataFrame or pa.Table): The frame to add, as a DataFrame or in the
+                ArrowBatchParser.final_data layout. None is ignored.
+
+        Returns:
+            int: The part that the rows were written to.
+        """
+        if df is None or len(df) == 0:
+            return self.part
+        table = self.to_table(df)
+        partitions = self.get_partition_values(df)
+        groups = partitions.groupby(list(self.partition_by), sort=False).indices
+        for values, positions in groups.items():
+            values = values if isinstance(values, tuple) else (values,)
+            path = self.get_partition_path(values)
+            self._buffers.setdefault(path, []).append(
+                table.take(pa.array(np.sort(positions)))
+            )
+            self._buffered_rows[path] = self._buffered_rows.get(path, 0) + len(
+                positions
+            )
+            if self._buffered_rows[path] >= self.rows_per_group:
+                self.flush(path)
+        part = self.part
+        self.n_rows += len(df)
+        self._part_rows += len(df)
+        if self._part_rows >= self.rows_per_part:
+            self.commit()
+        return part
+
+    def flush(self, path: Path) -> None:
+        """
+        Writes the buffered rows of a partition to its open part file.
+
+        Args:
+            path (Path): The part file of the partition.
+        """
+        tables = self._buffers.pop(path, [])
+        self._buffered_rows.pop(path, None)
+        if not tables:
+            return
+        if path not in self._writers:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._writers[path] = pq.ParquetWriter(path, self.schema)
+        self._writers[path].write_table(
+            pa.concat_tables(tables), row_group_size=self.rows_per_group
+        )
+
+    def commit(self) -> int:
+        """
+        Writes every buffered row and closes every open part file, so that every row
+        added so far is readable.
+
+        Returns:
+            int: The part that was committed.
+        """
+        part = self.part
+        for path in list(self._buffers):
+            self.flush(path)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        if self._part_rows > 0:
+            self.committed_parts.append(part)
+            self.part += 1
+        self._part_rows = 0
+        return part
+
+    def result(self) -> Path:
+        """
+        Commits the last part and returns the root directory of the dataset.
+
+        Returns:
+            Path: The directory, readable with pd.read_parquet.
+        """
+        self.commit()
+        return self.directory
+
+    def upsert(self, df: pd.DataFrame) -> int:
+        """
+        Adds rows to the dataset, replacing the stored rows with the same index.
+
+        The stored rows of every partition that df has rows in, less the rows that df
+        replaces, are written to a new part together with df, and then the older files
+        of those partitions are deleted. Other partitions are not read or written. If
+        the process dies before the older files are deleted, the replaced rows are
+        duplicated until the upsert is repeated.
+
+        Args:
+            df (pd.DataFrame): The final data of one or more tickers.
+
+        Returns:
+            int: The part that the rows were written to.
+        """
+        partitions = self.get_partition_values(df).drop_duplicates()
+        directories = {
+            self.get_partition_path(tuple(values)).parent
+            for values in partitions.itertuples(index=False)
+        }
+        old_files = [
+            path
+            for directory in sorted(directories)
+            for path in sorted(directory.glob("part-*.parquet"))
+        ]
+        if old_files:
+            stored = pd.concat([pd.read_parquet(path) for path in old_files], axis=0)
+            self.add(stored[~stored.index.isin(df.index)])
+        self.add(df)
+        part = self.commit()
+        for path in old_files:
+            path.unlink()
+        return part
+
+    def get_part_files(self, part: int) -> List[Path]:
+        """Returns the files of a part, in every partition."""
+        return sorted(self.directory.rglob(f"part-{part:05d}.parquet"))
@@ -0,0 +1,113 @@
+import re
+import threading
+import datetime as dt
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+
+
+class PriceStore:
+    """
+    A local store of daily price history, partitioned by ticker.
+
+    Each ticker has its own directory holding one or more Parquet part files. New bars
+    are appended as a new part file rather than rewriting the history, and once a
+    ticker has more than max_parts parts they are compacted into a single file. When
+    parts overlap, the bar from the most recent part wins, so re-fetching the last
+    stored day (which may have been a partial bar) simply replaces it.
+
+    Args:
+        directory (str or Path, optional): The root directory of the store. Defaults
+            to ./price_store.
+        max_parts (int, optional): The number of part files a ticker may have before
+            they are compacted. Defaults to 32.
+
+    """
+
+    def __init__(self, directory: Union[str, Path] = None, max_parts: int = 32):
+        self.directory = Path(directory) if directory else Path.cwd() / "price_store"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_parts = int(max_parts)
+        self._lock = threading.Lock()
+
+    def get_ticker_directory(self, ticker: str) -> Path:
+        """Returns the partition directory of the ticker."""
+        safe_ticker = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+        return self.directory / f"ticker={safe_ticker}"
+
+    def get_parts(self, ticker: str) -> List[Path]:
+        """Returns the part files of the ticker, oldest first."""
+        return sorted(self.get_ticker_directory(ticker).glob("part-*.parquet"))
+
+    def load(self, ticker: str) -> Optional[pd.DataFrame]:
+        """
+        Loads the full stored price history of the ticker.
+
+        Args:
+            ticker (str): The ticker symbol.
+
+        Returns:
+            pd.DataFrame: The daily bars sorted by date, or None if nothing is stored.
+        """
+        parts = self.get_parts(ticker)
+        if not parts:
+            return None
+        df = pd.concat([pd.read_parquet(part) for part in parts], axis=0)
+        df = df[~df.index.duplicated(keep="last")]
+        return df.sort_index()
+
+    def last_date(self, ticker: str) -> Optional[dt.date]:
+        """
+        Returns the date of the most recent stored bar of the ticker.
+
+        Args:
+            ticker (str): The ticker symbol.
+
+        Returns:
+            datetime.date: The last stored date, or None if nothing is stored.
+        """
+        parts = self.get_parts(ticker)
+        if not parts:
+            return None
+        last_part = pd.read_parquet(parts[-1])
+        if len(last_part) == 0:
+            return None
+        return pd.Timestamp(last_part.index.max()).date()
+
+    def append(self, ticker: str, df: pd.DataFrame) -> None:
+        """
+        Appends new daily bars for the ticker as a new part file.
+
+        Args:
+            ticker (str): The ticker symbol.
+            df (pd.DataFrame): Daily bars indexed by date.
+        """
+        if df is None or len(df) == 0:
+            return
+        with self._lock:
+            directory = self.get_ticker_directory(ticker)
+            directory.mkdir(exist_ok=True)
+            parts = self.get_parts(ticker)
+            next_part = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+            df.sort_index().to_parquet(directory / f"part-{next_part:06d}.parquet")
+            if len(parts) + 1 > self.max_parts:
+                self.compact(ticker)
+
+    def compact(self, ticker: str) -> None:
+        """
+        Rewrites all part files of the ticker as a single part.
+
+        Args:
+            ticker (str): The ticker symbol.
+        """
+        parts = self.get_parts(ticker)
+        if len(parts) <= 1:
+            return
+        df = self.load(ticker)
+        next_part = int(parts[-1].stem.split("-")[1]) + 1
+        df.to_parquet(
+            self.get_ticker_directory(ticker) / f"part-{next_part:06d}.parquet"
+        )
+        for part in parts:
+            part.unlink()
@@ -0,0 +1,159 @@
+import datetime as dt
+import multiprocessing
+import time
+from typing import Dict
+
+from .response_cache import get_endpoint
+
+ENDPOINTS = (
+    "profile",
+    "ratios",
+    "key-metrics",
+    "income-statement",
+    "stock",
+    "economic",
+    "treasury",
+    "other",
+)
+
+
+class QuotaExhaustedError(RuntimeError):
+    """Raised when the daily API quota of the plan has been used up."""
+
+
+class RateLimiter:
+    """
+    A token-bucket rate limiter for Financial Modeling Prep API calls.
+
+    The limiter is configured from the plan's calls-per-minute limit and optional daily
+    quota. Tokens are added at calls_per_minute / 60 per second up to burst tokens, and
+    every call takes one token, so over any window the number of calls never exceeds
+    the plan's rate plus the burst. When the server answers with a 429 anyway, the rate
+    is multiplied by throttle_factor for throttle_seconds.
+
+    All state lives in multiprocessing shared memory guarded by a multiprocessing lock,
+    so a single limiter can be shared by every thread of a process and by child
+    processes forked from it. Processes started in any other way do not share it.
+
+    Args:
+        calls_per_minute (float): The plan's calls-per-minute limit.
+        daily_quota (int, optional): The plan's daily call quota. Defaults to None,
+            i.e. unlimited.
+        burst (int, optional): The maximum number of tokens that can accumulate.
+            Defaults to 1, i.e. calls are evenly spaced.
+        throttle_factor (float, optional): The factor the rate is multiplied by after
+            a 429 response. Defaults to 0.5.
+        throttle_seconds (float, optional): How long the reduced rate applies after a
+            429 response. Defaults to 60.
+
+    """
+
+    def __init__(
+        self,
+        calls_per_minute: float,
+        daily_quota: int = None,
+        burst: int = 1,
+        throttle_factor: float = 0.5,
+        throttle_seconds: float = 60.0,
+    ):
+        assert calls_per_minute > 0, "calls_per_minute must be positive"
+        assert burst >= 1, "burst must be at least 1"
+        assert 0 < throttle_factor <= 1, "throttle_factor must be in (0, 1]"
+        if daily_quota is not None:
+            assert daily_quota > 0, "daily_quota must be positive"
+        self.calls_per_minute = float(calls_per_minute)
+        self.daily_quota = daily_quota
+        self.burst = int(burst)
+        self.throttle_factor = float(throttle_factor)
+        self.throttle_seconds = float(throttle_seconds)
+
+        self._lock = multiprocessing.Lock()
+        self._tokens = multiprocessing.Value("d", float(self.burst), lock=False)
+        self._last_refill = multiprocessing.Value("d", time.monotonic(), lock=False)
+        self._throttled_until = multiprocessing.Value("d", 0.0, lock=False)
+        self._day = multiprocessing.Value("i", self.today(), lock=False)
+        self._daily_calls = multiprocessing.Value("q", 0, lock=False)
+        self._endpoint_calls = multiprocessing.Array("q", len(ENDPOINTS), lock=False)
+
+    @staticmethod
+    def today() -> int:
+        """Returns the ordinal of the current UTC date, used to reset the daily quota."""
+        return dt.datetime.now(dt.timezone.utc).date().toordinal()
+
+    @property
+    def rate(self) -> float:
+        """The current rate in calls per second, including any throttling."""
+        rate = self.calls_per_minute / 60
+        if time.monotonic() < self._throttled_until.value:
+            rate *= self.throttle_factor
+        return rate
+
+    def acquire(self, url: str = "") -> None:
+        """
+        Blocks until a call may be made, then records it against the url's endpoint.
+
+        Args:
+            url (str, optional): The url about to be requested.
+
+        Raises:
+            QuotaExhaustedError: Raised if the daily quota has been used up.
+        """
+        endpoint = get_endpoint(url)
+        endpoint_idx = ENDPOINTS.index(endpoint if endpoint in ENDPOINTS else "other")
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                rate = self.rate
+                elapsed = max(now - self._last_refill.value, 0.0)
+                tokens = min(float(self.burst), self._tokens.value + elapsed * rate)
+                self._last_refill.value = now
+
+                today = self.today()
+                if today != self._day.value:
+                    self._day.value = today
+                    self._daily_calls.value = 0
+                if (
+                    self.daily_quota is not None
+                    and self._daily_calls.value >= self.daily_quota
+                ):
+                    self._tokens.value = tokens
+                    raise QuotaExhaustedError("Daily API quota exhausted")
+
+                if tokens >= 1:
+                    self._tokens.value = tokens - 1
+                    self._daily_calls.value += 1
+                    self._endpoint_calls[endpoint_idx] += 1
+                    return
+                self._tokens.value = tokens
+                wait = (1 - tokens) / rate
+            time.sleep(wait)
+
+    def report_throttled(self) -> None:
+        """Reduces the rate for throttle_seconds after the server returned a 429."""
+        with self._lock:
+            self._throttled_until.value = time.monotonic() + self.throttle_seconds
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Returns the number of calls made, per endpoint and in total.
+
+        Returns:
+            Dict[str, int]: The calls per endpoint, plus 'total' and 'today'.
+        """
+        with self._lock:
+            usage = {
+                endpoint: self._endpoint_calls[idx]
+                for idx, endpoint in enumerate(ENDPOINTS)
+            }
+            usage["total"] = sum(self._endpoint_calls)
+            usage["today"] = self._daily_calls.value
+        return usage
+
+    def remaining_quota(self) -> float:
+        """Returns the number of calls left today, or infinity if there is no quota."""
+        if self.daily_quota is None:
+            return float("inf")
+        with self._lock:
+            if self.today() != self._day.value:
+                return self.daily_quota
+            return self.daily_quota - self._daily_calls.value
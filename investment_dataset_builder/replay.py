@@ -0,0 +1,375 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import datetime as dt
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import pandas as pd
+from requests import Response
+
+from .http_client import HttpClient
+from .response_cache import normalize_url
+
+FMP_HOST = "https://financialmodelingprep.com"
+
+
+class ReplayStore:
+    """
+    A directory of recorded Financial Modeling Prep API and Yahoo Finance responses.
+
+    FMP response bodies are stored verbatim, keyed by the normalized request url (the
+    apikey is stripped, see response_cache.normalize_url), so a recording made with one
+    key can be replayed with any other. Daily price data is stored as one Parquet file
+    per ticker.
+
+    Args:
+        directory (str or Path): The directory the recording is stored in.
+
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        (self.directory / "fmp").mkdir(parents=True, exist_ok=True)
+        (self.directory / "yahoo").mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def canonical_url(url: str) -> str:
+        """
+        Returns the normalized url of a request as if it had been sent to the real
+        Financial Modeling Prep host, whatever host it was actually sent to.
+        """
+        parts = urlsplit(url)
+        path = parts.path
+        if "/api/" in path:
+            path = path[path.index("/api/") :]
+        query = f"?{parts.query}" if parts.query else ""
+        return normalize_url(FMP_HOST + path + query)
+
+    def get_path(self, url: str) -> Path:
+        """Returns the file the response body for the url is stored in."""
+        key = hashlib.sha256(self.canonical_url(url).encode()).hexdigest()
+        return self.directory / "fmp" / f"{key}.json"
+
+    def save_response(self, url: str, body: bytes) -> None:
+        """
+        Records the body of a successful response.
+
+        Args:
+            url (str): The requested url.
+            body (bytes): The raw response body.
+        """
+        entry = {"url": self.canonical_url(url), "body": body.decode("utf-8")}
+        with open(self.get_path(url), "w") as f:
+            json.dump(entry, f)
+
+    def load_response(self, url: str) -> Optional[bytes]:
+        """
+        Returns the recorded response body for the url, or None if not recorded.
+
+        Args:
+            url (str): The requested url, on any host and with any apikey.
+        """
+        try:
+            with open(self.get_path(url), "r") as f:
+                return json.load(f)["body"].encode("utf-8")
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get_price_path(self, ticker: str) -> Path:
+        """Returns the file the price data of the ticker is stored in."""
+        safe_ticker = "".join(c if c.isalnum() or c in "._-" else "_" for c in ticker)
+        return self.directory / "yahoo" / f"{safe_ticker.upper()}.parquet"
+
+    def save_prices(self, price_data: Dict[str, pd.DataFrame]) -> None:
+        """
+        Records daily price data, e.g. the output of
+        DataScraper.fetch_batch_stock_price_data.
+
+        Args:
+            price_data (Dict[str, pd.DataFrame]): The daily bars of each ticker.
+        """
+        for ticker, df in price_data.items():
+            df.to_parquet(self.get_price_path(ticker))
+
+    def load_prices(self, ticker: str) -> pd.DataFrame:
+        """
+        Returns the recorded daily price data of the ticker.
+
+        Args:
+            ticker (str): The ticker symbol.
+
+        Returns:
+            pd.DataFrame: The daily bars, or an empty DataFrame if not recorded.
+        """
+        path = self.get_price_path(ticker)
+        if not path.exists():
+            return pd.DataFrame()
+        return pd.read_parquet(path)
+
+
+def make_response(url: str, status_code: int, body: bytes = b"") -> Response:
+    """Builds a requests.Response without making a request."""
+    response = Response()
+    response.url = url
+    response.status_code = status_code
+    response._content = body
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+class RecordingClient(HttpClient):
+    """
+    An HttpClient that records every successful response into a ReplayStore.
+
+    Use it in place of the default client for one live build to capture a recording.
+
+    Args:
+        store (ReplayStore): The store responses are recorded into.
+        **kwargs: Passed on to HttpClient.
+
+    """
+
+    def __init__(self, store: ReplayStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def get(self, url: str) -> Response:
+        response = super().get(url)
+        if response.status_code == 200:
+            self.store.save_response(url, response.content)
+        return response
+
+
+class ReplayClient(HttpClient):
+    """
+    An HttpClient that answers requests from a ReplayStore without any network access.
+
+    Unrecorded urls are answered with an empty JSON list, the same as Financial
+    Modeling Prep does for an unknown ticker.
+
+    Args:
+        store (ReplayStore): The recording to replay.
+        **kwargs: Passed on to HttpClient.
+
+    """
+
+    def __init__(self, store: ReplayStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def get(self, url: str) -> Response:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(url)
+        body = self.store.load_response(url)
+        return make_response(url, 200, body if body is not None else b"[]")
+
+
+def fetch_stand_in_price_data(
+    client: HttpClient, yahoo_url: str, tickers: List[str], start: dt.date
+) -> Dict[str, pd.DataFrame]:
+    """
+    Downloads daily price data for several tickers from a StandInServer.
+
+    Args:
+        client (HttpClient): The client used to make the request.
+        yahoo_url (str): The price endpoint of the server, StandInServer.yahoo_url.
+        tickers (List[str]): The ticker symbols to download.
+        start (datetime.date): The first date to download.
+
+    Returns:
+        Dict[str, pd.DataFrame]: The daily bars of every requested ticker. Tickers the
+            server has no data for map to an empty DataFrame.
+
+    Raises:
+        AssertionError: Raised if the request was unsuccessful.
+    """
+    url = f"{yahoo_url.rstrip('/')}/{','.join(tickers)}?start={start}"
+    response = client.get(url)
+    assert response.status_code == 200, "Request unsuccessful"
+    payload = response.json()
+    price_data = {}
+    for ticker in tickers:
+        split = payload.get(ticker)
+        if not split or not split["data"]:
+            price_data[ticker] = pd.DataFrame()
+            continue
+        index = pd.DatetimeIndex(pd.to_datetime(split["index"]), name="Date")
+        price_data[ticker] = pd.DataFrame(
+            split["data"], index=index, columns=split["columns"]
+        )
+    return price_data
+
+
+class StandInServer:
+    """
+    A local HTTP server that stands in for Financial Modeling Prep API and Yahoo
+    Finance, serving a ReplayStore.
+
+    FMP requests are served under /api/ with the same paths and parameters as the real
+    API, so a DataScraper or DatasetBuilder only needs base_url set to
+    StandInServer.base_url. Price data is served as JSON from StandInServer.yahoo_url.
+    Latency, server errors and rate limiting can be injected so that the fetch engine
+    and scheduler can be measured offline and repeatably.
+
+    Args:
+        store (ReplayStore): The recording to serve.
+        latency (float, optional): Seconds added to every response. Defaults to 0.
+        jitter (float, optional): Up to this many extra seconds are added at random.
+            Defaults to 0.
+        error_rate (float, optional): The fraction of requests answered with a 500.
+            Defaults to 0.
+        calls_per_minute (int, optional): Requests above this rate, over a sliding
+            60 second window, are answered with a 429. Defaults to None, i.e. no limit.
+        host (str, optional): The interface to bind to. Defaults to 127.0.0.1.
+        port (int, optional): The port to bind to. Defaults to 0, i.e. any free port.
+        seed (int, optional): Seed for the injected errors and jitter.
+
+    Attributes:
+        stats (Dict[str, int]): The number of requests, 200s, 429s, 500s and misses.
+
+    """
+
+    def __init__(
+        self,
+        store: ReplayStore,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        calls_per_minute: int = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = None,
+    ):
+        assert 0 <= error_rate <= 1, "error_rate must be between 0 and 1"
+        self.store = store
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.error_rate = float(error_rate)
+        self.calls_per_minute = calls_per_minute
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "misses": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """The url to pass as base_url to DataScraper and DatasetBuilder."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    @property
+    def yahoo_url(self) -> str:
+        """The url to pass as yahoo_url to DataScraper and DatasetBuilder."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/yahoo"
+
+    def start(self) -> "StandInServer":
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and releases the port."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _is_throttled(self) -> bool:
+        if self.calls_per_minute is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) >= self.calls_per_minute:
+                return True
+            self._calls.append(now)
+            return False
+
+    def respond(self, path: str) -> Tuple[int, bytes]:
+        """
+        Returns the status code and body for a request path, applying the injected
+        latency, errors and rate limit.
+
+        Args:
+            path (str): The path and query string of the request.
+
+        Returns:
+            Tuple[int, bytes]: The status code and response body.
+        """
+        self._count("requests")
+        delay = self.latency + (
+            self._random.uniform(0, self.jitter) if self.jitter else 0
+        )
+        if delay:
+            time.sleep(delay)
+        if self._is_throttled():
+            self._count("throttled")
+            return 429, b'{"Error Message": "Limit Reach"}'
+        if self.error_rate and self._random.random() < self.error_rate:
+            self._count("errors")
+            return 500, b'{"Error Message": "Injected error"}'
+
+        parts = urlsplit(path)
+        if parts.path.startswith("/yahoo/"):
+            tickers = unquote(parts.path[len("/yahoo/") :]).split(",")
+            start = dict(parse_qsl(parts.query)).get("start")
+            body = self._price_body(tickers, start)
+        else:
+            body = self.store.load_response(path)
+        if body is None:
+            self._count("misses")
+            body = b"[]"
+        self._count("ok")
+        return 200, body
+
+    def _price_body(self, tickers: List[str], start: Optional[str]) -> bytes:
+        payload = {}
+        for ticker in tickers:
+            df = self.store.load_prices(ticker)
+            if start is not None and len(df):
+                df = df[df.index >= pd.Timestamp(start)]
+            payload[ticker] = json.loads(df.to_json(orient="split", date_format="iso"))
+        return json.dumps(payload).encode("utf-8")
+
+    def _make_handler(self):
+        server = self
+
+        class StandInHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, body = server.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return StandInHandler
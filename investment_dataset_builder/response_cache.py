@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DAY = 24 * 60 * 60
+
+DEFAULT_TTLS = {
+    "profile": 30 * DAY,
+    "ratios": 7 * DAY,
+    "key-metrics": 7 * DAY,
+    "income-statement": 7 * DAY,
+    "stock": DAY,
+    "economic": DAY,
+    "treasury": DAY,
+}
+DEFAULT_TTL = DAY
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a Financial Modeling Prep API url for use as a cache key.
+
+    The apikey query parameter is removed, the remaining parameters are sorted and the
+    scheme and host are lowercased, so the same request always maps to the same key
+    regardless of which key or parameter order was used to make it.
+
+    Args:
+        url (str): The url returned by DataScraper.get_fmp_api_url.
+
+    Returns:
+        str: The normalized url.
+    """
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() != "apikey"
+    )
+    return urlunsplit(
+        (
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path,
+            urlencode(query),
+            "",
+        )
+    )
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Returns the endpoint name of a Financial Modeling Prep API url, e.g. 'ratios' for
+    'https://financialmodelingprep.com/api/v3/ratios/AAPL?period=quarter'.
+
+    Args:
+        url (str): A Financial Modeling Prep API url.
+
+    Returns:
+        str: The first path segment after the api version.
+    """
+    segments = [segment for segment in urlsplit(url).path.split("/") if segment]
+    if "api" in segments:
+        segments = segments[segments.index("api") + 1 :]
+    if segments and segments[0] in ("v3", "v4"):
+        segments = segments[1:]
+    return segments[0] if segments else ""
+
+
+class ResponseCache:
+    """
+    A persistent on-disk cache of decoded Financial Modeling Prep API responses.
+
+    Entries are keyed by the normalized request url (see normalize_url) so that cached
+    data is independent of the API key. Every endpoint has its own time-to-live;
+    company profiles change far less often than statements and are kept longer. When
+    the total size of the cache exceeds max_bytes the least recently used entries are
+    deleted. The LRU order and the total size are kept in memory, so that files are
+    only inspected when the cache is opened. The last access time of an entry is also
+    stored as its file modification time, so the LRU order survives between runs.
+
+    Args:
+        directory (str or Path, optional): The directory the cache is stored in.
+            Defaults to ./fmp_cache.
+        max_bytes (int, optional): The disk budget of the cache in bytes. Defaults to
+            2 GiB.
+        ttls (Dict[str, float], optional): Time-to-live in seconds per endpoint,
+            overriding the entries of DEFAULT_TTLS.
+
+    Attributes:
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that were absent or expired.
+        evictions (int): The number of entries deleted to stay within max_bytes.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = None,
+        max_bytes: int = 2 * 1024**3,
+        ttls: Dict[str, float] = None,
+    ):
+        self.directory = Path(directory) if directory else Path.cwd() / "fmp_cache"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # The size of every entry, from least to most recently used
+        self._sizes = OrderedDict()
+        stats = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stats.append((path, path.stat()))
+            except OSError:
+                pass
+        for path, stat in sorted(stats, key=lambda item: item[1].st_mtime):
+            self._sizes[path] = stat.st_size
+        self._total = sum(self._sizes.values())
+
+    def get_ttl(self, url: str) -> float:
+        """Returns the time-to-live in seconds for the endpoint of the url."""
+        return self.ttls.get(get_endpoint(url), DEFAULT_TTL)
+
+    def get_path(self, url: str) -> Path:
+        """Returns the file an entry for the url is stored in."""
+        key = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+        return self.directory / (get_endpoint(url) or "other") / f"{key}.json"
+
+    def get(self, url: str) -> Optional[Union[Dict, List]]:
+        """
+        Returns the cached data for the url, or None if it is absent or expired.
+
+        Args:
+            url (str): A Financial Modeling Prep API url, with or without an apikey.
+
+        Returns:
+            dict or list: The decoded JSON data, or None on a miss.
+        """
+        path = self.get_path(url)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry["stored_at"] > self.get_ttl(url):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if path in self._sizes:
+                self._sizes.move_to_end(path)
+        return entry["data"]
+
+    def set(self, url: str, data: Union[Dict, List]) -> None:
+        """
+        Stores the data for the url, evicting old entries if over budget.
+
+        Args:
+            url (str): A Financial Modeling Prep API url, with or without an apikey.
+            data (dict or list): The decoded JSON data.
+        """
+        path = self.get_path(url)
+        path.parent.mkdir(exist_ok=True)
+        entry = {"url": normalize_url(url), "stored_at": time.time(), "data": data}
+        body = json.dumps(entry).encode("utf-8")
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total += len(body) - self._sizes.pop(path, 0)
+            self._sizes[path] = len(body)
+            self.evict()
+
+    def evict(self) -> None:
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        while self._total > self.max_bytes and self._sizes:
+            path, size = self._sizes.popitem(last=False)
+            self._total -= size
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Deletes every entry in the cache."""
+        with self._lock:
+            for path in self._sizes:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._sizes = OrderedDict()
+            self._total = 0
+
+    @property
+    def size(self) -> int:
+        """The total size of the cached entries in bytes."""
+        return self._total
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters.
+
+        Returns:
+            Dict[str, int]: hits, misses, evictions, entries and bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._sizes),
+                "bytes": self._total,
+            }
@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HORIZONS = (1, 2, 3, 4)
+
+
+class ReturnsEngine:
+    """
+    A vectorized forward-return calculator for a panel of quarterly prices.
+
+    The panel holds one row per ticker and period, with the rows of every ticker
+    ordered most recent first, as in DataParser.final_data and the dataset built by
+    DatasetBuilder. The return over h quarters of a row is the price h rows above it,
+    within the same ticker, divided by its own price, so the h most recent rows of every
+    ticker have no return.
+
+    Prices are shifted with a single grouped shift per horizon over every ticker and
+    price column at once, so stock, benchmark and relative returns for any number of
+    horizons are computed in one pass without a per-ticker or per-row Python loop.
+
+    Args:
+        horizons (Iterable[int], optional): The horizons, in quarters, to calculate
+            returns over. Defaults to (1, 2, 3, 4).
+
+    """
+
+    def __init__(self, horizons: Iterable[int] = DEFAULT_HORIZONS):
+        self.horizons = tuple(int(horizon) for horizon in horizons)
+        assert len(self.horizons) > 0, "At least one horizon is required"
+        assert all(
+            horizon >= 1 for horizon in self.horizons
+        ), "Horizons must be at least 1 quarter"
+
+    @staticmethod
+    def get_tickers_from_index(index: pd.Index) -> np.ndarray:
+        """
+        Returns the ticker of every row of a panel indexed by DataParser.create_df_index
+        or by panel_index.make_panel_index.
+
+        Args:
+            index (pd.Index): Index labels of the form 'TICKER-PERIOD-YEAR', or a
+                structured index whose first level is the symbol.
+
+        Returns:
+            np.ndarray: The ticker of every row.
+        """
+        if isinstance(index, pd.MultiIndex):
+            return np.asarray(index.get_level_values(0), dtype=object)
+        return pd.Index(index).astype(str).str.rsplit("-", n=2).str[0].values
+
+    def calculate_price_ratios(
+        self, prices: pd.DataFrame, tickers: Union[np.ndarray, pd.Series] = None
+    ) -> Dict[int, pd.DataFrame]:
+        """
+        Calculates the forward price ratio of every price column for every horizon.
+
+        Args:
+            prices (pd.DataFrame): One or more price columns, most recent row first
+                within each ticker.
+            tickers (np.ndarray or pd.Series, optional): The ticker of every row. Defaults
+                to None, i.e. every row belongs to the same ticker.
+
+        Returns:
+            Dict[int, pd.DataFrame]: For every horizon, the ratios of every price column,
+                with the same index and columns as prices.
+        """
+        values = prices.astype(np.float64)
+        if tickers is None:
+            shift = values.shift
+        else:
+            grouped = values.groupby(np.asarray(tickers), sort=False)
+            shift = grouped.shift
+        return {horizon: shift(horizon) / values for horizon in self.horizons}
+
+    def calculate(
+        self,
+        panel: pd.DataFrame,
+        tickers: Union[np.ndarray, pd.Series] = None,
+        stock_column: str = "stockPriceAverage",
+        benchmark_column: str = "S&P500PriceAverage",
+    ) -> pd.DataFrame:
+        """
+        Calculates stock, benchmark and relative returns for every horizon.
+
+        The columns are named as the DataParser columns: stockPriceRatio_{h}Q,
+        snpPriceRatio_{h}Q and priceRatioRelativeToS&P_{h}Q.
+
+        Args:
+            panel (pd.DataFrame): The panel holding the stock and benchmark prices.
+            tickers (np.ndarray or pd.Series, optional): The ticker of every row, e.g.
+                get_tickers_from_index(panel.index). Defaults to None, i.e. every row
+                belongs to the same ticker.
+            stock_column (str, optional): The stock price column. Defaults to
+                'stockPriceAverage'.
+            benchmark_column (str, optional): The benchmark price column. Defaults to
+                'S&P500PriceAverage'.
+
+        Returns:
+            pd.DataFrame: The returns, with the same index as panel.
+        """
+        ratios = self.calculate_price_ratios(
+            panel[[stock_column, benchmark_column]], tickers
+        )
+        returns = {}
+        for horizon, ratio in ratios.items():
+            returns[f"stockPriceRatio_{horizon}Q"] = ratio[stock_column]
+        for horizon, ratio in ratios.items():
+            returns[f"snpPriceRatio_{horizon}Q"] = ratio[benchmark_column]
+        for horizon, ratio in ratios.items():
+            relative = ratio[stock_column] / ratio[benchmark_column]
+            returns[f"priceRatioRelativeToS&P_{horizon}Q"] = relative
+        return pd.DataFrame(returns, index=panel.index)
@@ -0,0 +1,56 @@
+"""Data shared by the test modules."""
+
+from investment_dataset_builder.json_decoder import project_records
+from pathlib import Path
+import json
+import numpy as np
+import pandas as pd
+
+feature_path = Path.cwd() / "investment_dataset_builder" / "features.json"
+with open(feature_path, "r") as f:
+    features = json.load(f)
+
+
+def make_data_dictionary(ticker, n_quarters, seed, projected=False, end="2022-12-31"):
+    """
+    Returns a data dictionary shaped like DataScraper.data_dictionary, with random
+    statement values and a random walk of daily prices, for the quarters up to end.
+    """
+    rng = np.random.default_rng(seed)
+    period_ends = pd.date_range(end=end, periods=n_quarters, freq="Q")[::-1]
+    data_dictionary = {
+        "info": [
+            {
+                "symbol": ticker,
+                "companyName": f"{ticker} Inc.",
+                "currency": "USD",
+                "exchange": "NASDAQ",
+                "industry": "Software",
+                "sector": "Technology",
+            }
+        ]
+    }
+    for key in ["ratios", "metrics", "is"]:
+        records = []
+        for date in period_ends:
+            record = {"date": str(date.date()), "period": f"Q{date.quarter}"}
+            for col in features[key][2:]:
+                record[col] = float(rng.normal()) + 2.0
+            records.append(record)
+        if projected:
+            records = project_records(records, features[key])
+        data_dictionary[key] = records
+    days = pd.bdate_range(period_ends[-1] - pd.Timedelta(days=200), end, name="Date")
+    close = 100 + np.cumsum(rng.normal(size=len(days)))
+    data_dictionary["price"] = pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Adj Close": close,
+            "Volume": 1e6,
+        },
+        index=days,
+    )
+    return data_dictionary
@@ -0,0 +1,98 @@
+import sys
+from investment_dataset_builder import ArrowBatchParser, BatchDataParser
+from tests.helpers import make_data_dictionary
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append("..")
+
+
+class TestArrowBatchParser(unittest.TestCase):
+    """
+    A unittest test case for the ArrowBatchParser class.
+
+    """
+
+    def assert_matches_batch_data_parser(self, data_dictionaries, **kwargs):
+        parser = ArrowBatchParser(data_dictionaries, **kwargs)
+        expected = BatchDataParser(data_dictionaries, **kwargs)
+        self.assertIsInstance(parser.final_data, pa.Table)
+        pd.testing.assert_frame_equal(parser.to_pandas(), expected.final_data)
+        self.assertEqual(parser.tickers, expected.tickers)
+        self.assertEqual(parser.failed_tickers, expected.failed_tickers)
+        return parser
+
+    def test_matches_batch_data_parser(self):
+        """Asserts that the Arrow result equals the pandas batch result."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 10 + i, seed=i) for i in range(6)
+        }
+        self.assert_matches_batch_data_parser(data_dictionaries)
+        self.assert_matches_batch_data_parser(data_dictionaries, return_horizons=[2, 8])
+
+    def test_projected_payloads(self):
+        """Asserts that projected column payloads are stacked like JSON records."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 12, seed=i, projected=i % 3 != 0)
+            for i in range(5)
+        }
+        self.assert_matches_batch_data_parser(data_dictionaries)
+
+    def test_failed_and_separate_tickers(self):
+        """Asserts that failed and duplicate-period companies are handled as pandas."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(4)
+        }
+        data_dictionaries["T1"]["price"] = data_dictionaries["T1"]["price"].iloc[:0]
+        del data_dictionaries["T2"]["is"]
+        ratios = data_dictionaries["T3"]["ratios"]
+        data_dictionaries["T3"]["ratios"] = ratios[:2] + ratios[:2] + ratios[2:]
+        parser = self.assert_matches_batch_data_parser(data_dictionaries)
+        self.assertEqual(parser.failed_tickers, ["T1", "T2", "T3"])
+
+        self.assertIsNone(ArrowBatchParser({"T1": data_dictionaries["T1"]}).final_data)
+
+    def test_periods_without_snp_500_data(self):
+        """Asserts that a company with periods after the S&P 500 data ends fails."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(3)
+        }
+        data_dictionaries["T1"] = make_data_dictionary("T1", 8, 1, end="2024-12-31")
+        parser = self.assert_matches_batch_data_parser(data_dictionaries)
+        self.assertEqual(parser.failed_tickers, ["T1"])
+
+    def test_separately_parsed_tickers(self):
+        """Asserts that separately parsed companies are converted to Arrow in order."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(3)
+        }
+        expected = BatchDataParser(data_dictionaries).final_data
+        t1 = expected.loc[expected.index.str.startswith("T1-")]
+        ratios = data_dictionaries["T1"]["ratios"]
+        data_dictionaries["T1"]["ratios"] = ratios + ratios[-1:]
+        with patch.object(ArrowBatchParser, "parse_separately", return_value=t1):
+            parser = ArrowBatchParser(data_dictionaries)
+        self.assertEqual(parser.tickers, ["T0", "T1", "T2"])
+        pd.testing.assert_frame_equal(parser.to_pandas(), expected)
+
+    def test_write_parquet(self):
+        """Asserts that the table is written without the start_date columns."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(2)
+        }
+        parser = ArrowBatchParser(data_dictionaries)
+        path = Path.cwd() / "test_arrow_backend.parquet"
+        try:
+            parser.write_parquet(path)
+            saved = pd.read_parquet(path).set_index("index")
+        finally:
+            path.unlink()
+        expected = parser.to_pandas().drop(["start_date"], axis=1)
+        pd.testing.assert_frame_equal(saved, expected, check_names=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
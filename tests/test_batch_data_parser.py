@@ -0,0 +1,110 @@
+import sys
+from investment_dataset_builder import BatchDataParser, DataParser
+from tests.helpers import make_data_dictionary
+import unittest
+import warnings
+import pandas as pd
+
+sys.path.append("..")
+
+
+class TestBatchDataParser(unittest.TestCase):
+    """
+    A unittest test case for the BatchDataParser class.
+
+    """
+
+    def assert_matches_data_parser(self, data_dictionaries, parser):
+        expected = pd.concat(
+            [DataParser(dd).final_data for dd in data_dictionaries.values()], axis=0
+        )
+        pd.testing.assert_frame_equal(parser.final_data, expected)
+
+    def test_matches_data_parser(self):
+        """Asserts that the batch result equals the concatenated DataParser results."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 10 + i, seed=i) for i in range(6)
+        }
+        parser = BatchDataParser(data_dictionaries)
+        self.assert_matches_data_parser(data_dictionaries, parser)
+        self.assertEqual(parser.tickers, list(data_dictionaries))
+        self.assertEqual(parser.failed_tickers, [])
+
+    def test_projected_payloads(self):
+        """Asserts that projected column payloads are stacked like JSON records."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 12, seed=i, projected=i % 2 == 0)
+            for i in range(4)
+        }
+        parser = BatchDataParser(data_dictionaries)
+        self.assert_matches_data_parser(data_dictionaries, parser)
+
+    def test_return_horizons(self):
+        """Asserts that the return horizons are passed on to the returns engine."""
+        data_dictionaries = {"T0": make_data_dictionary("T0", 12, seed=0)}
+        parser = BatchDataParser(data_dictionaries, return_horizons=[2, 8])
+        expected = DataParser(data_dictionaries["T0"], return_horizons=[2, 8])
+        pd.testing.assert_frame_equal(parser.final_data, expected.final_data)
+        self.assertIn("priceRatioRelativeToS&P_8Q", parser.final_data.columns)
+
+    def test_failed_tickers(self):
+        """Asserts that companies without common periods or data are skipped."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(3)
+        }
+        data_dictionaries["T1"]["price"] = data_dictionaries["T1"]["price"].iloc[:0]
+        del data_dictionaries["T2"]["is"]
+        parser = BatchDataParser(data_dictionaries)
+        self.assertEqual(parser.tickers, ["T0"])
+        self.assertEqual(parser.failed_tickers, ["T1", "T2"])
+        self.assert_matches_data_parser({"T0": data_dictionaries["T0"]}, parser)
+
+        parser = BatchDataParser({"T1": data_dictionaries["T1"]})
+        self.assertIsNone(parser.final_data)
+
+    def test_duplicate_periods_are_parsed_separately(self):
+        """Asserts that a company with duplicate periods falls back to DataParser."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(3)
+        }
+        metrics = data_dictionaries["T1"]["metrics"]
+        data_dictionaries["T1"]["metrics"] = metrics + metrics[-1:]
+        with self.assertRaises(AssertionError):
+            DataParser(data_dictionaries["T1"])
+
+        parser = BatchDataParser(data_dictionaries)
+        self.assertEqual(parser.tickers, ["T0", "T2"])
+        self.assertEqual(parser.failed_tickers, ["T1"])
+        del data_dictionaries["T1"]
+        self.assert_matches_data_parser(data_dictionaries, parser)
+
+    def test_periods_without_snp_500_data(self):
+        """Asserts that a company with periods after the S&P 500 data ends fails."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(3)
+        }
+        data_dictionaries["T1"] = make_data_dictionary("T1", 8, 1, end="2024-12-31")
+        with self.assertRaises(AssertionError):
+            DataParser(data_dictionaries["T1"])
+
+        parser = BatchDataParser(data_dictionaries)
+        self.assertEqual(parser.tickers, ["T0", "T2"])
+        self.assertEqual(parser.failed_tickers, ["T1"])
+        del data_dictionaries["T1"]
+        self.assert_matches_data_parser(data_dictionaries, parser)
+
+    def test_partial_periods_without_warnings(self):
+        """Asserts that dropping unmatched periods raises no SettingWithCopyWarning."""
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 8, seed=i) for i in range(2)
+        }
+        data_dictionaries["T0"]["metrics"] = data_dictionaries["T0"]["metrics"][1:]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", pd.errors.SettingWithCopyWarning)
+            parser = BatchDataParser(data_dictionaries)
+        self.assertEqual(len(parser.final_data.filter(like="T0-", axis=0)), 7)
+        self.assert_matches_data_parser(data_dictionaries, parser)
+
+
+if __name__ == "__main__":
+    unittest.main()
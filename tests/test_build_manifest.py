@@ -0,0 +1,70 @@
+import sys
+from investment_dataset_builder import BuildManifest
+import unittest
+import tempfile
+from pathlib import Path
+
+sys.path.append("..")
+
+
+class TestBuildManifest(unittest.TestCase):
+    """
+    A unittest test case for the BuildManifest class.
+
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "_manifest.jsonl"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_done_only_after_commit(self):
+        manifest = BuildManifest(self.path)
+        manifest.record_written(["AAPL", "XOM"], 0)
+        self.assertEqual(manifest.get_state("AAPL"), "written")
+        self.assertEqual(manifest.get_tickers("done"), [])
+        manifest.record_committed(0)
+        self.assertEqual(manifest.get_tickers("done"), ["AAPL", "XOM"])
+        self.assertIsNone(manifest.get_state("MSFT"))
+
+    def test_reload(self):
+        manifest = BuildManifest(self.path)
+        manifest.record_written(["AAPL"], 0)
+        manifest.record_committed(0)
+        manifest.record_written(["XOM"], 1)
+        manifest.record_failed({"FAIL": "scrape failed"})
+
+        reloaded = BuildManifest(self.path)
+        self.assertEqual(reloaded.get_tickers("done"), ["AAPL"])
+        self.assertEqual(reloaded.get_tickers("written"), ["XOM"])
+        self.assertEqual(reloaded.get_failure_reasons(), {"FAIL": "scrape failed"})
+        self.assertEqual(reloaded.committed_parts, {0})
+        self.assertEqual(reloaded.get_next_part(), 2)
+
+    def test_retry(self):
+        manifest = BuildManifest(self.path)
+        manifest.record_failed({"BUSY": "status 429"}, retryable=True)
+        manifest.record_failed({"FAIL": "no price data"})
+        reloaded = BuildManifest(self.path)
+        self.assertEqual(reloaded.get_tickers("retry"), ["BUSY"])
+        self.assertEqual(reloaded.get_tickers("failed"), ["FAIL"])
+        self.assertEqual(
+            reloaded.get_failure_reasons(),
+            {"BUSY": "status 429", "FAIL": "no price data"},
+        )
+
+    def test_truncated_line(self):
+        manifest = BuildManifest(self.path)
+        manifest.record_written(["AAPL"], 0)
+        with open(self.path, "a") as f:
+            f.write('{"event": "commit", "pa')
+
+        reloaded = BuildManifest(self.path)
+        self.assertEqual(reloaded.get_tickers("written"), ["AAPL"])
+        self.assertEqual(reloaded.committed_parts, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
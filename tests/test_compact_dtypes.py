@@ -0,0 +1,62 @@
+import sys
+from investment_dataset_builder import BatchDataParser, DtypeCompactor
+from investment_dataset_builder.compact_dtypes import FLOAT32_COLUMNS
+from tests.helpers import make_data_dictionary
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+
+class TestDtypeCompactor(unittest.TestCase):
+    """
+    A unittest test case for the DtypeCompactor class.
+
+    """
+
+    def make_dataset(self) -> pd.DataFrame:
+        data_dictionaries = {
+            f"T{i}": make_data_dictionary(f"T{i}", 16, seed=i) for i in range(4)
+        }
+        df = BatchDataParser(data_dictionaries).final_data
+        df = df.drop(["start_date"], axis=1)
+        df["sector"] = "Technology"
+        return df
+
+    def test_categorical_columns(self):
+        """Asserts that descriptive columns become categoricals with equal values."""
+        df = self.make_dataset()
+        compactor = DtypeCompactor()
+        compacted = compactor.compact(df)
+        self.assertEqual(compacted["period"].dtype, "category")
+        self.assertEqual(compacted["sector"].dtype, "category")
+        self.assertEqual(compacted["PE_avg"].dtype, np.float64)
+        pd.testing.assert_frame_equal(
+            compacted, df, check_dtype=False, check_categorical=False
+        )
+        self.assertGreater(compactor.memory_saved, 0)
+        self.assertIn("saved", compactor.report())
+
+    def test_float32_features(self):
+        """Asserts that only the ratio features are downcast to float32."""
+        df = self.make_dataset()
+        df.loc[df.index[0], "currentRatio"] = 1e300
+        compacted = DtypeCompactor(float32=True).compact(df)
+        for column in FLOAT32_COLUMNS:
+            expected = np.float64 if column == "currentRatio" else np.float32
+            self.assertEqual(compacted[column].dtype, expected, column)
+        self.assertEqual(compacted["stockPriceAverage"].dtype, np.float64)
+        self.assertEqual(compacted["priceRatioRelativeToS&P_1Q"].dtype, np.float64)
+        np.testing.assert_allclose(
+            compacted["PE_avg"].values, df["PE_avg"].values, rtol=1e-6
+        )
+
+    def test_memory_saved_requires_compact(self):
+        """Asserts that no memory report is available before compacting."""
+        with self.assertRaises(AssertionError):
+            DtypeCompactor().memory_saved
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,10 @@
 import sys
 from investment_dataset_builder import DataScraper, DataParser
+from investment_dataset_builder.data_parser import (
+    load_snp_500_data,
+    get_snp_500_aggregates,
+)
+from tests.helpers import make_data_dictionary
 import unittest
 from unittest.mock import Mock, patch
 import itertools
@@ -9,6 +14,7 @@ import pandas as pd
 import datetime as dt
 import json
 import numpy as np
+import tracemalloc
 
 sys.path.append("..")
 
@@ -82,7 +88,7 @@ class TestDataParser(unittest.TestCase):
         """
         Test the `create_period_start_date_feature` method of a parser instance.
 
-        This method should return a list of strings with the date corresponding to the 
+        This method should return a datetime64 array with the date corresponding to the
         start of the quarter that each input date belongs to.
 
         Args:
@@ -93,9 +99,15 @@ class TestDataParser(unittest.TestCase):
         """
         for instance in parser_instance_generator():
             strings = ["2020-10-11", "2012-01-01", "1999-12-31"]
-            expected = ["2020-07-12", "2011-10-02", "1999-10-01"]
+            expected = np.array(
+                ["2020-07-12", "2011-10-02", "1999-10-01"], dtype="datetime64[ns]"
+            )
             result = instance.create_period_start_date_feature(strings)
-            self.assertEqual(result, expected)
+            np.testing.assert_array_equal(result, expected)
+            result = instance.create_period_start_date_feature(
+                np.array(strings, dtype="datetime64[ns]")
+            )
+            np.testing.assert_array_equal(result, expected)
 
     def test_parse_info(self):
         """Test the parse_info method"""
@@ -371,10 +383,73 @@ class TestDataParser(unittest.TestCase):
             instance.price = instance.filter_daily_into_quarters(price)
             self.assertEqual(expected.equals(instance.price), True)
 
+    def test_aggregate_price_periods(self):
+        """Tests the vectorized aggregation of daily prices into periods.
+
+        Periods are half-open [start, end) intervals that may be adjacent, empty or
+        overlapping. Empty periods are masked out, and NaN closes are ignored by the
+        average.
+
+        Raises:
+            AssertionError: If the aggregated values differ from the expected values.
+        """
+        dates = pd.to_datetime(
+            ["2000-01-01", "2000-01-02", "2000-01-03", "2000-01-04", "2000-01-05"]
+        ).values
+        high = np.array([5.0, 6.0, 7.0, 8.0, 9.0])
+        low = np.array([1.0, 2.0, 3.0, 4.0, 0.5])
+        close = np.array([2.0, np.nan, 4.0, 6.0, 8.0])
+        start_dates = pd.to_datetime(
+            ["2000-01-01", "2000-01-03", "2000-02-01", "2000-01-02"]
+        ).values
+        end_dates = pd.to_datetime(
+            ["2000-01-03", "2000-01-06", "2000-03-01", "2000-01-05"]
+        ).values
+
+        average, period_high, period_low, has_data = DataParser.aggregate_price_periods(
+            dates, high, low, close, start_dates, end_dates
+        )
+        self.assertEqual(has_data.tolist(), [True, True, False, True])
+        self.assertEqual(average.tolist(), [2.0, 6.0, 5.0])
+        self.assertEqual(period_high.tolist(), [6.0, 9.0, 8.0])
+        self.assertEqual(period_low.tolist(), [1.0, 0.5, 2.0])
+
+    def test_get_snp_500_aggregates(self):
+        """Tests the process-wide memo of S&P 500 period aggregates.
+
+        The S&P 500 data must only be read once, and memoized aggregates, including
+        repeated periods within one call, must match a direct aggregation.
+
+        Raises:
+            AssertionError: If the data is re-read or the aggregates differ.
+        """
+        self.assertIs(load_snp_500_data(), load_snp_500_data())
+
+        df = load_snp_500_data()
+        start_dates = pd.to_datetime(
+            ["2000-01-01", "2000-04-01", "2000-01-01", "1960-01-01"]
+        ).values
+        end_dates = pd.to_datetime(
+            ["2000-04-01", "2000-07-01", "2000-04-01", "1960-04-01"]
+        ).values
+        expected = DataParser.aggregate_price_periods(
+            df.index.values,
+            df["High"].values,
+            df["Low"].values,
+            df["Close"].values,
+            start_dates,
+            end_dates,
+        )
+        for _ in range(2):
+            result = get_snp_500_aggregates(start_dates, end_dates)
+            self.assertEqual(result[3].tolist(), [True, True, True, False])
+            for result_values, expected_values in zip(result, expected):
+                np.testing.assert_array_equal(result_values, expected_values)
+
     def test_create_date_objects_from_strings(self):
         """
         Test if the function can correctly convert a list of date strings 
-        to datetime.date objects.
+        to a datetime64[ns] array.
 
         Args:
             None.
@@ -383,25 +458,21 @@ class TestDataParser(unittest.TestCase):
             None.
         """
         date_string_array = ["2000-01-01", "2020-10-12", "2023-01-19", "2019-07-12"]
-        expected = [
-            dt.date(2000, 1, 1),
-            dt.date(2020, 10, 12),
-            dt.date(2023, 1, 19),
-            dt.date(2019, 7, 12),
-        ]
+        expected = np.array(date_string_array, dtype="datetime64[ns]")
         for instance in parser_instance_generator():
-            result = list(instance.create_date_objects_from_strings(date_string_array))
-            self.assertEqual(result, expected)
+            result = instance.create_date_objects_from_strings(date_string_array)
+            self.assertEqual(result.dtype, np.dtype("datetime64[ns]"))
+            np.testing.assert_array_equal(result, expected)
 
     def test_create_date_objects_from_pd_timestamps(self):
         """
-        Test that a list of `datetime.date` objects is created from a list of pandas
+        Test that a datetime64[ns] array of dates is created from a list of pandas
         `Timestamp` objects.
 
-        The method creates a list of `datetime.date` objects by calling
+        The method creates a datetime64[ns] array by calling
         `create_date_objects_from_pd_timestamps` method of the `Parser` instance with 
         a list of pandas `Timestamp` objects as argument. It then compares the result 
-        with an expected list of `datetime.date` objects.
+        with an expected array of dates, with the time of day dropped.
 
         Args:
             self: The `ParserTests` instance.
@@ -410,24 +481,17 @@ class TestDataParser(unittest.TestCase):
             None.
 
         Raises:
-            AssertionError: If the list of `datetime.date` objects created by the 
-            method does not match the expected list of `datetime.date` objects.
+            AssertionError: If the array created by the method does not match the
+            expected array of dates.
         """
         from pandas._libs.tslibs.timestamps import Timestamp as ts
 
         date_string_array = ["2000-01-01", "2020-10-12", "2023-01-19", "2019-07-12"]
-        timestamp_array = [ts(i) for i in date_string_array]
-        expected = [
-            dt.date(2000, 1, 1),
-            dt.date(2020, 10, 12),
-            dt.date(2023, 1, 19),
-            dt.date(2019, 7, 12),
-        ]
+        timestamp_array = [ts(i) + pd.Timedelta(hours=9) for i in date_string_array]
+        expected = np.array(date_string_array, dtype="datetime64[ns]")
         for instance in parser_instance_generator():
-            result = list(
-                instance.create_date_objects_from_pd_timestamps(timestamp_array)
-            )
-            self.assertEqual(result, expected)
+            result = instance.create_date_objects_from_pd_timestamps(timestamp_array)
+            np.testing.assert_array_equal(result, expected)
 
     def test_calculate_PE_ratios(self):
         """
@@ -555,6 +619,149 @@ class TestDataParser(unittest.TestCase):
             result = instance.combine_dataframes()
             self.assertEqual(result.equals(expected), True)
 
+    def test_combine_dataframes_peak_memory(self):
+        """Tests that the planned join copies every column only once.
+
+        The combined DataFrame must equal a plain drop and concat of the source
+        DataFrames, while tracemalloc must report a lower peak memory than that
+        drop and concat. Aligned DataFrames must not be copied by filter_dataframes.
+
+        Raises:
+            AssertionError: If the result differs or the peak memory is not lower.
+        """
+        instance = DataParser(make_data_dictionary("TEST", 8, seed=0))
+        rng = np.random.default_rng(0)
+        n_rows = 20000
+        index = pd.Index([f"TEST-Q{i % 4 + 1}-{i}" for i in range(n_rows)])
+
+        def make_frame(prefix, n_cols, with_dates):
+            data = {}
+            if with_dates:
+                data["date"] = pd.date_range("1970-01-01", periods=n_rows).values
+                data["period"] = np.array(["Q1"] * n_rows, dtype=object)
+            for col in range(n_cols):
+                data[f"{prefix}{col}"] = rng.normal(size=n_rows)
+            return pd.DataFrame(data, index=index)
+
+        instance.ratios = make_frame("r", 40, True)
+        instance.metrics = make_frame("m", 30, True)
+        instance.is_ = make_frame("is", 5, True)
+        instance.price = make_frame("p", 3, False)
+        instance.snp_500 = make_frame("s", 3, False)
+        price = instance.price
+        instance.filter_dataframes()
+        self.assertIs(instance.price, price)
+        instance.returns = make_frame("ret", 4, False)
+
+        tracemalloc.start()
+        expected = pd.concat(
+            [
+                instance.ratios,
+                instance.metrics.drop(["date", "period"], axis=1),
+                instance.is_.drop(["date", "period"], axis=1),
+                instance.price,
+                instance.snp_500,
+                instance.returns,
+            ],
+            axis=1,
+        )
+        _, concat_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del expected
+
+        tracemalloc.start()
+        result = instance.combine_dataframes()
+        _, join_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        expected = pd.concat(
+            [
+                instance.ratios,
+                instance.metrics.drop(["date", "period"], axis=1),
+                instance.is_.drop(["date", "period"], axis=1),
+                instance.price,
+                instance.snp_500,
+                instance.returns,
+            ],
+            axis=1,
+        )
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertLess(join_peak, concat_peak)
+
+    def test_lazy_stages(self):
+        """Tests that a lazy parser only evaluates the stages an attribute needs.
+
+        Raises:
+            AssertionError: If stages are evaluated early, more than once, or the
+                lazily evaluated result differs from the eager one.
+        """
+        data_dictionary = make_data_dictionary("TEST", 12, seed=0)
+        instance = DataParser(data_dictionary, lazy=True)
+        self.assertEqual(instance._evaluated_stages, set())
+
+        instance.metrics
+        self.assertEqual(
+            instance._evaluated_stages, {"info", "statements", "price", "filter"}
+        )
+        with patch.object(
+            instance, "filter_dataframes", wraps=instance.filter_dataframes
+        ) as filter_dataframes:
+            result = instance.final_data
+        filter_dataframes.assert_not_called()
+
+        expected = DataParser(data_dictionary).final_data
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_lazy_attribute_order(self):
+        """Tests that lazy attributes do not depend on the order they are read in.
+
+        Raises:
+            AssertionError: If an attribute read after another one differs from the
+                same attribute read first, or from the eager parser's.
+        """
+        data_dictionary = make_data_dictionary("TEST", 12, seed=0)
+        expected = DataParser(data_dictionary)
+        orders = [
+            ["metrics", "ratios", "price", "snp_500"],
+            ["is_", "price", "ratios", "metrics"],
+            ["ratios", "snp_500", "metrics", "price"],
+            ["snp_500", "returns", "price", "ratios"],
+        ]
+        for order in orders:
+            instance = DataParser(data_dictionary, lazy=True)
+            for name in order:
+                pd.testing.assert_frame_equal(
+                    getattr(instance, name), getattr(expected, name)
+                )
+        self.assertIn("PE_avg", expected.ratios.columns)
+        self.assertIn("stockPriceRatio_1Q", expected.price.columns)
+
+    def test_selected_outputs(self):
+        """Tests that only the stages of the requested outputs are evaluated.
+
+        Raises:
+            AssertionError: If final_data holds other feature groups, or the S&P 500
+                and returns stages are evaluated for outputs that do not need them.
+        """
+        data_dictionary = make_data_dictionary("TEST", 12, seed=0)
+        expected = DataParser(data_dictionary).final_data
+        with patch.object(DataParser, "aggregate_snp_500") as aggregate_snp_500:
+            instance = DataParser(data_dictionary, outputs=["ratios", "metrics"])
+        aggregate_snp_500.assert_not_called()
+        self.assertNotIn("returns", instance._evaluated_stages)
+        # start_date and the three PE ratios, less the date and period of metrics
+        n_columns = len(features["ratios"]) + len(features["metrics"]) + 3
+        self.assertEqual(instance.final_data.shape[1], n_columns)
+        pd.testing.assert_frame_equal(instance.final_data, expected.iloc[:, :n_columns])
+
+        instance = DataParser(data_dictionary, outputs=["returns"])
+        pd.testing.assert_frame_equal(
+            instance.final_data, expected.filter(like="RelativeToS&P")
+        )
+
+        with self.assertRaises(AssertionError):
+            DataParser(data_dictionary, outputs=["ratios", "unknown"])
+
     def test_calculate_returns_from_series(self):
         """Test the `calculate_returns_from_series` method.
 
@@ -1,5 +1,10 @@
 import sys
-from investment_dataset_builder import DataScraper
+from investment_dataset_builder import (
+    DataScraper,
+    HttpClient,
+    PriceStore,
+    ResponseCache,
+)
 import unittest
 from unittest.mock import Mock, patch
 import itertools
@@ -7,7 +12,10 @@ from pathlib import Path
 import requests
 import pandas as pd
 import datetime as dt
-
+import json
+import numpy as np
+import time
+import tempfile
 
 sys.path.append("..")
 
@@ -128,7 +136,7 @@ class TestDataScraper(unittest.TestCase):
             mock_response.status_code = 200
             mock_response.content = b'{"result": "success"}'
 
-            with patch("requests.get", return_value=mock_response):
+            with patch.object(instance.client, "get", return_value=mock_response):
                 url = "https://example.com/api"
                 response = instance.make_fmp_api_requests(url)
                 self.assertEqual(response.status_code, 200)
@@ -191,3 +199,262 @@ class TestDataScraper(unittest.TestCase):
                     self.assertIsInstance(data[key], list)
                 else:
                     self.assertIsInstance(data[key], pd.DataFrame)
+
+    def test_fetch_data_concurrently(self):
+        """
+        Test that fetch_data with max_workers > 1 sends a ticker's requests at once.
+
+        Each mocked request sleeps, so the sequential fetch takes the sum of the
+        request times while the concurrent fetch takes roughly the slowest one.
+
+        Raises:
+            AssertionError: Raised if the concurrent result differs from the sequential
+            result, or if the requests were not overlapped.
+
+        """
+
+        def slow_fmp_data(self, data_type):
+            time.sleep(0.2)
+            return [{"data_type": data_type}]
+
+        def slow_price_data(self):
+            time.sleep(0.2)
+            return pd.DataFrame({"Close": [1.0]})
+
+        with patch.object(DataScraper, "fetch_fmp_data", slow_fmp_data), patch.object(
+            DataScraper, "fetch_stock_price_data", slow_price_data
+        ):
+            sequential = DataScraper("AAPL", api_key)
+            start = time.perf_counter()
+            concurrent = DataScraper("AAPL", api_key, max_workers=5)
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(
+            list(sequential.data_dictionary), list(concurrent.data_dictionary)
+        )
+        for key in ["info", "ratios", "metrics", "is"]:
+            self.assertEqual(
+                sequential.data_dictionary[key], concurrent.data_dictionary[key]
+            )
+        self.assertTrue(
+            sequential.data_dictionary["price"].equals(
+                concurrent.data_dictionary["price"]
+            )
+        )
+
+    def test_fetch_fmp_data_uses_cache(self):
+        """
+        Test that fetch_fmp_data answers repeat requests from the response cache.
+
+        Raises:
+            AssertionError: Raised if a cached endpoint is requested a second time.
+
+        """
+        mock_response = Mock(spec=requests.models.Response)
+        mock_response.status_code = 200
+        mock_response.content = b'[{"symbol": "AAPL"}]'
+        price = pd.DataFrame({"Close": [1.0]})
+
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(
+            DataScraper, "fetch_stock_price_data", return_value=price
+        ):
+            cache = ResponseCache(tmp_dir)
+            client = HttpClient()
+            with patch.object(client, "get", return_value=mock_response) as get:
+                DataScraper("AAPL", api_key, client=client, cache=cache)
+                self.assertEqual(get.call_count, 4)
+                second = DataScraper("AAPL", api_key, client=client, cache=cache)
+                self.assertEqual(get.call_count, 4)
+            self.assertEqual(second.data_dictionary["info"], [{"symbol": "AAPL"}])
+            self.assertEqual(cache.stats()["hits"], 4)
+
+    def test_fetch_fmp_data_rejects_error_objects(self):
+        """
+        Test that an error object answered with status 200 is neither cached nor
+        projected.
+
+        Raises:
+            AssertionError: Raised if the error object is accepted or cached.
+
+        """
+        mock_response = Mock(spec=requests.models.Response)
+        mock_response.status_code = 200
+        mock_response.content = b'{"Error Message": "Limit Reach"}'
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(tmp_dir)
+            client = HttpClient()
+            instance = DataScraper(
+                "AAPL",
+                api_key,
+                client=client,
+                cache=cache,
+                lazy=True,
+                projection={"is": ["date", "period", "eps"]},
+            )
+            with patch.object(client, "get", return_value=mock_response):
+                with self.assertRaisesRegex(AssertionError, "Limit Reach"):
+                    instance.fetch_fmp_data("is")
+            self.assertIsNone(cache.get(instance.get_fmp_api_url("is")))
+            self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_fetch_stock_price_data_incremental(self):
+        """
+        Test that fetch_stock_price_data only downloads bars after the last stored date.
+
+        Raises:
+            AssertionError: Raised if the full history is downloaded again, or if the
+            stored and new bars are not combined.
+
+        """
+
+        def bars(start, periods):
+            index = pd.date_range(start, periods=periods, freq="D", name="Date")
+            return pd.DataFrame({"High": 2.0, "Low": 1.0, "Close": 1.5}, index=index)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(
+            DataScraper, "fetch_data", return_value={}
+        ):
+            store = PriceStore(tmp_dir)
+            store.append("AAPL", bars("2020-01-01", 100))
+            instance = DataScraper("AAPL", api_key, price_store=store)
+            with patch(
+                "investment_dataset_builder.data_scraper.pdr.get_data_yahoo",
+                return_value=bars("2020-04-09", 3),
+            ) as get_data_yahoo:
+                data = instance.fetch_stock_price_data()
+            self.assertEqual(
+                get_data_yahoo.call_args.kwargs["start"], dt.date(2020, 4, 9)
+            )
+            self.assertEqual(len(data), 102)
+
+    def test_fetch_batch_stock_price_data(self):
+        """
+        Test that a multi-ticker download is split into one DataFrame per ticker.
+
+        Raises:
+            AssertionError: Raised if the per-ticker frames are wrong, or if a ticker
+            without data is not mapped to an empty DataFrame.
+
+        """
+        index = pd.date_range("2020-01-01", periods=3, name="Date")
+        columns = pd.MultiIndex.from_product(
+            [["AAPL", "MSFT"], ["High", "Low", "Close"]]
+        )
+        download = pd.DataFrame(1.0, index=index, columns=columns)
+        download[("MSFT", "Close")] = 2.0
+        with patch("yfinance.download", return_value=download) as mock_download:
+            result = DataScraper.fetch_batch_stock_price_data(["aapl", "MSFT", "DEAD"])
+        self.assertEqual(mock_download.call_count, 1)
+        self.assertEqual(list(result), ["AAPL", "MSFT", "DEAD"])
+        self.assertEqual(result["AAPL"].columns.to_list(), ["High", "Low", "Close"])
+        self.assertEqual(result["MSFT"]["Close"].to_list(), [2.0, 2.0, 2.0])
+        self.assertTrue(result["DEAD"].empty)
+
+    def test_fetch_data_uses_prefetched_data(self):
+        """
+        Test that prefetched entries are used instead of being requested.
+
+        Raises:
+            AssertionError: Raised if a prefetched entry is requested, or if short
+            prefetched price data is accepted.
+
+        """
+        price = pd.DataFrame({"Close": range(100)})
+        with patch.object(
+            DataScraper, "fetch_fmp_data", return_value=[{}]
+        ) as fetch_fmp_data, patch.object(
+            DataScraper, "fetch_stock_price_data"
+        ) as fetch_stock_price_data:
+            instance = DataScraper(
+                "AAPL", api_key, prefetched_data={"price": price, "info": [{"a": 1}]}
+            )
+            self.assertEqual(fetch_fmp_data.call_count, 3)
+            fetch_stock_price_data.assert_not_called()
+            self.assertIs(instance.data_dictionary["price"], price)
+            self.assertEqual(instance.data_dictionary["info"], [{"a": 1}])
+            with self.assertRaises(AssertionError):
+                DataScraper("AAPL", api_key, prefetched_data={"price": price[:10]})
+
+    def test_lazy_data_dictionary(self):
+        """
+        Test that a lazy scraper makes no requests until its entries are accessed.
+
+        Raises:
+            AssertionError: Raised if a request is made on construction, if an entry is
+            fetched more than once, or if prefetch leaves an entry unloaded.
+
+        """
+        price = pd.DataFrame({"Close": range(100)})
+        with patch.object(
+            DataScraper, "fetch_fmp_data", side_effect=lambda t: [{"type": t}]
+        ) as fetch_fmp_data, patch.object(
+            DataScraper, "fetch_stock_price_data", return_value=price
+        ) as fetch_stock_price_data:
+            instance = DataScraper("AAPL", api_key, lazy=True, max_workers=4)
+            data = instance.data_dictionary
+            self.assertEqual(fetch_fmp_data.call_count, 0)
+            self.assertEqual(
+                list(data.keys()), ["info", "ratios", "metrics", "is", "price"]
+            )
+            self.assertIn("ratios", data.keys())
+            self.assertEqual(fetch_fmp_data.call_count, 0)
+
+            self.assertEqual(data["ratios"], [{"type": "ratios"}])
+            self.assertEqual(data["ratios"], [{"type": "ratios"}])
+            self.assertEqual(fetch_fmp_data.call_count, 1)
+            self.assertEqual(data.pending_keys(), ["info", "metrics", "is", "price"])
+
+            instance.prefetch()
+            self.assertEqual(data.pending_keys(), [])
+            self.assertEqual(fetch_fmp_data.call_count, 4)
+            self.assertEqual(fetch_stock_price_data.call_count, 1)
+            self.assertIs(data.to_dict()["price"], price)
+
+    def test_fetch_fmp_data_projection(self):
+        """
+        Test that projected data types are returned as typed column arrays.
+
+        Raises:
+            AssertionError: Raised if unprojected columns are kept, or if the arrays do
+            not have the expected dtypes.
+
+        """
+        records = [
+            {"date": "2022-12-31", "period": "Q4", "eps": 1.5, "revenue": 10, "x": "y"},
+            {"date": "2022-09-30", "period": "Q3", "eps": None, "revenue": 9, "x": "z"},
+        ]
+        with patch.object(DataScraper, "fetch_data", return_value={}):
+            instance = DataScraper(
+                "AAPL", api_key, projection={"is": ["date", "period", "eps"]}
+            )
+        mock_response = Mock(spec=requests.models.Response)
+        mock_response.status_code = 200
+        mock_response.content = json.dumps(records).encode()
+        with patch.object(instance.client, "get", return_value=mock_response):
+            projected = instance.fetch_fmp_data("is")
+            unprojected = instance.fetch_fmp_data("ratios")
+        self.assertEqual(list(projected), ["date", "period", "eps"])
+        self.assertEqual(projected["date"].dtype, object)
+        self.assertEqual(projected["eps"].dtype, np.float64)
+        self.assertTrue(np.isnan(projected["eps"][1]))
+        self.assertEqual(unprojected, records)
+        df = pd.DataFrame(projected)
+        self.assertEqual(df.columns.to_list(), ["date", "period", "eps"])
+
+    def test_get_fmp_api_url_limit(self):
+        """
+        Test that statement requests ask for only the most recent limit periods.
+
+        Raises:
+            AssertionError: Raised if a statement URL does not carry the limit, or if an
+            invalid limit is accepted.
+
+        """
+        instance = DataScraper("AAPL", api_key, lazy=True, limit=6)
+        for data_type in ["ratios", "metrics", "is"]:
+            self.assertIn("&limit=6&", instance.get_fmp_api_url(data_type))
+        self.assertNotIn("limit", instance.get_fmp_api_url("info"))
+        with self.assertRaises(AssertionError):
+            DataScraper("AAPL", api_key, lazy=True, limit=0)
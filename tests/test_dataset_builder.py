@@ -1,8 +1,19 @@
 import sys
-from investment_dataset_builder import DataScraper, DataParser, DatasetBuilder
+from investment_dataset_builder import (
+    DataScraper,
+    DataParser,
+    DatasetBuilder,
+    HttpClient,
+    RateLimiter,
+    ResponseCache,
+)
+from tests.helpers import make_data_dictionary
 import unittest
 from unittest.mock import Mock, patch
 import itertools
+import threading
+import time
+import tempfile
 from pathlib import Path
 import requests
 import pandas as pd
@@ -12,9 +23,7 @@ import json
 
 sys.path.append("..")
 
-key_path = Path().home() / "desktop" / "FinancialModellingPrep_API.txt"
-with open(key_path) as file:
-    api_key = file.read()
+api_key = "test-key"
 
 feature_path = Path.cwd() / "investment_dataset_builder" / "features.json"
 with open(feature_path, "r") as f:
@@ -27,7 +36,7 @@ def generate_class_instance():
 
 class TestDatasetBuilder(unittest.TestCase):
     def test_get_fmp_api_url(self):
-        instance = DatasetBuilder(["New York Stock Exchange"])
+        instance = DatasetBuilder(["New York Stock Exchange"], api_key=api_key)
         expected = (
             f"https://financialmodelingprep.com/api/v3/stock/list?apikey={api_key}"
         )
@@ -40,7 +49,7 @@ class TestDatasetBuilder(unittest.TestCase):
         response = Mock()
         response.status_code = 200
         instance = generate_class_instance()
-        with patch("requests.get", return_value=response) as mock_method:
+        with patch.object(instance.client, "get", return_value=response) as mock_method:
             result = instance.make_stock_ticker_api_request(url)
             self.assertEqual(result, response)
             mock_method.assert_called_once_with(url)
@@ -48,6 +57,26 @@ class TestDatasetBuilder(unittest.TestCase):
             with self.assertRaises(AssertionError):
                 instance.make_stock_ticker_api_request(url)
 
+    def test_rate_limiter(self):
+        """Asserts that the builder's requests wait on the given rate limiter."""
+        from investment_dataset_builder.http_client import get_default_client
+
+        limiter = RateLimiter(calls_per_minute=600, burst=10)
+        instance = DatasetBuilder(rate_limiter=limiter)
+        self.assertIsNot(instance.client, get_default_client())
+        self.assertIs(instance.client.rate_limiter, limiter)
+        self.assertIsNone(get_default_client().rate_limiter)
+        self.assertIsNone(DatasetBuilder().client.rate_limiter)
+
+        client = HttpClient()
+        instance = DatasetBuilder(client=client, rate_limiter=limiter)
+        self.assertIs(instance.client, client)
+        response = Mock(status_code=200)
+        with patch.object(client.session, "get", return_value=response):
+            with patch.object(limiter, "acquire") as acquire:
+                instance.make_stock_ticker_api_request("fakeurl.com")
+        acquire.assert_called_once_with("fakeurl.com")
+
     def test_response_to_json(self):
         toy_dict = {"symbol": "AAPL", "Name": "Apple Inc"}
         instance = DatasetBuilder()
@@ -59,7 +88,7 @@ class TestDatasetBuilder(unittest.TestCase):
 
     def test_fetch_raw_stock_ticker_data(self):
         """This function is not tested explicitly as it is a composition#
-            of three other functions which are all unittested above"""
+        of three other functions which are all unittested above"""
 
     def test_set_exchanges(self):
         instance = DatasetBuilder()
@@ -104,15 +133,539 @@ class TestDatasetBuilder(unittest.TestCase):
             result = instance.check_valid_security(dct)
             self.assertEqual(result, False)
 
+    def test_scrape_tickers(self):
+        tickers = ["AAPL", "FAIL", "MSFT", "NVDA", "XOM"]
+
+        def fake_scraper(ticker, prefetched_data=None, limit=400):
+            assert ticker != "FAIL"
+            return ticker.lower()
+
+        instance = DatasetBuilder(
+            ticker_workers=3, price_batch_size=None, profile_batch_size=None
+        )
+        with patch.object(instance, "make_scraper", side_effect=fake_scraper):
+            result = list(instance.scrape_tickers(tickers))
+        self.assertIsInstance(result[1][1], AssertionError)
+        result[1] = ("FAIL", None)
+        expected = [
+            ("AAPL", "aapl"),
+            ("FAIL", None),
+            ("MSFT", "msft"),
+            ("NVDA", "nvda"),
+            ("XOM", "xom"),
+        ]
+        self.assertEqual(result, expected)
+
+    def test_build_dataset_survives_transport_failures(self):
+        """Asserts that a ticker whose requests cannot connect fails on its own."""
+        def fake_scraper(ticker, prefetched_data=None, limit=400):
+            if ticker == "FLAKY":
+                raise requests.ConnectionError("connection reset")
+            if ticker == "SLOW":
+                raise requests.Timeout("read timed out")
+            return Mock(data_dictionary=make_data_dictionary(ticker, 8, seed=0))
+
+        instance = DatasetBuilder(
+            ticker_workers=2, price_batch_size=None, profile_batch_size=None
+        )
+        with patch.object(instance, "make_scraper", side_effect=fake_scraper):
+            result = instance.build_dataset(tickers=["AAPL", "FLAKY", "SLOW", "XOM"])
+        self.assertEqual(instance._successful_tickers, ["AAPL", "XOM"])
+        self.assertEqual(instance._failed_tickers, ["FLAKY", "SLOW"])
+        self.assertEqual(instance._retryable_tickers, {"FLAKY", "SLOW"})
+        self.assertEqual(len(result), 16)
+
+    def test_scrape_tickers_prefetches_prices_in_batches(self):
+        tickers = ["AAPL", "MSFT", "NVDA", "XOM", "JXN"]
+        batches = []
+
+        def fake_batch_download(batch, start=dt.date(1970, 1, 1)):
+            batches.append(list(batch))
+            return {ticker: pd.DataFrame({"Close": [len(batches)]}) for ticker in batch}
+
+        instance = DatasetBuilder(
+            ticker_workers=2, price_batch_size=2, profile_batch_size=None
+        )
+        with patch.object(
+            DataScraper, "fetch_batch_stock_price_data", side_effect=fake_batch_download
+        ), patch.object(
+            instance, "make_scraper", side_effect=lambda t, p=None, limit=400: p
+        ) as make_scraper:
+            result = dict(instance.scrape_tickers(tickers))
+
+        self.assertEqual(batches, [["AAPL", "MSFT"], ["NVDA", "XOM"], ["JXN"]])
+        self.assertEqual(make_scraper.call_count, 5)
+        self.assertEqual(result["NVDA"]["price"]["Close"][0], 2)
+        self.assertEqual(result["JXN"]["price"]["Close"][0], 3)
+
+    def test_get_fmp_profile_url(self):
+        instance = DatasetBuilder(api_key=api_key)
+        expected = (
+            "https://financialmodelingprep.com/api/v3/profile/"
+            f"AAPL,MSFT,XOM?apikey={api_key}"
+        )
+        result = instance.get_fmp_profile_url(["AAPL", "MSFT", "XOM"])
+        self.assertEqual(result, expected)
+
+    def test_api_key(self):
+        """Asserts that the API key is loaded lazily from the environment."""
+        from investment_dataset_builder import dataset_builder
+
+        missing = Path(tempfile.gettempdir()) / "missing_key.txt"
+        with patch.object(dataset_builder, "key_path", missing):
+            with patch.dict("os.environ", {"FMP_API_KEY": "env-key"}):
+                instance = DatasetBuilder()
+                self.assertEqual(instance.api_key, "env-key")
+            self.assertEqual(instance.api_key, "env-key")
+            self.assertEqual(DatasetBuilder(api_key="own-key").api_key, "own-key")
+            with patch.dict("os.environ", {"FMP_API_KEY": ""}):
+                instance = DatasetBuilder()
+                with self.assertRaises(AssertionError):
+                    instance.api_key
+
+    def test_prefetch_profile_data(self):
+        tickers = ["AAPL", "MSFT", "NVDA", "XOM", "DEAD"]
+        instance = DatasetBuilder(profile_batch_size=2)
+
+        def fake_request(url):
+            symbols = url.split("/profile/")[1].split("?")[0].split(",")
+            response = Mock()
+            response.json = Mock(
+                return_value=[{"symbol": s} for s in symbols if s != "DEAD"]
+            )
+            return response
+
+        with patch.object(
+            instance, "make_stock_ticker_api_request", side_effect=fake_request
+        ) as mock_request:
+            result = instance.prefetch_profile_data(tickers)
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertEqual(list(result), ["AAPL", "MSFT", "NVDA", "XOM"])
+        self.assertEqual(result["XOM"], [{"symbol": "XOM"}])
+
+    def test_prefetch_profile_data_error_message(self):
+        """Asserts that a chunk answered with an error object is skipped."""
+        with tempfile.TemporaryDirectory() as directory:
+            instance = DatasetBuilder(
+                profile_batch_size=2, cache=ResponseCache(directory)
+            )
+
+            def fake_request(url):
+                response = Mock()
+                if "AAPL" in url:
+                    response.json = Mock(return_value={"Error Message": "Limit Reach"})
+                else:
+                    response.json = Mock(return_value=[{"symbol": "XOM"}])
+                return response
+
+            with patch.object(
+                instance, "make_stock_ticker_api_request", side_effect=fake_request
+            ):
+                result = instance.prefetch_profile_data(["AAPL", "MSFT", "XOM"])
+            self.assertEqual(list(result), ["XOM"])
+            error_url = instance.get_fmp_profile_url(["AAPL", "MSFT"])
+            self.assertIsNone(instance.cache.get(error_url))
+
     def test_build_dataset(self):
         "Need to build this"
         pass
 
+    def test_build_dataset_in_parse_batches(self):
+        tickers = ["AAPL", "FAIL", "MSFT", "NVDA", "XOM"]
+        scrapes = [
+            (
+                (ticker, None)
+                if ticker == "FAIL"
+                else (
+                    ticker,
+                    Mock(data_dictionary=make_data_dictionary(ticker, 8, seed)),
+                )
+            )
+            for seed, ticker in enumerate(tickers)
+        ]
+        results = []
+        backends = [
+            (None, "pandas", None),
+            (2, "pandas", None),
+            (2, "arrow", None),
+            (None, "pandas", 2),
+            (2, "pandas", 2),
+        ]
+        for parse_batch_size, parse_backend, parse_workers in backends:
+            instance = DatasetBuilder(
+                parse_batch_size=parse_batch_size,
+                parse_backend=parse_backend,
+                parse_workers=parse_workers,
+            )
+            instance.raw_data = [{"symbol": ticker} for ticker in tickers]
+            with patch.object(
+                instance, "check_valid_security", return_value=True
+            ), patch.object(instance, "scrape_tickers", return_value=iter(scrapes)):
+                results.append(instance.build_dataset())
+            self.assertEqual(instance._failed_tickers, ["FAIL"])
+            self.assertEqual(
+                instance._successful_tickers, ["AAPL", "MSFT", "NVDA", "XOM"]
+            )
+        for result in results[1:]:
+            pd.testing.assert_frame_equal(results[0], result)
+
+    def test_parse_workers_start_while_scraping(self):
+        """Asserts that parse workers are not forked while scraping threads run."""
+        from concurrent.futures import ProcessPoolExecutor
+
+        tickers = ["AAPL", "MSFT", "NVDA", "XOM"]
+        scraping = threading.Event()
+
+        def fake_scraper(ticker, prefetched_data=None, limit=400):
+            # keep the scraping threads busy while the parse workers start
+            scraping.set()
+            time.sleep(0.2)
+            seed = tickers.index(ticker)
+            return Mock(data_dictionary=make_data_dictionary(ticker, 8, seed))
+
+        expected = pd.concat(
+            [
+                DataParser(make_data_dictionary(ticker, 8, seed)).final_data
+                for seed, ticker in enumerate(tickers)
+            ],
+            axis=0,
+        )
+        instance = DatasetBuilder(
+            ticker_workers=2,
+            price_batch_size=None,
+            profile_batch_size=None,
+            parse_workers=2,
+        )
+        with patch.object(instance, "make_scraper", side_effect=fake_scraper), patch(
+            "investment_dataset_builder.dataset_builder.ProcessPoolExecutor",
+            wraps=ProcessPoolExecutor,
+        ) as executor:
+            result = instance.build_dataset(tickers=tickers)
+        self.assertTrue(scraping.is_set())
+        context = executor.call_args.kwargs["mp_context"]
+        self.assertNotEqual(context.get_start_method(), "fork")
+        self.assertEqual(instance._successful_tickers, tickers)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_build_with_compact_dtypes(self):
+        dataset = pd.DataFrame(
+            {
+                "period": ["Q1", "Q4"],
+                "currentRatio": [1.5, 2.0],
+                "start_date": pd.to_datetime(["2021-01-01", "2020-10-01"]),
+            }
+        )
+        instance = DatasetBuilder(compact_dtypes=True, float32_features=True)
+        with patch.object(
+            instance, "fetch_raw_stock_ticker_data", return_value=[]
+        ), patch.object(instance, "build_dataset", return_value=dataset):
+            instance.build()
+        self.assertEqual(list(instance.dataset.columns), ["period", "currentRatio"])
+        self.assertEqual(instance.dataset["period"].dtype, "category")
+        self.assertEqual(instance.dataset["currentRatio"].dtype, np.float32)
+        self.assertIsNone(DatasetBuilder().compactor)
+
+    def test_build_with_structured_index(self):
+        dataset = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2021-03-31", "2020-12-31"]),
+                "start_date": pd.to_datetime(["2020-12-30", "2020-09-30"]),
+            },
+            index=["BRK-B-Q1-2021", "BRK-B-Q4-2020"],
+        )
+        instance = DatasetBuilder(structured_index=True)
+        with patch.object(
+            instance, "fetch_raw_stock_ticker_data", return_value=[]
+        ), patch.object(instance, "build_dataset", return_value=dataset):
+            instance.build()
+        self.assertEqual(
+            instance.dataset.index.tolist(),
+            [
+                ("BRK-B", 1, 2021, pd.Timestamp("2021-03-31")),
+                ("BRK-B", 4, 2020, pd.Timestamp("2020-12-31")),
+            ],
+        )
+
+    def test_build_streams_to_parquet(self):
+        tickers = ["AAPL", "FAIL", "XOM"]
+        scrapes = [
+            (
+                (ticker, None)
+                if ticker == "FAIL"
+                else (
+                    ticker,
+                    Mock(data_dictionary=make_data_dictionary(ticker, 8, seed)),
+                )
+            )
+            for seed, ticker in enumerate(tickers)
+        ]
+        raw_data = [
+            {"symbol": "AAPL", "exchange": "NASDAQ Global Select"},
+            {"symbol": "FAIL", "exchange": "New York Stock Exchange"},
+            {"symbol": "XOM", "exchange": "New York Stock Exchange"},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            instance = DatasetBuilder(output_directory=directory)
+            with patch.object(
+                instance, "fetch_raw_stock_ticker_data", return_value=raw_data
+            ), patch.object(
+                instance, "check_valid_security", return_value=True
+            ), patch.object(
+                instance, "scrape_tickers", return_value=iter(scrapes)
+            ):
+                instance.build()
+            self.assertIsNone(instance.dataset)
+            self.assertEqual(instance._successful_tickers, ["AAPL", "XOM"])
+            dataset = pd.read_parquet(directory)
+            exchanges = (Path(directory) / "exchange=New York Stock Exchange").exists()
+        self.assertTrue(exchanges)
+        self.assertEqual(len(dataset), 16)
+        self.assertNotIn("start_date", dataset.columns)
+        self.assertEqual(
+            sorted(dataset["exchange"].unique()),
+            ["NASDAQ Global Select", "New York Stock Exchange"],
+        )
+
+    def test_build_streams_arrow_tables(self):
+        import pyarrow as pa
+        from investment_dataset_builder import ParquetSink
+        tickers = ["AAPL", "MSFT", "XOM"]
+        datasets, added = [], []
+        add = ParquetSink.add
+
+        def record_add(sink, df):
+            added.append(type(df))
+            return add(sink, df)
+
+        for parse_backend in ["pandas", "arrow"]:
+            scrapes = [
+                (ticker, Mock(data_dictionary=make_data_dictionary(ticker, 8, seed)))
+                for seed, ticker in enumerate(tickers)
+            ]
+            with tempfile.TemporaryDirectory() as directory:
+                instance = DatasetBuilder(
+                    output_directory=directory,
+                    parse_batch_size=2,
+                    parse_backend=parse_backend,
+                )
+                with patch.object(
+                    instance,
+                    "fetch_raw_stock_ticker_data",
+                    return_value=[{"symbol": ticker} for ticker in tickers],
+                ), patch.object(
+                    instance, "check_valid_security", return_value=True
+                ), patch.object(
+                    instance, "scrape_tickers", return_value=iter(scrapes)
+                ), patch.object(
+                    ParquetSink, "add", autospec=True, side_effect=record_add
+                ):
+                    instance.build()
+                datasets.append(pd.read_parquet(directory).sort_index())
+        self.assertEqual(added, [pd.DataFrame] * 2 + [pa.Table] * 2)
+        pd.testing.assert_frame_equal(datasets[0], datasets[1])
+
+    def test_build_resumes_from_manifest(self):
+        from investment_dataset_builder import BuildManifest
+        from investment_dataset_builder.http_client import UnsuccessfulRequestError
+
+        tickers = ["AAPL", "BUSY", "FAIL", "MSFT", "NVDA", "XOM"]
+        data_dictionaries = {
+            ticker: make_data_dictionary(ticker, 8, seed)
+            for seed, ticker in enumerate(tickers)
+        }
+        raw_data = [{"symbol": ticker, "exchange": "NYSE"} for ticker in tickers]
+        scraped = []
+
+        def scrape_tickers(tickers, limit=400):
+            for ticker in tickers:
+                if ticker == "XOM" and len(scraped) == 5:
+                    raise RuntimeError("killed")
+                scraped.append(ticker)
+                if ticker == "FAIL":
+                    yield ticker, AssertionError("Insufficient stock price data")
+                elif ticker == "BUSY" and scraped.count("BUSY") == 1:
+                    yield ticker, UnsuccessfulRequestError(429)
+                else:
+                    yield ticker, Mock(data_dictionary=data_dictionaries[ticker])
+
+        def build(**kwargs):
+            instance = DatasetBuilder(
+                output_directory=directory, checkpoint_tickers=2, **kwargs
+            )
+            with patch.object(
+                instance, "fetch_raw_stock_ticker_data", return_value=raw_data
+            ), patch.object(
+                instance, "check_valid_security", return_value=True
+            ), patch.object(
+                instance, "scrape_tickers", side_effect=scrape_tickers
+            ):
+                instance.build()
+            return instance
+
+        with tempfile.TemporaryDirectory() as directory:
+            # the process dies after AAPL and MSFT were committed and NVDA was
+            # written to the open part
+            with self.assertRaises(RuntimeError):
+                build()
+            manifest = BuildManifest(Path(directory) / "_manifest.jsonl")
+            self.assertEqual(manifest.get_tickers("done"), ["AAPL", "MSFT"])
+            self.assertEqual(manifest.get_tickers("written"), ["NVDA"])
+            self.assertEqual(
+                manifest.get_failure_reasons(),
+                {
+                    "BUSY": "scrape failed: Request unsuccessful with status 429",
+                    "FAIL": "scrape failed: Insufficient stock price data",
+                },
+            )
+            self.assertEqual(manifest.get_tickers("retry"), ["BUSY"])
+
+            with self.assertRaises(AssertionError):
+                build()
+            instance = build(resume=True)
+            dataset = pd.read_parquet(directory)
+            done = BuildManifest(Path(directory) / "_manifest.jsonl").get_tickers(
+                "done"
+            )
+        self.assertEqual(scraped[5:], ["BUSY", "NVDA", "XOM"])
+        self.assertEqual(
+            instance._successful_tickers, ["AAPL", "MSFT", "BUSY", "NVDA", "XOM"]
+        )
+        self.assertEqual(instance._failed_tickers, ["FAIL"])
+        self.assertEqual(sorted(done), ["AAPL", "BUSY", "MSFT", "NVDA", "XOM"])
+        self.assertEqual(len(dataset), 40)
+        self.assertTrue(dataset.index.is_unique)
+
+    def refresh_fixture(self):
+        """Returns the full and outdated data dictionaries of two tickers, where
+        the outdated data of AAPL misses its two latest quarters."""
+        full = {
+            ticker: make_data_dictionary(ticker, 12, seed)
+            for seed, ticker in enumerate(["AAPL", "XOM"])
+        }
+        outdated = {ticker: dict(dct) for ticker, dct in full.items()}
+        for key in ["ratios", "metrics", "is"]:
+            outdated["AAPL"][key] = full["AAPL"][key][2:]
+        return full, outdated
+
+    def refresh(self, instance, path, full):
+        """Refreshes a stored dataset with scrapes of the full data dictionaries,
+        limited to the requested number of periods."""
+        scraped = []
+
+        def scrape_tickers(tickers, limit):
+            for ticker in tickers:
+                scraped.append((ticker, limit))
+                dct = dict(full[ticker])
+                for key in ["ratios", "metrics", "is"]:
+                    dct[key] = dct[key][:limit]
+                yield ticker, Mock(data_dictionary=dct)
+
+        latest = {
+            ticker: pd.Timestamp(dct["is"][0]["date"]) for ticker, dct in full.items()
+        }
+        with patch.object(
+            instance, "fetch_latest_period_date", side_effect=latest.get
+        ), patch.object(instance, "scrape_tickers", side_effect=scrape_tickers):
+            instance.refresh(path)
+        return scraped
+
+    def test_fetch_latest_period_date(self):
+        from investment_dataset_builder.replay import make_response
+
+        body = json.dumps([{"date": "2023-03-31", "period": "Q1", "eps": 1.0}])
+        instance = DatasetBuilder(cache=Mock())
+        with patch.object(
+            instance.client,
+            "get",
+            side_effect=lambda url: make_response(url, 200, body.encode()),
+        ) as get:
+            date = instance.fetch_latest_period_date("AAPL")
+        self.assertEqual(date, pd.Timestamp("2023-03-31"))
+        url = get.call_args[0][0]
+        self.assertIn("income-statement/AAPL?period=quarter&limit=1&", url)
+        instance.cache.get.assert_not_called()
+        with patch.object(
+            instance.client, "get", side_effect=lambda url: make_response(url, 404)
+        ):
+            self.assertIsNone(instance.fetch_latest_period_date("AAPL"))
+
+    def test_fetch_latest_period_date_failures(self):
+        from investment_dataset_builder.replay import make_response
+
+        instance = DatasetBuilder()
+        for error in [requests.ConnectionError("reset"), requests.Timeout("slow")]:
+            with patch.object(instance.client, "get", side_effect=error):
+                self.assertIsNone(instance.fetch_latest_period_date("AAPL"))
+        body = json.dumps({"Error Message": "Limit Reach"}).encode()
+        with patch.object(
+            instance.client,
+            "get",
+            side_effect=lambda url: make_response(url, 200, body),
+        ):
+            self.assertIsNone(instance.fetch_latest_period_date("AAPL"))
+
+    def test_refresh_dataset_file(self):
+        full, outdated = self.refresh_fixture()
+        expected = pd.concat([DataParser(dct).final_data for dct in full.values()])
+        expected = DatasetBuilder.clean_up_dataframe(expected).sort_index()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "dataset.parquet"
+            instance = DatasetBuilder()
+            instance.dataset = DatasetBuilder.clean_up_dataframe(
+                pd.concat([DataParser(dct).final_data for dct in outdated.values()])
+            )
+            instance.save_dataset(path)
+
+            scraped = self.refresh(instance, path, full)
+            stored = pd.read_parquet(path).sort_index()
+        # up to three new quarters in 184 days, plus the four quarters whose
+        # returns they complete
+        self.assertEqual(scraped, [("AAPL", 7)])
+        self.assertEqual(instance._successful_tickers, ["AAPL"])
+        pd.testing.assert_frame_equal(stored, expected)
+        pd.testing.assert_frame_equal(instance.dataset.sort_index(), expected)
+
+    def test_refresh_dataset_directory(self):
+        full, outdated = self.refresh_fixture()
+        expected = pd.concat([DataParser(dct).final_data for dct in full.values()])
+        expected = DatasetBuilder.clean_up_dataframe(expected).sort_index()
+        raw_data = [
+            {"symbol": "AAPL", "exchange": "NASDAQ Global Select"},
+            {"symbol": "XOM", "exchange": "New York Stock Exchange"},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            instance = DatasetBuilder(output_directory=directory)
+            with patch.object(
+                instance, "fetch_raw_stock_ticker_data", return_value=raw_data
+            ), patch.object(
+                instance, "check_valid_security", return_value=True
+            ), patch.object(
+                instance,
+                "scrape_tickers",
+                return_value=iter(
+                    (ticker, Mock(data_dictionary=dct))
+                    for ticker, dct in outdated.items()
+                ),
+            ):
+                instance.build()
+
+            scraped = self.refresh(instance, directory, full)
+            stored = pd.read_parquet(directory)
+            xom_files = sorted(Path(directory).glob("exchange=New*/*/*.parquet"))
+        self.assertEqual(scraped, [("AAPL", 7)])
+        self.assertEqual(
+            sorted(stored.loc[stored.index.str.startswith("AAPL"), "exchange"]),
+            ["NASDAQ Global Select"] * 12,
+        )
+        self.assertTrue(all(path.name == "part-00000.parquet" for path in xom_files))
+        stored = stored.drop(["exchange", "year"], axis=1).sort_index()
+        pd.testing.assert_frame_equal(stored, expected)
+
     def test_save_dataset(self):
         instance = generate_class_instance()
         data = {
-            'column1': [1, 2, 3, 4],
-            'column2': [2, 4, 6, 8],
+            "column1": [1, 2, 3, 4],
+            "column2": [2, 4, 6, 8],
         }
         sample_dataset = pd.DataFrame(data)
         instance.dataset = sample_dataset
@@ -122,5 +675,3 @@ class TestDatasetBuilder(unittest.TestCase):
         saved_dataset = pd.read_parquet(path)
         self.assertTrue(saved_dataset.equals(sample_dataset))
         path.unlink()
-        
-
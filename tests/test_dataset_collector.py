@@ -0,0 +1,48 @@
+import sys
+from investment_dataset_builder import DatasetCollector
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+
+class TestDatasetCollector(unittest.TestCase):
+    """
+    A unittest test case for the DatasetCollector class.
+
+    """
+
+    def make_frames(self, n_frames):
+        return [
+            pd.DataFrame(
+                {"a": np.arange(3) + 3 * i, "b": np.ones(3)},
+                index=[f"T{i}-Q{q}-2022" for q in range(1, 4)],
+            )
+            for i in range(n_frames)
+        ]
+
+    def test_result_matches_concat(self):
+        """Asserts that chunked collection equals a single concatenation."""
+        frames = self.make_frames(10)
+        for chunk_size in [1, 3, 10, 256]:
+            collector = DatasetCollector(chunk_size=chunk_size)
+            for df in frames[:5] + [None] + frames[5:]:
+                collector.add(df)
+            self.assertEqual(collector.n_rows, 30)
+            pd.testing.assert_frame_equal(collector.result(), pd.concat(frames, axis=0))
+            pd.testing.assert_frame_equal(collector.result(), pd.concat(frames, axis=0))
+
+    def test_empty_and_single(self):
+        """Asserts that nothing collected gives None and one frame is not copied."""
+        collector = DatasetCollector()
+        self.assertIsNone(collector.result())
+        df = self.make_frames(1)[0]
+        collector.add(df)
+        self.assertIs(collector.result(), df)
+        with self.assertRaises(AssertionError):
+            DatasetCollector(chunk_size=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
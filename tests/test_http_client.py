@@ -0,0 +1,101 @@
+import sys
+from investment_dataset_builder import HttpClient
+from investment_dataset_builder.http_client import (
+    get_default_client,
+    is_unreachable_host_error,
+)
+import unittest
+from unittest.mock import Mock, patch
+import requests
+
+sys.path.append("..")
+
+
+def make_response(status_code, headers=None):
+    response = Mock(spec=requests.models.Response)
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+class TestHttpClient(unittest.TestCase):
+    """
+    A unittest test case for the HttpClient class.
+
+    """
+
+    def test_session_is_pooled(self):
+        """Asserts that the https adapter is sized to pool_maxsize."""
+        client = HttpClient(pool_maxsize=8)
+        adapter = client.session.get_adapter("https://financialmodelingprep.com")
+        self.assertEqual(adapter._pool_maxsize, 8)
+
+    def test_get_retries_retryable_status(self):
+        """Asserts that 429 and 5xx responses are retried until a 200 arrives."""
+        client = HttpClient(max_retries=3)
+        responses = [make_response(429), make_response(503), make_response(200)]
+        with patch.object(client.session, "get", side_effect=responses) as get, patch(
+            "time.sleep"
+        ) as sleep:
+            result = client.get("https://example.com/api")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_get_does_not_retry_client_errors(self):
+        """Asserts that a non-retryable status is returned immediately."""
+        client = HttpClient(max_retries=3)
+        with patch.object(
+            client.session, "get", return_value=make_response(404)
+        ) as get, patch("time.sleep"):
+            result = client.get("https://example.com/api")
+        self.assertEqual(result.status_code, 404)
+        self.assertEqual(get.call_count, 1)
+
+    def test_get_gives_up_after_max_retries(self):
+        """Asserts that the last response is returned once retries are used up."""
+        client = HttpClient(max_retries=2)
+        with patch.object(
+            client.session, "get", return_value=make_response(500)
+        ) as get, patch("time.sleep"):
+            result = client.get("https://example.com/api")
+        self.assertEqual(result.status_code, 500)
+        self.assertEqual(get.call_count, 3)
+
+    def test_get_retries_connection_errors(self):
+        """Asserts that connection errors are retried and re-raised on the last try."""
+        client = HttpClient(max_retries=1)
+        error = requests.ConnectionError("reset")
+        with patch.object(
+            client.session, "get", side_effect=[error, make_response(200)]
+        ), patch("time.sleep"):
+            self.assertEqual(client.get("https://example.com/api").status_code, 200)
+        with patch.object(client.session, "get", side_effect=error), patch(
+            "time.sleep"
+        ):
+            with self.assertRaises(requests.ConnectionError):
+                client.get("https://example.com/api")
+
+    def test_get_does_not_retry_unreachable_hosts(self):
+        """Asserts that name resolution failures are raised without a retry."""
+        client = HttpClient(max_retries=3)
+        with patch("time.sleep") as sleep:
+            with self.assertRaises(requests.ConnectionError) as context:
+                client.get("http://host.invalid/api")
+        self.assertTrue(is_unreachable_host_error(context.exception))
+        sleep.assert_not_called()
+        self.assertFalse(is_unreachable_host_error(requests.ConnectionError("reset")))
+
+    def test_backoff_delay(self):
+        """Asserts that the jittered backoff is bounded and honours Retry-After."""
+        client = HttpClient(backoff_factor=0.5, max_backoff=4)
+        for attempt in range(6):
+            delay = client.backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4, 0.5 * 2**attempt))
+        response = make_response(429, {"Retry-After": "2"})
+        self.assertEqual(client.backoff_delay(0, response), 2.0)
+
+    def test_get_default_client(self):
+        """Asserts that the default client is shared."""
+        self.assertIs(get_default_client(), get_default_client())
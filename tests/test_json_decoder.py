@@ -0,0 +1,40 @@
+import sys
+from investment_dataset_builder.json_decoder import decode_json, project_records
+import unittest
+import numpy as np
+
+sys.path.append("..")
+
+
+class TestJsonDecoder(unittest.TestCase):
+    """
+    A unittest test case for the json_decoder module.
+
+    """
+
+    def test_decode_json(self):
+        """Asserts that bytes and strings are decoded."""
+        self.assertEqual(decode_json(b'[{"a": 1}]'), [{"a": 1}])
+        self.assertEqual(decode_json('{"a": [1.5, null]}'), {"a": [1.5, None]})
+
+    def test_project_records(self):
+        """Asserts that only the requested columns are kept, with typed arrays."""
+        records = [
+            {"date": "2020-03-31", "period": "Q1", "a": 1, "b": 2.5, "unused": 0},
+            {"date": "2019-12-31", "period": "Q4", "a": None, "b": 3, "c": True},
+        ]
+        result = project_records(records, ["date", "period", "a", "b", "c"])
+        self.assertEqual(list(result), ["date", "period", "a", "b", "c"])
+        self.assertEqual(result["date"].dtype, object)
+        self.assertEqual(list(result["period"]), ["Q1", "Q4"])
+        self.assertEqual(result["a"].dtype, np.float64)
+        self.assertTrue(np.isnan(result["a"][1]))
+        self.assertEqual(list(result["b"]), [2.5, 3.0])
+        # booleans are not silently converted to numbers
+        self.assertEqual(result["c"].dtype, object)
+
+    def test_project_records_missing_column(self):
+        """Asserts that a column absent from every record is all NaN."""
+        result = project_records([{"a": 1}, {"a": 2}], ["missing"])
+        self.assertEqual(result["missing"].dtype, np.float64)
+        self.assertTrue(np.isnan(result["missing"]).all())
@@ -0,0 +1,82 @@
+import sys
+from investment_dataset_builder import AsOfLookup, BatchDataParser, ReturnsEngine
+from investment_dataset_builder.panel_index import make_panel_index, structure_index
+from tests.helpers import make_data_dictionary
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+
+class TestPanelIndex(unittest.TestCase):
+    """
+    A unittest test case for the structured panel index and the AsOfLookup class.
+
+    """
+
+    def make_dataset(self) -> pd.DataFrame:
+        data_dictionaries = {
+            ticker: make_data_dictionary(ticker, 12, seed=i)
+            for i, ticker in enumerate(["AAPL", "BRK-B", "MSFT"])
+        }
+        return BatchDataParser(data_dictionaries).final_data
+
+    def test_make_panel_index(self):
+        """Asserts that the index is stored as small integer codes."""
+        index = make_panel_index(
+            ["AAPL", "AAPL", "BRK-B"],
+            ["Q4", "FY", "Q1"],
+            pd.to_datetime(["2020-12-31", "2020-12-31", "2021-03-31"]),
+        )
+        self.assertEqual(index.names, ["symbol", "period", "year", "period_end"])
+        self.assertEqual(index.get_level_values("period").tolist(), [4, 0, 1])
+        self.assertTrue(all(codes.dtype == np.int8 for codes in index.codes))
+        self.assertEqual(index.get_level_values("year").tolist(), [2020, 2020, 2021])
+        with self.assertRaises(AssertionError):
+            make_panel_index(["AAPL"], ["H1"], pd.to_datetime(["2020-06-30"]))
+
+    def test_structure_index(self):
+        """Asserts that string labels are replaced without changing the values."""
+        df = self.make_dataset()
+        structured = structure_index(df)
+        self.assertIsInstance(structured.index, pd.MultiIndex)
+        pd.testing.assert_frame_equal(structured.set_axis(df.index, axis=0), df)
+        labels = [
+            f"{symbol}-Q{period}-{year}" for symbol, period, year, _ in structured.index
+        ]
+        self.assertEqual(labels, df.index.tolist())
+        self.assertIs(structure_index(structured), structured)
+        self.assertEqual(
+            ReturnsEngine.get_tickers_from_index(structured.index).tolist(),
+            ReturnsEngine.get_tickers_from_index(df.index).tolist(),
+        )
+
+    def test_as_of_lookup(self):
+        """Asserts that the latest period ending on or before the date is returned."""
+        df = self.make_dataset()
+        lookup = AsOfLookup(df)
+        row = lookup.get("BRK-B", "2021-08-15")
+        self.assertEqual(row.name[:3], ("BRK-B", 2, 2021))
+        pd.testing.assert_series_equal(
+            row, lookup.df.loc[("BRK-B", 2, 2021)].iloc[0], check_names=False
+        )
+        self.assertEqual(lookup.get("AAPL", "2021-06-30").name[:3], ("AAPL", 2, 2021))
+        self.assertIsNone(lookup.get("AAPL", "2000-01-01"))
+        self.assertIsNone(lookup.get("NVDA", "2021-06-30"))
+
+        rows = lookup.get_many(["MSFT", "NVDA", "AAPL"], "2022-12-31")
+        self.assertEqual(
+            [label[:3] for label in rows.index], [("MSFT", 4, 2022), ("AAPL", 4, 2022)]
+        )
+        positions = lookup.get_positions(
+            ["AAPL", "AAPL"], pd.to_datetime(["2021-03-30", "2021-03-31"])
+        )
+        self.assertEqual(
+            [lookup.df.index[p][:3] for p in positions],
+            [("AAPL", 4, 2020), ("AAPL", 1, 2021)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import sys
+from investment_dataset_builder import ArrowBatchParser, BatchDataParser, ParquetSink
+from investment_dataset_builder.arrow_backend import table_to_pandas
+from tests.helpers import make_data_dictionary
+import unittest
+from unittest.mock import patch
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append("..")
+
+
+class TestParquetSink(unittest.TestCase):
+    """
+    A unittest test case for the ParquetSink class.
+
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name) / "dataset"
+        data_dictionaries = {
+            ticker: make_data_dictionary(ticker, 12, seed=i)
+            for i, ticker in enumerate(["AAPL", "BRK-B", "XOM"])
+        }
+        self.frames = [
+            BatchDataParser({ticker: data_dictionary}).final_data
+            for ticker, data_dictionary in data_dictionaries.items()
+        ]
+        self.exchanges = {"AAPL": "NASDAQ", "BRK-B": "NYSE", "XOM": "NYSE"}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_dataset(self) -> pd.DataFrame:
+        df = pd.read_parquet(self.directory)
+        return df.drop(["exchange", "year"], axis=1).sort_index()
+
+    def expected_dataset(self) -> pd.DataFrame:
+        df = pd.concat(self.frames, axis=0).drop(["start_date"], axis=1)
+        return df.sort_index()
+
+    def test_partitioned_dataset(self):
+        """Asserts that the rows are partitioned by exchange and year."""
+        sink = ParquetSink(self.directory, exchanges=self.exchanges)
+        for df in self.frames:
+            sink.add(df)
+        self.assertEqual(sink.result(), self.directory)
+        self.assertEqual(sink.committed_parts, [0])
+        self.assertEqual(sink.n_rows, sum(len(df) for df in self.frames))
+
+        pd.testing.assert_frame_equal(self.read_dataset(), self.expected_dataset())
+        partition = self.directory / "exchange=NYSE" / "year=2021"
+        df = pd.read_parquet(partition / "part-00000.parquet")
+        self.assertEqual(len(df), 8)
+        self.assertTrue(df.index.str.startswith(("BRK-B-", "XOM-")).all())
+        self.assertEqual(
+            pq.ParquetFile(partition / "part-00000.parquet").num_row_groups, 1
+        )
+
+    def test_rows_per_group(self):
+        """Asserts that rows are buffered per partition until a row group is full."""
+        sink = ParquetSink(self.directory, exchanges=self.exchanges, rows_per_group=5)
+        for df in self.frames:
+            sink.add(df)
+        partition = self.directory / "exchange=NYSE" / "year=2021"
+        path = partition / "part-00000.parquet"
+        self.assertTrue(path.exists())
+        self.assertFalse((self.directory / "exchange=NASDAQ").exists())
+        sink.result()
+        self.assertEqual(pq.ParquetFile(path).num_row_groups, 2)
+        self.assertEqual(
+            [pq.ParquetFile(path).metadata.row_group(i).num_rows for i in range(2)],
+            [5, 3],
+        )
+        pd.testing.assert_frame_equal(self.read_dataset(), self.expected_dataset())
+
+    def test_rows_per_part(self):
+        """Asserts that parts are committed once rows_per_part rows are written."""
+        sink = ParquetSink(self.directory, exchanges=self.exchanges, rows_per_part=12)
+        parts = [sink.add(df) for df in self.frames]
+        self.assertEqual(parts, [0, 1, 2])
+        self.assertEqual(sink.committed_parts, [0, 1, 2])
+        sink.result()
+        self.assertEqual(sink.committed_parts, [0, 1, 2])
+        self.assertEqual(len(sink.get_part_files(1)), 3)
+        pd.testing.assert_frame_equal(self.read_dataset(), self.expected_dataset())
+
+        sink = ParquetSink(self.directory, exchanges=self.exchanges)
+        self.assertEqual(sink.part, 3)
+
+    def test_consistent_schema(self):
+        """Asserts that later frames are converted to the schema of the first."""
+        sink = ParquetSink(self.directory, partition_by=("year",))
+        sink.add(self.frames[0])
+        df = self.frames[1].copy()
+        df["eps"] = None
+        sink.add(df)
+        sink.result()
+        dataset = pd.read_parquet(self.directory)
+        self.assertEqual(dataset["eps"].dtype, "float64")
+        self.assertEqual(dataset["eps"].isna().sum(), len(df))
+        with self.assertRaises(AssertionError):
+            extra = self.frames[2].copy()
+            extra["newColumn"] = 1.0
+            sink.add(extra)
+
+    def test_widened_schema(self):
+        """Asserts that integer and empty columns of the first frame are widened."""
+        sink = ParquetSink(self.directory, partition_by=("year",))
+        first = self.frames[0].copy()
+        first["employees"] = 100
+        first["eps"] = None
+        sink.add(first)
+        second = self.frames[1].copy()
+        second["employees"] = float("nan")
+        second.iloc[0, second.columns.get_loc("employees")] = 200.0
+        sink.add(second)
+        sink.result()
+        dataset = pd.read_parquet(self.directory)
+        self.assertEqual(dataset["employees"].dtype, "float64")
+        self.assertEqual(dataset["employees"].isna().sum(), len(second) - 1)
+        self.assertEqual(dataset["eps"].dtype, "float64")
+        self.assertEqual(sink.schema.field("employees").type, "double")
+
+    def test_arrow_tables(self):
+        """Asserts that Arrow tables are written like the DataFrames they hold."""
+        tables = [ArrowBatchParser.from_pandas(df) for df in self.frames]
+        sink = ParquetSink(self.directory, exchanges=self.exchanges)
+        with patch(
+            "investment_dataset_builder.parquet_sink.table_to_pandas",
+            wraps=table_to_pandas,
+        ) as to_pandas:
+            sink.add(tables[0])
+            sink.add(self.frames[1])
+            sink.add(tables[2].drop(["eps"]))
+        sink.result()
+        self.assertEqual(to_pandas.call_count, 1)
+        self.frames[2] = self.frames[2].assign(eps=float("nan"))
+        pd.testing.assert_frame_equal(self.read_dataset(), self.expected_dataset())
+
+    def test_upsert(self):
+        """Asserts that upsert replaces rows and only rewrites their partitions."""
+        sink = ParquetSink(self.directory, exchanges=self.exchanges)
+        sink.add(self.frames[0])
+        sink.add(self.frames[1])
+        sink.result()
+
+        updated = self.frames[0].iloc[:2].copy()
+        updated["eps"] = -1.0
+        sink = ParquetSink(self.directory, exchanges=self.exchanges)
+        part = sink.upsert(pd.concat([updated, self.frames[2]], axis=0))
+        self.assertEqual(part, 1)
+
+        self.frames[0] = pd.concat([updated, self.frames[0].iloc[2:]], axis=0)
+        pd.testing.assert_frame_equal(self.read_dataset(), self.expected_dataset())
+        nasdaq = self.directory / "exchange=NASDAQ"
+        self.assertEqual(
+            [path.name for path in (nasdaq / "year=2021").iterdir()],
+            ["part-00000.parquet"],
+        )
+        self.assertEqual(
+            [path.name for path in (nasdaq / "year=2022").iterdir()],
+            ["part-00001.parquet"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
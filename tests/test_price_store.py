@@ -0,0 +1,66 @@
+import sys
+from investment_dataset_builder import PriceStore
+import unittest
+import tempfile
+import datetime as dt
+import pandas as pd
+
+sys.path.append("..")
+
+
+def make_bars(start, periods, close=1.0):
+    index = pd.date_range(start, periods=periods, freq="D", name="Date")
+    return pd.DataFrame(
+        {"High": close + 1, "Low": close - 1, "Close": close}, index=index
+    )
+
+
+class TestPriceStore(unittest.TestCase):
+    """
+    A unittest test case for the PriceStore class.
+
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = PriceStore(self.tmp_dir.name, max_parts=3)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_empty_store(self):
+        """Asserts that an unknown ticker has no data."""
+        self.assertIsNone(self.store.load("AAPL"))
+        self.assertIsNone(self.store.last_date("AAPL"))
+
+    def test_append_and_load(self):
+        """Asserts that appended bars are returned in order without duplicates."""
+        self.store.append("AAPL", make_bars("2020-01-01", 10, close=1.0))
+        self.assertEqual(self.store.last_date("AAPL"), dt.date(2020, 1, 10))
+        # the last stored bar is fetched again and must be replaced
+        self.store.append("AAPL", make_bars("2020-01-10", 5, close=2.0))
+        df = self.store.load("AAPL")
+        self.assertEqual(len(df), 14)
+        self.assertTrue(df.index.is_monotonic_increasing)
+        self.assertEqual(df.loc["2020-01-09", "Close"], 1.0)
+        self.assertEqual(df.loc["2020-01-10", "Close"], 2.0)
+        self.assertEqual(self.store.last_date("AAPL"), dt.date(2020, 1, 14))
+
+    def test_partitioned_by_ticker(self):
+        """Asserts that tickers are stored in separate partitions."""
+        self.store.append("AAPL", make_bars("2020-01-01", 3))
+        self.store.append("^GSPC", make_bars("2021-01-01", 4))
+        self.assertEqual(len(self.store.load("AAPL")), 3)
+        self.assertEqual(len(self.store.load("^GSPC")), 4)
+        self.assertNotEqual(
+            self.store.get_ticker_directory("AAPL"),
+            self.store.get_ticker_directory("^GSPC"),
+        )
+
+    def test_compaction(self):
+        """Asserts that parts are compacted once max_parts is exceeded."""
+        for i in range(4):
+            self.store.append("AAPL", make_bars(f"2020-0{i + 1}-01", 5))
+        self.assertEqual(len(self.store.get_parts("AAPL")), 1)
+        self.assertEqual(len(self.store.load("AAPL")), 20)
+        self.assertEqual(self.store.last_date("AAPL"), dt.date(2020, 4, 5))
@@ -0,0 +1,102 @@
+import sys
+from investment_dataset_builder import RateLimiter, HttpClient
+from investment_dataset_builder.rate_limiter import QuotaExhaustedError
+import unittest
+from unittest.mock import Mock, patch
+import multiprocessing
+import threading
+import time
+import requests
+
+sys.path.append("..")
+
+RATIOS_URL = "https://financialmodelingprep.com/api/v3/ratios/AAPL?apikey=k"
+PROFILE_URL = "https://financialmodelingprep.com/api/v3/profile/AAPL?apikey=k"
+
+
+def acquire_in_process(limiter, n_calls):
+    for _ in range(n_calls):
+        limiter.acquire(RATIOS_URL)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    A unittest test case for the RateLimiter class.
+
+    """
+
+    def test_rate_is_not_exceeded(self):
+        """Asserts that calls are spaced at the configured rate across threads."""
+        limiter = RateLimiter(calls_per_minute=1200)  # 20 calls per second
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=acquire_in_process, args=(limiter, 5))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        # 20 calls with one initial token need at least 19 / 20 seconds
+        self.assertGreaterEqual(elapsed, 0.9)
+        self.assertEqual(limiter.usage()["ratios"], 20)
+
+    def test_shared_across_processes(self):
+        """Asserts that calls made in child processes are counted by the parent."""
+        limiter = RateLimiter(calls_per_minute=6000)
+        ctx = multiprocessing.get_context("fork")
+        processes = [
+            ctx.Process(target=acquire_in_process, args=(limiter, 3)) for _ in range(2)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(limiter.usage()["total"], 6)
+
+    def test_usage_per_endpoint(self):
+        """Asserts that calls are counted per endpoint."""
+        limiter = RateLimiter(calls_per_minute=60000, burst=10)
+        limiter.acquire(RATIOS_URL)
+        limiter.acquire(PROFILE_URL)
+        limiter.acquire(PROFILE_URL)
+        limiter.acquire("https://example.com/unknown")
+        usage = limiter.usage()
+        self.assertEqual(usage["ratios"], 1)
+        self.assertEqual(usage["profile"], 2)
+        self.assertEqual(usage["other"], 1)
+        self.assertEqual(usage["total"], 4)
+        self.assertEqual(usage["today"], 4)
+
+    def test_daily_quota(self):
+        """Asserts that QuotaExhaustedError is raised once the quota is used up."""
+        limiter = RateLimiter(calls_per_minute=60000, daily_quota=3, burst=10)
+        for _ in range(3):
+            limiter.acquire(RATIOS_URL)
+        self.assertEqual(limiter.remaining_quota(), 0)
+        with self.assertRaises(QuotaExhaustedError):
+            limiter.acquire(RATIOS_URL)
+        with patch.object(RateLimiter, "today", return_value=limiter.today() + 1):
+            limiter.acquire(RATIOS_URL)
+            self.assertEqual(limiter.usage()["today"], 1)
+
+    def test_report_throttled(self):
+        """Asserts that a 429 response slows the limiter down."""
+        limiter = RateLimiter(calls_per_minute=600, throttle_factor=0.25)
+        self.assertAlmostEqual(limiter.rate, 10)
+        limiter.report_throttled()
+        self.assertAlmostEqual(limiter.rate, 2.5)
+
+    def test_http_client_uses_limiter(self):
+        """Asserts that HttpClient acquires a token per attempt and reports 429s."""
+        limiter = RateLimiter(calls_per_minute=60000, burst=10)
+        client = HttpClient(rate_limiter=limiter)
+        throttled = Mock(spec=requests.models.Response, status_code=429, headers={})
+        ok = Mock(spec=requests.models.Response, status_code=200, headers={})
+        with patch.object(
+            client.session, "get", side_effect=[throttled, ok]
+        ), patch.object(limiter, "report_throttled") as report, patch("time.sleep"):
+            client.get(RATIOS_URL)
+        self.assertEqual(limiter.usage()["ratios"], 2)
+        report.assert_called_once()
@@ -0,0 +1,130 @@
+import sys
+from investment_dataset_builder import (
+    DataScraper,
+    HttpClient,
+    ReplayStore,
+    RecordingClient,
+    ReplayClient,
+    StandInServer,
+)
+from investment_dataset_builder.replay import fetch_stand_in_price_data, make_response
+import unittest
+from unittest.mock import patch
+import tempfile
+import datetime as dt
+import json
+import time
+import pandas as pd
+
+sys.path.append("..")
+
+# Replayed responses are keyed without the apikey, so any key will do
+api_key = "replay-key"
+
+
+def make_prices(periods=100):
+    index = pd.date_range("2020-01-01", periods=periods, freq="D", name="Date")
+    return pd.DataFrame(
+        {"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 100.0},
+        index=index,
+    )
+
+
+class TestReplay(unittest.TestCase):
+    """
+    A unittest test case for the replay module.
+
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = ReplayStore(self.tmp_dir.name)
+        self.client = HttpClient(max_retries=0)
+
+    def tearDown(self):
+        self.client.close()
+        self.tmp_dir.cleanup()
+
+    def record_ticker(self, ticker="AAPL"):
+        """Records every company endpoint of a ticker with the live url format."""
+        scraper = DataScraper(ticker, "live-key", lazy=True)
+        for data_type in scraper.fmp_company_requests:
+            body = json.dumps([{"symbol": ticker, "data_type": data_type}]).encode()
+            self.store.save_response(scraper.get_fmp_api_url(data_type), body)
+        self.store.save_prices({ticker: make_prices()})
+
+    def test_recording_client(self):
+        """Asserts that successful responses are recorded and failures are not."""
+        client = RecordingClient(self.store, max_retries=0)
+        ok_url = "https://financialmodelingprep.com/api/v3/profile/AAPL?apikey=a"
+        bad_url = "https://financialmodelingprep.com/api/v3/profile/XYZ?apikey=a"
+        responses = [make_response(ok_url, 200, b"[1]"), make_response(bad_url, 404)]
+        with patch.object(client.session, "get", side_effect=responses):
+            client.get(ok_url)
+            client.get(bad_url)
+        other_key = "https://financialmodelingprep.com/api/v3/profile/AAPL?apikey=b"
+        self.assertEqual(self.store.load_response(other_key), b"[1]")
+        self.assertIsNone(self.store.load_response(bad_url))
+
+    def test_replay_client(self):
+        """Asserts that recorded responses are replayed without network access."""
+        self.record_ticker()
+        client = ReplayClient(self.store)
+        with patch.object(client.session, "get") as get:
+            scraper = DataScraper(
+                "AAPL", api_key, client=client, prefetched_data={"price": make_prices()}
+            )
+            get.assert_not_called()
+        self.assertEqual(scraper.data_dictionary["ratios"][0]["data_type"], "ratios")
+        unknown = client.get("https://financialmodelingprep.com/api/v3/profile/NONE")
+        self.assertEqual(unknown.json(), [])
+
+    def test_stand_in_server(self):
+        """Asserts that a DataScraper can fetch everything from the stand-in server."""
+        self.record_ticker()
+        with StandInServer(self.store) as server:
+            scraper = DataScraper(
+                "AAPL",
+                api_key,
+                client=self.client,
+                base_url=server.base_url,
+                yahoo_url=server.yahoo_url,
+            )
+        data = scraper.data_dictionary
+        self.assertEqual(data["metrics"][0]["data_type"], "metrics")
+        self.assertEqual(len(data["price"]), 100)
+        self.assertEqual(data["price"].index[0], pd.Timestamp("2020-01-01"))
+        self.assertEqual(server.stats["ok"], 5)
+        self.assertEqual(server.stats["misses"], 0)
+
+    def test_stand_in_prices(self):
+        """Asserts that prices are served per ticker from the start date onwards."""
+        self.store.save_prices({"AAPL": make_prices(10)})
+        with StandInServer(self.store) as server:
+            result = fetch_stand_in_price_data(
+                self.client, server.yahoo_url, ["AAPL", "NONE"], dt.date(2020, 1, 5)
+            )
+        self.assertEqual(len(result["AAPL"]), 6)
+        self.assertEqual(result["AAPL"]["Close"].iloc[0], 1.5)
+        self.assertTrue(result["NONE"].empty)
+
+    def test_injected_latency_errors_and_rate_limit(self):
+        """Asserts that latency, errors and rate limiting are injected."""
+        url_path = "v3/profile/AAPL?apikey=k"
+        with StandInServer(self.store, latency=0.2) as server:
+            start = time.perf_counter()
+            self.client.get(server.base_url + url_path)
+            self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+        with StandInServer(self.store, error_rate=1.0) as server:
+            response = self.client.get(server.base_url + url_path)
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(server.stats["errors"], 1)
+
+        with StandInServer(self.store, calls_per_minute=2) as server:
+            statuses = [
+                self.client.get(server.base_url + url_path).status_code
+                for _ in range(3)
+            ]
+            self.assertEqual(statuses, [200, 200, 429])
+            self.assertEqual(server.stats["throttled"], 1)
@@ -0,0 +1,114 @@
+import sys
+from investment_dataset_builder import ResponseCache
+from investment_dataset_builder.response_cache import normalize_url, get_endpoint
+import unittest
+from unittest.mock import patch
+import tempfile
+import time
+import os
+from pathlib import Path
+
+sys.path.append("..")
+
+RATIOS_URL = (
+    "https://financialmodelingprep.com/api/"
+    "v3/ratios/AAPL?period=quarter&limit=400&apikey={}"
+)
+PROFILE_URL = "https://financialmodelingprep.com/api/v3/profile/AAPL?apikey={}"
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    A unittest test case for the ResponseCache class.
+
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_normalize_url(self):
+        """Asserts that the apikey is stripped and parameters are sorted."""
+        expected = (
+            "https://financialmodelingprep.com/api/v3/ratios/AAPL?"
+            "limit=400&period=quarter"
+        )
+        self.assertEqual(normalize_url(RATIOS_URL.format("key1")), expected)
+        self.assertEqual(
+            normalize_url(RATIOS_URL.format("key1")),
+            normalize_url(RATIOS_URL.format("key2")),
+        )
+
+    def test_get_endpoint(self):
+        """Asserts that endpoint names are read from the url path."""
+        self.assertEqual(get_endpoint(RATIOS_URL.format("k")), "ratios")
+        self.assertEqual(get_endpoint(PROFILE_URL.format("k")), "profile")
+        url = "https://financialmodelingprep.com/api/v4/economic?name=CPI&apikey=k"
+        self.assertEqual(get_endpoint(url), "economic")
+
+    def test_get_and_set(self):
+        """Asserts that entries round trip independently of the api key."""
+        data = [{"symbol": "AAPL", "currentRatio": 1.5}]
+        self.assertIsNone(self.cache.get(RATIOS_URL.format("key1")))
+        self.cache.set(RATIOS_URL.format("key1"), data)
+        self.assertEqual(self.cache.get(RATIOS_URL.format("key2")), data)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+        reopened = ResponseCache(self.tmp_dir.name)
+        self.assertEqual(reopened.get(RATIOS_URL.format("key1")), data)
+        self.assertEqual(reopened.stats()["entries"], 1)
+
+    def test_ttl_per_endpoint(self):
+        """Asserts that entries expire after their endpoint's time-to-live."""
+        cache = ResponseCache(self.tmp_dir.name, ttls={"ratios": 10, "profile": 100})
+        cache.set(RATIOS_URL.format("k"), [1])
+        cache.set(PROFILE_URL.format("k"), [2])
+        now = time.time()
+        with patch("time.time", return_value=now + 50):
+            self.assertIsNone(cache.get(RATIOS_URL.format("k")))
+            self.assertEqual(cache.get(PROFILE_URL.format("k")), [2])
+
+    def test_lru_eviction(self):
+        """Asserts that the least recently used entry is evicted first."""
+        payload = ["x" * 1000]
+        urls = [RATIOS_URL.replace("AAPL", t).format("k") for t in "ABC"]
+        cache = ResponseCache(self.tmp_dir.name, max_bytes=2500)
+        cache.set(urls[0], payload)
+        cache.set(urls[1], payload)
+        os.utime(cache.get_path(urls[0]), (1, 1))
+        os.utime(cache.get_path(urls[1]), (2, 2))
+        cache.get(urls[0])
+        cache.set(urls[2], payload)
+        self.assertIsNotNone(cache.get(urls[0]))
+        self.assertIsNone(cache.get(urls[1]))
+        self.assertIsNotNone(cache.get(urls[2]))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.size, 2500)
+
+    def test_lru_order_survives_reopening(self):
+        """Asserts that the LRU order is loaded once and then kept in memory."""
+        payload = ["x" * 1000]
+        urls = [RATIOS_URL.replace("AAPL", t).format("k") for t in "ABCD"]
+        cache = ResponseCache(self.tmp_dir.name, max_bytes=3500)
+        for url in urls[:3]:
+            cache.set(url, payload)
+        for time_, url in zip([3, 1, 2], urls):
+            os.utime(cache.get_path(url), (time_, time_))
+
+        cache = ResponseCache(self.tmp_dir.name, max_bytes=3500)
+        stat = Path.stat
+        with patch.object(Path, "stat", autospec=True, side_effect=stat) as mock:
+            cache.set(urls[3], payload)
+        self.assertFalse(
+            [c for c in mock.call_args_list if c.args[0].suffix == ".json"]
+        )
+        self.assertIsNone(cache.get(urls[1]))
+        self.assertIsNotNone(cache.get(urls[0]))
+        self.assertIsNotNone(cache.get(urls[2]))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        files = cache.directory.glob("*/*.json")
+        self.assertEqual(cache.size, sum(path.stat().st_size for path in files))
@@ -0,0 +1,95 @@
+import sys
+from investment_dataset_builder import ReturnsEngine, DataParser
+import unittest
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+
+class TestReturnsEngine(unittest.TestCase):
+    """
+    A unittest test case for the ReturnsEngine class.
+
+    """
+
+    def make_panel(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "stockPriceAverage": [5, 4, 3, 2, 1, 9, 6, 3],
+                "S&P500PriceAverage": [2, 4, 6, 8, 10, 2, 4, 6],
+            },
+            index=[
+                "AAPL-Q1-2001",
+                "AAPL-Q4-2000",
+                "AAPL-Q3-2000",
+                "AAPL-Q2-2000",
+                "AAPL-Q1-2000",
+                "BRK-B-Q3-2000",
+                "BRK-B-Q2-2000",
+                "BRK-B-Q1-2000",
+            ],
+        )
+
+    def test_get_tickers_from_index(self):
+        """Asserts that tickers containing a dash are recovered from the index."""
+        tickers = ReturnsEngine.get_tickers_from_index(self.make_panel().index)
+        self.assertEqual(tickers.tolist(), 5 * ["AAPL"] + 3 * ["BRK-B"])
+
+    def test_returns_do_not_cross_tickers(self):
+        """Asserts that prices are only shifted within a ticker."""
+        panel = self.make_panel()
+        engine = ReturnsEngine(horizons=[1, 2])
+        returns = engine.calculate(
+            panel, ReturnsEngine.get_tickers_from_index(panel.index)
+        )
+        np.testing.assert_allclose(
+            returns["stockPriceRatio_1Q"].values,
+            [np.nan, 1.25, 4 / 3, 1.5, 2.0, np.nan, 1.5, 2.0],
+        )
+        np.testing.assert_allclose(
+            returns["snpPriceRatio_2Q"].values,
+            [np.nan, np.nan, 1 / 3, 0.5, 0.6, np.nan, np.nan, 1 / 3],
+        )
+        np.testing.assert_allclose(
+            returns["priceRatioRelativeToS&P_2Q"].values,
+            [np.nan, np.nan, 5.0, 4.0, 5.0, np.nan, np.nan, 9.0],
+        )
+        self.assertTrue(returns.index.equals(panel.index))
+
+    def test_matches_single_series_calculation(self):
+        """Asserts that the engine agrees with calculate_returns_from_series."""
+        prices = pd.DataFrame({"price": np.random.default_rng(0).uniform(1, 2, 40)})
+        horizons = [1, 2, 4, 8, 12]
+        ratios = ReturnsEngine(horizons).calculate_price_ratios(prices)
+        for horizon in horizons:
+            expected = DataParser.calculate_returns_from_series(
+                None, prices["price"].tolist(), horizon
+            )
+            np.testing.assert_allclose(ratios[horizon]["price"].values, expected)
+
+    def test_column_names(self):
+        """Asserts that the columns are named as the DataParser columns."""
+        returns = ReturnsEngine([1, 8]).calculate(self.make_panel())
+        self.assertEqual(
+            returns.columns.tolist(),
+            [
+                "stockPriceRatio_1Q",
+                "stockPriceRatio_8Q",
+                "snpPriceRatio_1Q",
+                "snpPriceRatio_8Q",
+                "priceRatioRelativeToS&P_1Q",
+                "priceRatioRelativeToS&P_8Q",
+            ],
+        )
+
+    def test_invalid_horizons(self):
+        """Asserts that empty and non-positive horizons are rejected."""
+        with self.assertRaises(AssertionError):
+            ReturnsEngine([])
+        with self.assertRaises(AssertionError):
+            ReturnsEngine([0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()